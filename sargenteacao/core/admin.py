@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
-from .models import Militar, Afastamento, Servico
+from .models import Militar, Afastamento, Servico, Feriado
 # Unregister the default User admin before registering custom one
 if User in admin.site._registry:
     admin.site.unregister(User)
@@ -30,6 +30,12 @@ class ServicoAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return False  # 🔒 histórico não pode ser apagado
 
+@admin.register(Feriado)
+class FeriadoAdmin(admin.ModelAdmin):
+    list_display = ('data', 'descricao')
+    search_fields = ('descricao',)
+    date_hierarchy = 'data'
+
 # Custom UserAdmin to manage permissions
 class CustomUserAdmin(UserAdmin):
     list_display = (
@@ -8,6 +8,14 @@ class CoreConfig(AppConfig):
     def ready(self):
         # Unregister the default User admin to allow custom registration
         self.unregister_user_admin()
+        # Connect signal handlers (cache invalidation)
+        from . import signals  # noqa: F401
+        # Compile the eligibility rules (fails fast on an invalid table)
+        from . import elegibilidade
+        elegibilidade.recarregar()
+        # Build the availability rule pipeline (fails fast on an invalid rule)
+        from . import regras_efetivo
+        regras_efetivo.recarregar()
 
     def unregister_user_admin(self):
         # Unregister the default User admin to allow custom registration
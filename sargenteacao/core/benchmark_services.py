@@ -0,0 +1,225 @@
+"""
+Suíte de benchmark: mede os cálculos da camada de serviços, os geradores de
+PDF e as principais views em diferentes escalas de efetivo.
+
+Para cada escala o banco é preenchido com ``gerar_dados_sinteticos`` e cada
+cenário é executado algumas vezes com o cache vazio (mede o cálculo, não o
+acerto de cache). O resultado é um dicionário serializável em JSON, para que
+execuções de versões diferentes possam ser comparadas com
+``comparar_resultados``.
+"""
+import platform
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Militar, Servico
+from .pdf_services import gerar_aditamento_pdf, gerar_relatorio_mensal_pdf
+from .services import (
+    _calcular_efetivo,
+    calcular_estatisticas_servico,
+    gerar_eventos_calendario,
+)
+from .sinteticos_services import gerar_dados_sinteticos, limpar_dados_escala
+
+
+ESCALAS_PADRAO = (100, 1000, 10000)
+
+REPETICOES_PADRAO = 5
+
+# Variação (fração) acima da qual um cenário é apontado como regressão
+TOLERANCIA_REGRESSAO = 0.20
+
+USUARIO_BENCHMARK = 'benchmark'
+
+# Cache isolado: o benchmark limpa o cache entre as repetições
+CACHES_BENCHMARK = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+def _medir(funcao: Callable[[], Any], repeticoes: int) -> Dict[str, Any]:
+    """Executa o cenário ``repeticoes`` vezes com o cache vazio."""
+    tempos = []
+    consultas = None
+    for i in range(repeticoes):
+        cache.clear()
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        if i == 0:
+            consultas = len(capturadas)
+    return {
+        'media_ms': round(statistics.mean(tempos), 3),
+        'mediana_ms': round(statistics.median(tempos), 3),
+        'min_ms': round(min(tempos), 3),
+        'max_ms': round(max(tempos), 3),
+        'consultas': consultas,
+    }
+
+
+def _view(cliente: Client, url: str) -> Callable[[], Any]:
+    def executar():
+        resposta = cliente.get(url)
+        if resposta.status_code != 200:
+            raise RuntimeError(f'{url} retornou {resposta.status_code}')
+        # Respostas em streaming (PDF/SSE) só são geradas ao consumir o corpo
+        return resposta.content if not resposta.streaming else b''.join(resposta.streaming_content)
+    return executar
+
+
+def cenarios_benchmark(data_ref: date, cliente: Client) -> List[Tuple[str, Callable[[], Any]]]:
+    """
+    Monta a lista de cenários medidos (nome, função).
+
+    Args:
+        data_ref: Data de referência (último dia do histórico gerado)
+        cliente: Cliente de teste autenticado para as views
+    """
+    inicio_mes = data_ref.replace(day=1)
+    # Militar com serviços no mês (histórico e relatório mensal não vazios)
+    militar = (
+        Militar.objects.filter(ativo=True, servicos__data__gte=inicio_mes).order_by('id').first()
+        or Militar.objects.order_by('id').first()
+    )
+
+    def pdf_aditamento():
+        gerar_aditamento_pdf(data_ref, Servico.objects.filter(data=data_ref).select_related('militar'))
+
+    def pdf_relatorio_mensal():
+        servicos = Servico.objects.filter(
+            militar=militar, data__year=data_ref.year, data__month=data_ref.month
+        ).order_by('data')
+        gerar_relatorio_mensal_pdf(militar, servicos, data_ref.month, data_ref.year)
+
+    data_iso = data_ref.isoformat()
+    return [
+        ('services.calcular_efetivo_por_data', lambda: _calcular_efetivo(data_ref)),
+        ('services.calcular_estatisticas_servico',
+         lambda: calcular_estatisticas_servico.sem_cache(inicio_mes, data_ref)),
+        ('services.gerar_eventos_calendario',
+         lambda: gerar_eventos_calendario.sem_cache(data_ref - timedelta(days=30), data_ref + timedelta(days=60))),
+        ('pdf.aditamento', pdf_aditamento),
+        ('pdf.relatorio_mensal', pdf_relatorio_mensal),
+        ('view.ver_efetivo', _view(cliente, f"{reverse('ver_efetivo')}?data={data_iso}")),
+        ('view.efetivo_json', _view(cliente, f"{reverse('efetivo_do_dia')}?data={data_iso}")),
+        ('view.estatisticas_servico',
+         _view(cliente, f"{reverse('estatisticas_servico')}?inicio={inicio_mes.isoformat()}&fim={data_iso}")),
+        ('view.calendario_events',
+         _view(cliente, f"{reverse('calendario_events')}?start={(data_ref - timedelta(days=30)).isoformat()}"
+                        f"&end={(data_ref + timedelta(days=60)).isoformat()}")),
+        ('view.historico_militar', _view(cliente, reverse('historico_militar', args=[militar.id]))),
+        ('view.aditamento_pdf',
+         _view(cliente, reverse('aditamento_pdf_por_data', args=[data_ref.year, data_ref.month, data_ref.day]))),
+        ('view.api_militares', _view(cliente, reverse('militar-list'))),
+    ]
+
+
+def executar_benchmark(escalas: Iterable[int] = ESCALAS_PADRAO, repeticoes: int = REPETICOES_PADRAO,
+                       anos: int = 1, semente: int = 42, data_ref: Optional[date] = None,
+                       registrar: Callable[[str], None] = lambda mensagem: None) -> Dict[str, Any]:
+    """
+    Executa a suíte em cada escala, substituindo os dados do banco atual.
+
+    ATENÇÃO: remove todos os militares, serviços e afastamentos do banco em
+    uso (o comando ``benchmark`` roda em um banco de teste descartável).
+
+    Args:
+        escalas: Quantidades de militares a medir
+        repeticoes: Execuções de cada cenário
+        anos: Anos de histórico gerados por escala
+        semente: Semente dos dados sintéticos (execuções comparáveis)
+        data_ref: Data de referência (padrão: hoje)
+        registrar: Função chamada com mensagens de progresso
+
+    Returns:
+        Dicionário com o ambiente e as medições por escala/cenário
+    """
+    data_ref = data_ref or date.today()
+    resultado = {
+        'gerado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'ambiente': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'banco': connection.vendor,
+            'plataforma': platform.platform(),
+        },
+        'parametros': {'repeticoes': repeticoes, 'anos': anos, 'semente': semente, 'data_ref': data_ref.isoformat()},
+        'escalas': {},
+    }
+
+    with override_settings(CACHES=CACHES_BENCHMARK, ALLOWED_HOSTS=['*']):
+        usuario, _ = User.objects.get_or_create(username=USUARIO_BENCHMARK, defaults={'is_superuser': True})
+        if not usuario.is_superuser:
+            raise RuntimeError(f'O usuário "{USUARIO_BENCHMARK}" já existe e não é superusuário.')
+        cliente = Client()
+        cliente.force_login(usuario)
+
+        for escala in escalas:
+            registrar(f'Escala {escala}: gerando dados...')
+            limpar_dados_escala()
+            inicio = time.perf_counter()
+            dados = gerar_dados_sinteticos(militares=escala, anos=anos, fim=data_ref, semente=semente)
+            dados['geracao_s'] = round(time.perf_counter() - inicio, 2)
+
+            medicoes = {}
+            for nome, funcao in cenarios_benchmark(data_ref, cliente):
+                medicoes[nome] = _medir(funcao, repeticoes)
+                registrar(
+                    f"  {nome}: {medicoes[nome]['mediana_ms']:.1f} ms "
+                    f"({medicoes[nome]['consultas']} consultas)"
+                )
+            resultado['escalas'][str(escala)] = {'dados': dados, 'medicoes': medicoes}
+
+    return resultado
+
+
+def comparar_resultados(anterior: Dict[str, Any], atual: Dict[str, Any],
+                        tolerancia: float = TOLERANCIA_REGRESSAO) -> List[Dict[str, Any]]:
+    """
+    Compara duas execuções do benchmark (mediana e número de consultas).
+
+    Args:
+        anterior: Resultado de referência
+        atual: Resultado novo
+        tolerancia: Aumento relativo da mediana considerado regressão
+
+    Returns:
+        Lista de diferenças por escala/cenário, com ``regressao`` marcada
+    """
+    diferencas = []
+    for escala, dados in atual.get('escalas', {}).items():
+        base = anterior.get('escalas', {}).get(escala, {}).get('medicoes', {})
+        for nome, medicao in dados['medicoes'].items():
+            referencia = base.get(nome)
+            if not referencia:
+                continue
+            variacao = (
+                (medicao['mediana_ms'] - referencia['mediana_ms']) / referencia['mediana_ms']
+                if referencia['mediana_ms'] else 0.0
+            )
+            mais_consultas = (medicao['consultas'] or 0) > (referencia['consultas'] or 0)
+            diferencas.append({
+                'escala': escala,
+                'cenario': nome,
+                'antes_ms': referencia['mediana_ms'],
+                'depois_ms': medicao['mediana_ms'],
+                'variacao': round(variacao, 4),
+                'consultas_antes': referencia['consultas'],
+                'consultas_depois': medicao['consultas'],
+                'regressao': variacao > tolerancia or mais_consultas,
+            })
+    return diferencas
@@ -0,0 +1,119 @@
+"""
+Escala preta (dias úteis) e vermelha (sábados, domingos e feriados).
+
+A unidade pode rodar as duas escalas separadamente: quem tirou serviço no
+fim de semana volta ao fim da fila da vermelha, mas não da preta. Para isso
+cada militar tem a data do último serviço em cada escala
+(``UltimoServico``), pré-calculada nas gravações: o efetivo lê duas datas
+por militar em vez de percorrer o histórico.
+
+- serviços gravados/excluídos: as datas dos militares envolvidos são
+  recalculadas (sinais, ou chamada direta nos caminhos em lote);
+- feriados incluídos/removidos: os militares com serviço na data são
+  recalculados e o efetivo de todas as datas é invalidado.
+"""
+from datetime import date
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from django.db.models import Exists, Max, OuterRef, Q
+
+from .models import Feriado, Militar, Servico, UltimoServico
+from .utils.cache import memoizar
+
+
+ESCALA_PRETA = 'PRETA'
+ESCALA_VERMELHA = 'VERMELHA'
+
+TAG_FERIADO = 'feriado'
+
+# Feriados mudam raramente; o cache é invalidado pela tag a cada alteração
+CACHE_TIMEOUT_FERIADOS = 60 * 60 * 24
+
+
+@memoizar(timeout=CACHE_TIMEOUT_FERIADOS, tags=[TAG_FERIADO])
+def datas_feriados() -> FrozenSet[date]:
+    """Datas cadastradas como feriado."""
+    return frozenset(Feriado.objects.values_list('data', flat=True))
+
+
+def escala_da_data(data: date) -> str:
+    """
+    Escala a que pertence uma data.
+
+    Args:
+        data: Data do serviço
+
+    Returns:
+        ``ESCALA_VERMELHA`` para sábado, domingo ou feriado; senão ``ESCALA_PRETA``
+    """
+    if data.weekday() >= 5 or data in datas_feriados():
+        return ESCALA_VERMELHA
+    return ESCALA_PRETA
+
+
+def filtro_escala_vermelha(campo: str = 'data') -> Q:
+    """Filtro do ORM equivalente a ``escala_da_data(...) == ESCALA_VERMELHA``."""
+    # __week_day: 1 = domingo, 7 = sábado
+    feriado = Feriado.objects.filter(data=OuterRef(campo))
+    return Q(**{f'{campo}__week_day__in': (1, 7)}) | Q(Exists(feriado))
+
+
+def recalcular_ultimos_servicos(militar_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recalcula as datas do último serviço em cada escala.
+
+    Uma consulta agrupada e um upsert, independentemente do número de militares.
+
+    Args:
+        militar_ids: Militares a recalcular (None = todos)
+
+    Returns:
+        Número de militares recalculados
+    """
+    servicos = Servico.objects.all()
+    if militar_ids is None:
+        militar_ids = list(Militar.objects.values_list('id', flat=True))
+    else:
+        militar_ids = {m for m in militar_ids if m}
+        servicos = servicos.filter(militar_id__in=militar_ids)
+    if not militar_ids:
+        return 0
+
+    vermelha = filtro_escala_vermelha()
+    datas = {
+        militar_id: (preta, verm)
+        for militar_id, preta, verm in (
+            servicos.order_by()
+            .values('militar_id')
+            .annotate(preta=Max('data', filter=~vermelha), vermelha=Max('data', filter=vermelha))
+            .values_list('militar_id', 'preta', 'vermelha')
+        )
+    }
+    # Militares sem serviço (ex.: o último foi excluído) ficam com as datas vazias
+    UltimoServico.objects.bulk_create(
+        [
+            UltimoServico(militar_id=militar_id, data_preta=preta, data_vermelha=verm)
+            for militar_id in militar_ids
+            for preta, verm in [datas.get(militar_id, (None, None))]
+        ],
+        update_conflicts=True,
+        unique_fields=['militar'],
+        update_fields=['data_preta', 'data_vermelha'],
+        batch_size=500,
+    )
+    return len(militar_ids)
+
+
+def ultimos_servicos(militar_ids: Iterable[int]) -> Dict[int, Tuple[Optional[date], Optional[date]]]:
+    """
+    Datas do último serviço em cada escala, em uma única consulta.
+
+    Returns:
+        {militar_id: (data_preta, data_vermelha)}
+    """
+    return {
+        militar_id: (preta, vermelha)
+        for militar_id, preta, vermelha in UltimoServico.objects.filter(
+            militar_id__in=militar_ids
+        ).values_list('militar_id', 'data_preta', 'data_vermelha')
+    }
@@ -0,0 +1,296 @@
+"""
+Teste de carga: simula o "pico da manhã" de registro de serviços contra um
+servidor em execução (``runserver`` ou gunicorn).
+
+Cada usuário virtual é uma thread com sessão própria que:
+
+1. faz login pelo formulário (``login_view``);
+2. em ciclo, abre o efetivo do dia (``ver_efetivo``) e a tela de registro
+   (``registrar_servico``), marca de 1 a 3 militares aptos com um tipo
+   permitido e envia o registro, e gera o aditamento em PDF;
+3. espera um tempo de "reflexão" entre as ações.
+
+Para cada endpoint são medidos throughput, latências p50/p95/p99 e as taxas
+de bloqueio (``503`` com ``X-Banco-Bloqueado``, ver
+``core.middleware.BancoBloqueadoMiddleware``) e de erro.
+"""
+import math
+import random
+import re
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urljoin
+
+import requests
+from django.contrib.auth.models import Group, User
+from django.urls import reverse
+
+from .utils.permissoes import SARGENTEANTE_GROUP
+
+
+USUARIOS_PADRAO = 20
+
+DURACAO_PADRAO = 60
+
+# Segundos até todos os usuários estarem ativos (chegada escalonada)
+RAMPA_PADRAO = 10
+
+# Pausa média (segundos) entre as ações de um usuário
+PAUSA_PADRAO = 1.0
+
+TIMEOUT_REQUISICAO = 30
+
+PREFIXO_USUARIO = 'carga'
+
+PERCENTIS = (50, 95, 99)
+
+# Controles da tela de registro (checkbox do militar e opções de tipo)
+_RE_MILITAR = re.compile(r'name="militares"\s+value="(\d+)"')
+_RE_SELECT_TIPO = re.compile(r'name="tipo_(\d+)">(.*?)</select>', re.S)
+_RE_OPCAO = re.compile(r'<option\s+value="([A-Z_]+)"\s*(disabled)?')
+_RE_CSRF = re.compile(r'name="csrfmiddlewaretoken"\s+value="([^"]+)"')
+
+
+def preparar_usuarios_carga(quantidade: int, senha: str, prefixo: str = PREFIXO_USUARIO) -> List[str]:
+    """
+    Cria (ou redefine a senha de) usuários do grupo Sargenteante para o teste.
+
+    Args:
+        quantidade: Número de usuários
+        senha: Senha definida para todos
+        prefixo: Prefixo dos nomes de usuário (``<prefixo>01``, ``<prefixo>02``...)
+
+    Returns:
+        Lista com os nomes de usuário
+    """
+    grupo, _ = Group.objects.get_or_create(name=SARGENTEANTE_GROUP)
+    nomes = []
+    for i in range(1, quantidade + 1):
+        nome = f'{prefixo}{i:02d}'
+        usuario, _ = User.objects.get_or_create(username=nome)
+        usuario.set_password(senha)
+        usuario.save()
+        usuario.groups.add(grupo)
+        nomes.append(nome)
+    return nomes
+
+
+def extrair_opcoes_registro(html: str) -> Dict[int, List[str]]:
+    """
+    Lê a tela de registro e retorna os militares aptos com os tipos disponíveis.
+
+    Args:
+        html: Conteúdo da página ``registrar_servico``
+
+    Returns:
+        Dicionário {militar_id: [tipos não ocupados]}
+    """
+    aptos = {int(militar_id) for militar_id in _RE_MILITAR.findall(html)}
+    opcoes = {}
+    for militar_id, conteudo in _RE_SELECT_TIPO.findall(html):
+        militar_id = int(militar_id)
+        tipos = [tipo for tipo, desabilitado in _RE_OPCAO.findall(conteudo) if not desabilitado]
+        if militar_id in aptos and tipos:
+            opcoes[militar_id] = tipos
+    return opcoes
+
+
+def percentil(valores: Sequence[float], p: float) -> Optional[float]:
+    """Percentil pelo método do posto mais próximo (``valores`` ordenados)."""
+    if not valores:
+        return None
+    posto = max(1, math.ceil(p / 100 * len(valores)))
+    return valores[posto - 1]
+
+
+class _Medicoes:
+    """Coleta thread-safe de (latência, resultado) por endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.amostras = {}
+
+    def registrar(self, endpoint: str, latencia_ms: float, resultado: str) -> None:
+        with self._lock:
+            self.amostras.setdefault(endpoint, []).append((latencia_ms, resultado))
+
+
+def _classificar(resposta: Optional[requests.Response], esperado: Sequence[int]) -> str:
+    if resposta is None:
+        return 'erro'
+    if resposta.status_code == 503 and resposta.headers.get('X-Banco-Bloqueado'):
+        return 'bloqueio'
+    return 'ok' if resposta.status_code in esperado else 'erro'
+
+
+def _requisitar(sessao: requests.Session, medicoes: _Medicoes, endpoint: str, metodo: str, url: str,
+                esperado: Sequence[int] = (200,), **kwargs) -> Optional[requests.Response]:
+    inicio = time.perf_counter()
+    try:
+        resposta = sessao.request(metodo, url, timeout=TIMEOUT_REQUISICAO, allow_redirects=False, **kwargs)
+        resposta.content  # noqa: B018 - a latência inclui o corpo (PDFs)
+    except requests.RequestException:
+        resposta = None
+    medicoes.registrar(endpoint, (time.perf_counter() - inicio) * 1000, _classificar(resposta, esperado))
+    return resposta
+
+
+def _csrf(resposta: Optional[requests.Response]) -> str:
+    """Token CSRF do formulário (CSRF_USE_SESSIONS: o token não vai em cookie)."""
+    encontrado = _RE_CSRF.search(resposta.text) if resposta is not None else None
+    return encontrado.group(1) if encontrado else ''
+
+
+def _executar_usuario(base_url: str, usuario: str, senha: str, data_ref: date, atraso: float,
+                      fim: float, pausa: float, rng: random.Random, medicoes: _Medicoes) -> None:
+    """Ciclo de um usuário virtual, após ``atraso`` segundos, até o instante ``fim`` (``time.monotonic``)."""
+    time.sleep(atraso)
+
+    def url(nome, *args):
+        return urljoin(base_url, reverse(nome, args=args))
+
+    data_iso = data_ref.isoformat()
+    sessao = requests.Session()
+
+    # 1️⃣ Login pelo formulário (o GET obtém o token CSRF)
+    resposta = _requisitar(sessao, medicoes, 'login_form', 'GET', url('login'))
+    resposta = _requisitar(
+        sessao, medicoes, 'login', 'POST', url('login'), esperado=(302,),
+        data={'username': usuario, 'password': senha, 'csrfmiddlewaretoken': _csrf(resposta)},
+    )
+    if resposta is None or resposta.status_code != 302:
+        return
+
+    def pensar():
+        time.sleep(rng.uniform(0.5, 1.5) * pausa)
+
+    # 2️⃣ Ciclo: efetivo -> tela de registro -> registro -> aditamento
+    while time.monotonic() < fim:
+        _requisitar(sessao, medicoes, 'ver_efetivo', 'GET', f"{url('ver_efetivo')}?data={data_iso}")
+        pensar()
+
+        resposta = _requisitar(
+            sessao, medicoes, 'registrar_servico_form', 'GET', f"{url('registrar_servico')}?data={data_iso}"
+        )
+        opcoes = extrair_opcoes_registro(resposta.text) if resposta is not None and resposta.ok else {}
+        pensar()
+
+        if opcoes and time.monotonic() < fim:
+            escolhidos = rng.sample(sorted(opcoes), min(len(opcoes), rng.randint(1, 3)))
+            dados = {
+                'data': data_iso,
+                'militares': [str(militar_id) for militar_id in escolhidos],
+                'csrfmiddlewaretoken': _csrf(resposta),
+            }
+            dados.update({f'tipo_{militar_id}': rng.choice(opcoes[militar_id]) for militar_id in escolhidos})
+            _requisitar(sessao, medicoes, 'registrar_servico', 'POST', url('registrar_servico'),
+                        esperado=(302,), data=dados)
+            pensar()
+
+        _requisitar(sessao, medicoes, 'aditamento_pdf', 'GET',
+                    url('aditamento_pdf_por_data', data_ref.year, data_ref.month, data_ref.day))
+        pensar()
+
+
+def resumir_medicoes(amostras: Dict[str, List[tuple]], duracao_s: float) -> Dict[str, Dict[str, Any]]:
+    """
+    Consolida as amostras por endpoint.
+
+    Args:
+        amostras: {endpoint: [(latência_ms, resultado)]}
+        duracao_s: Duração efetiva do teste (para o throughput)
+
+    Returns:
+        {endpoint: {'requisicoes', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms',
+        'max_ms', 'bloqueios', 'erros', 'taxa_bloqueio', 'taxa_erro'}}
+    """
+    resumo = {}
+    todas = []
+    for endpoint, itens in sorted(amostras.items()):
+        todas.extend(itens)
+        resumo[endpoint] = _resumir(itens, duracao_s)
+    resumo['TOTAL'] = _resumir(todas, duracao_s)
+    return resumo
+
+
+def _resumir(itens: List[tuple], duracao_s: float) -> Dict[str, Any]:
+    latencias = sorted(latencia for latencia, _resultado in itens)
+    total = len(itens)
+    bloqueios = sum(1 for _latencia, resultado in itens if resultado == 'bloqueio')
+    erros = sum(1 for _latencia, resultado in itens if resultado == 'erro')
+    dados = {
+        'requisicoes': total,
+        'throughput_rps': round(total / duracao_s, 2) if duracao_s else None,
+    }
+    for p in PERCENTIS:
+        valor = percentil(latencias, p)
+        dados[f'p{p}_ms'] = round(valor, 1) if valor is not None else None
+    dados.update({
+        'max_ms': round(latencias[-1], 1) if latencias else None,
+        'bloqueios': bloqueios,
+        'erros': erros,
+        'taxa_bloqueio': round(bloqueios / total, 4) if total else 0.0,
+        'taxa_erro': round(erros / total, 4) if total else 0.0,
+    })
+    return dados
+
+
+def executar_carga(base_url: str, usuarios: Sequence[str], senha: str,
+                   duracao: float = DURACAO_PADRAO, rampa: float = RAMPA_PADRAO,
+                   pausa: float = PAUSA_PADRAO, data_ref: Optional[date] = None,
+                   semente: Optional[int] = None,
+                   registrar: Callable[[str], None] = lambda mensagem: None) -> Dict[str, Any]:
+    """
+    Executa o teste de carga e retorna o resumo por endpoint.
+
+    Args:
+        base_url: Endereço do servidor (ex.: ``http://127.0.0.1:8000``)
+        usuarios: Nomes de usuário (um usuário virtual por nome)
+        senha: Senha comum dos usuários
+        duracao: Duração do teste em segundos (após o início do primeiro usuário)
+        rampa: Segundos para todos os usuários entrarem
+        pausa: Pausa média entre ações de um usuário
+        data_ref: Data da escala registrada (padrão: hoje)
+        semente: Semente das escolhas aleatórias
+        registrar: Função chamada com mensagens de progresso
+
+    Returns:
+        Dicionário com os parâmetros e o resumo por endpoint
+    """
+    data_ref = data_ref or date.today()
+    medicoes = _Medicoes()
+    rng = random.Random(semente)
+    inicio = time.monotonic()
+    fim = inicio + duracao
+
+    threads = []
+    for i, usuario in enumerate(usuarios):
+        atraso = rampa * i / (len(usuarios) - 1) if len(usuarios) > 1 else 0
+        thread = threading.Thread(
+            target=_executar_usuario,
+            args=(base_url, usuario, senha, data_ref, atraso, fim, pausa, random.Random(rng.random()), medicoes),
+            daemon=True,
+        )
+        threads.append(thread)
+        thread.start()
+    registrar(f'{len(threads)} usuários virtuais iniciados (rampa de {rampa:.0f}s, duração {duracao:.0f}s)')
+
+    for thread in threads:
+        thread.join()
+    duracao_real = time.monotonic() - inicio
+
+    return {
+        'gerado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parametros': {
+            'url': base_url,
+            'usuarios': len(usuarios),
+            'duracao_s': duracao,
+            'rampa_s': rampa,
+            'pausa_s': pausa,
+            'data_ref': data_ref.isoformat(),
+        },
+        'duracao_real_s': round(duracao_real, 2),
+        'endpoints': resumir_medicoes(medicoes.amostras, duracao_real),
+    }
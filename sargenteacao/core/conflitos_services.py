@@ -0,0 +1,228 @@
+"""
+Conflitos entre afastamentos e serviços já escalados.
+
+``Servico.clean`` impede registrar um serviço durante um afastamento, mas um
+afastamento incluído (ou alterado) depois não olha a escala já feita: o
+conflito só aparecia no próprio dia. Aqui:
+
+- ``detectar_conflitos``: todos os serviços dentro de afastamentos, em uma
+  única consulta (``EXISTS`` correlacionado), opcionalmente restrita a
+  alguns afastamentos ou a um período;
+- ``propor_substituicoes``: para cada serviço em conflito, o melhor
+  substituto pelo mesmo ranking de ``buscar_substitutos``. As escolhas
+  provisórias valem para as datas seguintes: quem já foi proposto não é
+  escolhido na véspera nem no dia seguinte, tem as regras do efetivo
+  reavaliadas com os serviços propostos e cai no ranking pela nova carga;
+- ``aplicar_substituicoes``: grava as trocas por ``aplicar_escala_em_lote``,
+  todas em uma transação (com qualquer erro, nada é gravado).
+
+A ``AfastamentoViewSet`` informa os conflitos ao gravar (e os resolve com
+``resolver=1``); o comando ``resolver_conflitos_afastamento`` varre toda a
+escala futura.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .elegibilidade import BIT_TIPO
+from .models import Afastamento, Servico
+from .regras_efetivo import EstadoEfetivo, Pipeline, pipeline
+from .services import aplicar_escala_em_lote, candidatos_substitutos, pode_substituir, prioridade_substituto
+
+
+class _SubstituicaoFalhou(Exception):
+    """Desfaz a transação das substituições quando algum dia tem erro."""
+
+
+def detectar_conflitos(afastamento_ids: Optional[Iterable[int]] = None, inicio: Optional[date] = None,
+                       fim: Optional[date] = None) -> List[Servico]:
+    """
+    Serviços escalados dentro de algum afastamento do próprio militar.
+
+    Uma única consulta, qualquer que seja o número de afastamentos.
+
+    Args:
+        afastamento_ids: Considera só esses afastamentos (None = todos)
+        inicio: Primeira data de serviço considerada (None = sem limite)
+        fim: Última data de serviço considerada (None = sem limite)
+
+    Returns:
+        Serviços em conflito (com o militar carregado), por data
+    """
+    afastamentos = Afastamento.objects.filter(
+        militar_id=OuterRef('militar_id'),
+        data_inicio__lte=OuterRef('data'),
+        data_fim__gte=OuterRef('data'),
+    )
+    if afastamento_ids is not None:
+        afastamentos = afastamentos.filter(id__in=list(afastamento_ids))
+
+    servicos = Servico.objects.filter(Exists(afastamentos)).select_related('militar')
+    if inicio is not None:
+        servicos = servicos.filter(data__gte=inicio)
+    if fim is not None:
+        servicos = servicos.filter(data__lte=fim)
+    return list(servicos.order_by('data', 'id'))
+
+
+def _reavaliar_candidato(entrada: Dict, data: date, servicos: List[tuple], provisorios: List[tuple],
+                         regras: Pipeline) -> Optional[Dict]:
+    """
+    Entrada do efetivo de ``data`` considerando as substituições já propostas.
+
+    Args:
+        entrada: Entrada apta do efetivo (em cache, sem as propostas)
+        data: Data do serviço em conflito
+        servicos: Serviços reais do militar ``[(data, tipo)]`` (janela das regras)
+        provisorios: Serviços já propostos ao militar ``[(data, tipo)]``
+        regras: Pipeline de regras do efetivo
+
+    Returns:
+        Entrada atualizada (dias de folga e tipos vetados) ou None se o
+        militar não pode assumir serviço na data
+    """
+    # Serviço (real ou proposto) na véspera, no dia ou no dia seguinte
+    vizinhos = {data - timedelta(days=1), data, data + timedelta(days=1)}
+    if any(d in vizinhos for d, _tipo in servicos) or any(d in vizinhos for d, _tipo in provisorios):
+        return None
+    if not provisorios:
+        return entrada
+
+    # Regras do efetivo reexecutadas só para este militar, com os serviços propostos
+    anteriores = sorted(((d, tipo) for d, tipo in servicos + provisorios if d < data), reverse=True)
+    militar_id = entrada['militar'].id
+    estado = regras.avaliar(EstadoEfetivo(
+        data, [entrada['militar']], {}, (),
+        {militar_id: anteriores[0][0]} if anteriores else {},
+        {militar_id: anteriores},
+    ))
+    if estado.bloqueios[0] is not None:
+        return None
+
+    dias_folga = entrada['dias_folga']
+    ultimo_proposto = max((d for d, _tipo in provisorios if d < data), default=None)
+    if ultimo_proposto is not None:
+        folga_proposta = (data - ultimo_proposto).days
+        dias_folga = folga_proposta if dias_folga is None else min(dias_folga, folga_proposta)
+    vetados = set(entrada.get('tipos_vetados', ())) | {t for t, bit in BIT_TIPO.items() if estado.vetos[0] & bit}
+    return {**entrada, 'dias_folga': dias_folga, 'tipos_vetados': tuple(vetados)}
+
+
+def propor_substituicoes(conflitos: Iterable[Servico]) -> List[Dict[str, Any]]:
+    """
+    Melhor substituto para cada serviço em conflito.
+
+    As datas são percorridas em ordem e cada escolha fica registrada como
+    serviço provisório do substituto: nas datas seguintes ele não é
+    escolhido na véspera nem no dia seguinte de um serviço (real ou
+    proposto), as regras do efetivo (``regras_efetivo``) são reavaliadas
+    com os serviços propostos (ex.: limite mensal, descanso após o tipo) e
+    a ordenação usa a folga e os serviços no mês atualizados.
+
+    Consultas: o efetivo e os serviços no mês de cada data (como em
+    ``buscar_substitutos``) e uma consulta dos serviços reais da janela.
+
+    Args:
+        conflitos: Resultado de ``detectar_conflitos``
+
+    Returns:
+        Lista de ``{'servico', 'substituto'}`` (``substituto`` None quando
+        não há candidato)
+    """
+    por_data = defaultdict(list)
+    for servico in conflitos:
+        por_data[servico.data].append(servico)
+    if not por_data:
+        return []
+
+    regras = pipeline()
+    datas = sorted(por_data)
+    em_conflito = [servico.id for servicos in por_data.values() for servico in servicos]
+    # Serviços reais da janela das regras até o dia seguinte ao último conflito
+    # (os serviços em conflito saem: vão para os substitutos)
+    servicos = defaultdict(list)
+    for militar_id, data, tipo in (
+        Servico.objects.filter(data__range=(regras.inicio_janela(datas[0]), datas[-1] + timedelta(days=1)))
+        .exclude(id__in=em_conflito).values_list('militar_id', 'data', 'tipo')
+    ):
+        servicos[militar_id].append((data, tipo))
+
+    provisorios = defaultdict(list)
+    propostas = []
+    for data in datas:
+        candidatos, servicos_mes = candidatos_substitutos(data)
+        for servico in por_data[data]:
+            melhor, melhor_chave = None, None
+            for entrada in candidatos:
+                militar_id = entrada['militar'].id
+                entrada = _reavaliar_candidato(
+                    entrada, data, servicos.get(militar_id, []), provisorios.get(militar_id, []), regras
+                )
+                if entrada is None or not pode_substituir(entrada, servico.tipo):
+                    continue
+                carga = servicos_mes.get(militar_id, 0) + sum(
+                    1 for d, _tipo in provisorios.get(militar_id, ()) if (d.year, d.month) == (data.year, data.month)
+                )
+                chave = prioridade_substituto(entrada, {militar_id: carga})
+                if melhor_chave is None or chave < melhor_chave:
+                    melhor, melhor_chave = entrada['militar'], chave
+            if melhor is not None:
+                provisorios[melhor.id].append((data, servico.tipo))
+            propostas.append({'servico': servico, 'substituto': melhor})
+    return propostas
+
+
+def aplicar_substituicoes(propostas: Iterable[Dict[str, Any]], registrado_por: User = None) -> Dict[str, Any]:
+    """
+    Grava as substituições propostas, todas em uma transação.
+
+    Propostas sem substituto são ignoradas (o serviço continua em conflito).
+
+    Args:
+        propostas: Resultado de ``propor_substituicoes``
+        registrado_por: Usuário responsável pelas trocas
+
+    Returns:
+        Dicionário com os IDs dos serviços ``substituidos`` e os ``erros``
+        (com erro, nada é gravado)
+    """
+    por_data = defaultdict(list)
+    for proposta in propostas:
+        if proposta['substituto'] is not None:
+            servico = proposta['servico']
+            por_data[servico.data].append(
+                {'id': servico.id, 'militar': proposta['substituto'].id, 'tipo': servico.tipo}
+            )
+
+    substituidos, erros = [], []
+    try:
+        with transaction.atomic():
+            for data, itens in sorted(por_data.items()):
+                resultado = aplicar_escala_em_lote(data, atualizar=itens, registrado_por=registrado_por)
+                if resultado['erros']:
+                    erros += [{'data': data, **erro} for erro in resultado['erros']]
+                    raise _SubstituicaoFalhou
+                substituidos += resultado['atualizados']
+    except _SubstituicaoFalhou:
+        substituidos = []
+    return {'substituidos': substituidos, 'erros': erros}
+
+
+def serializar_propostas(propostas: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Converte as propostas em dicionários serializáveis (JSON)."""
+    return [
+        {
+            'servico': p['servico'].id,
+            'data': p['servico'].data,
+            'tipo': p['servico'].tipo,
+            'militar': p['servico'].militar_id,
+            'militar_nome': p['servico'].militar.nome,
+            'substituto': p['substituto'].id if p['substituto'] else None,
+            'substituto_nome': p['substituto'].nome if p['substituto'] else None,
+        }
+        for p in propostas
+    ]
@@ -0,0 +1,201 @@
+"""
+Verificação de consistência de todo o histórico da escala.
+
+Dados antigos (anteriores às regras atuais) e gravações pelo admin podem
+violar regras que hoje são validadas na gravação. Em vez de ``full_clean``
+linha a linha (uma consulta por serviço), as regras são verificadas por
+varredura de listas ordenadas, em tempo linear:
+
+- serviços e afastamentos vêm ordenados por (militar, data), em dois fluxos
+  percorridos juntos: para cada militar, uma única passada verifica serviço
+  durante afastamento, serviços em dias seguidos, graduação sem permissão
+  para o tipo e afastamentos sobrepostos;
+- os cargos especiais vêm ordenados por (data, tipo): repetições ficam lado
+  a lado.
+
+São 4 consultas (militares, serviços, afastamentos e cargos especiais), lidas
+em blocos com ``iterator()``; as violações são geradas uma a uma, para que o
+comando ``verificar_consistencia`` as grave em CSV/JSON sem acumulá-las.
+"""
+from datetime import date, timedelta
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from django.db.models import Q
+
+from .elegibilidade import pode_exercer
+from .models import Afastamento, Militar, Servico
+from .services import CARGOS_ESPECIAIS
+
+
+REGRA_SERVICO_EM_AFASTAMENTO = 'servico_em_afastamento'
+REGRA_DIAS_SEGUIDOS = 'dias_seguidos'
+REGRA_GRADUACAO = 'graduacao_nao_permitida'
+REGRA_AFASTAMENTOS_SOBREPOSTOS = 'afastamentos_sobrepostos'
+REGRA_CARGO_ESPECIAL_DUPLICADO = 'cargo_especial_duplicado'
+
+REGRAS = (
+    REGRA_SERVICO_EM_AFASTAMENTO,
+    REGRA_DIAS_SEGUIDOS,
+    REGRA_GRADUACAO,
+    REGRA_AFASTAMENTOS_SOBREPOSTOS,
+    REGRA_CARGO_ESPECIAL_DUPLICADO,
+)
+
+CAMPOS_VIOLACAO = ('regra', 'data', 'militar_id', 'militar', 'servico_id', 'afastamento_id', 'detalhe')
+
+# Registros lidos por bloco do banco
+TAMANHO_BLOCO = 5000
+
+
+def _violacao(regra: str, data: date, militar_id: int, servico_id: Optional[int] = None,
+              afastamento_id: Optional[int] = None, detalhe: str = '') -> Dict:
+    return {
+        'regra': regra, 'data': data, 'militar_id': militar_id,
+        'servico_id': servico_id, 'afastamento_id': afastamento_id, 'detalhe': detalhe,
+    }
+
+
+# ==================== VARREDURAS ====================
+
+def varrer_militar(militar_id: int, graduacao: str, servicos: Sequence[Tuple[int, date, str]],
+                   afastamentos: Sequence[Tuple[int, date, date]]) -> Iterator[Dict]:
+    """
+    Verifica as regras de um militar em uma passada.
+
+    Args:
+        militar_id: ID do militar
+        graduacao: Graduação do militar
+        servicos: ``(id, data, tipo)`` ordenados por data
+        afastamentos: ``(id, data_inicio, data_fim)`` ordenados por início
+
+    Yields:
+        Violações encontradas
+    """
+    # Afastamentos sobrepostos: o início não pode cair antes do maior fim já visto
+    maior_fim, maior_id = None, None
+    for afastamento_id, inicio, fim in afastamentos:
+        if maior_fim is not None and inicio <= maior_fim:
+            yield _violacao(
+                REGRA_AFASTAMENTOS_SOBREPOSTOS, inicio, militar_id, afastamento_id=afastamento_id,
+                detalhe=f'Sobrepõe o afastamento {maior_id} (até {maior_fim:%d/%m/%Y})',
+            )
+        if maior_fim is None or fim > maior_fim:
+            maior_fim, maior_id = fim, afastamento_id
+
+    # Serviços: um ponteiro avança pelos afastamentos (ambos em ordem de data)
+    j = 0
+    vigente_fim, vigente_id = None, None
+    anterior = None
+    for servico_id, data, tipo in servicos:
+        while j < len(afastamentos) and afastamentos[j][1] <= data:
+            afastamento_id, _inicio, fim = afastamentos[j]
+            if vigente_fim is None or fim > vigente_fim:
+                vigente_fim, vigente_id = fim, afastamento_id
+            j += 1
+        if vigente_fim is not None and vigente_fim >= data:
+            yield _violacao(
+                REGRA_SERVICO_EM_AFASTAMENTO, data, militar_id, servico_id, vigente_id,
+                'Serviço durante afastamento',
+            )
+        if anterior is not None and anterior + timedelta(days=1) == data:
+            yield _violacao(REGRA_DIAS_SEGUIDOS, data, militar_id, servico_id, detalhe='Serviço no dia anterior')
+        if not pode_exercer(graduacao, tipo):
+            yield _violacao(
+                REGRA_GRADUACAO, data, militar_id, servico_id,
+                detalhe=f'{tipo} não permitido para {graduacao}',
+            )
+        anterior = data
+
+
+def varrer_cargos_especiais(servicos: Iterable[Tuple[int, int, date, str]]) -> Iterator[Dict]:
+    """
+    Cargos especiais repetidos no mesmo dia.
+
+    Args:
+        servicos: ``(id, militar_id, data, tipo)`` ordenados por (data, tipo)
+
+    Yields:
+        Uma violação para cada repetição (a primeira ocorrência é mantida)
+    """
+    for (data, tipo), grupo in groupby(servicos, key=lambda s: (s[2], s[3])):
+        primeiro_id, *_ = next(grupo)
+        for servico_id, militar_id, _data, _tipo in grupo:
+            yield _violacao(
+                REGRA_CARGO_ESPECIAL_DUPLICADO, data, militar_id, servico_id,
+                detalhe=f'{tipo} já atribuído (serviço {primeiro_id})',
+            )
+
+
+# ==================== VERIFICAÇÃO ====================
+
+def _agrupar_por_militar(linhas: Iterable[tuple]) -> Iterator[Tuple[int, list]]:
+    """Agrupa linhas ``(militar_id, ...)`` já ordenadas por militar em ``(militar_id, [(...), ...])``."""
+    for militar_id, grupo in groupby(linhas, key=lambda linha: linha[0]):
+        yield militar_id, [linha[1:] for linha in grupo]
+
+
+def verificar_consistencia(inicio: Optional[date] = None, fim: Optional[date] = None,
+                           regras: Iterable[str] = REGRAS) -> Iterator[Dict]:
+    """
+    Verifica as regras da escala em todo o histórico (ou em um período).
+
+    Args:
+        inicio: Primeira data considerada (None = sem limite)
+        fim: Última data considerada (None = sem limite)
+        regras: Regras a verificar (``REGRAS``)
+
+    Yields:
+        Violações (``CAMPOS_VIOLACAO``), por militar e depois cargos especiais
+    """
+    regras = set(regras)
+    periodo_servicos = Q()
+    periodo_afastamentos = Q()
+    if inicio is not None:
+        periodo_servicos &= Q(data__gte=inicio)
+        periodo_afastamentos &= Q(data_fim__gte=inicio)
+    if fim is not None:
+        periodo_servicos &= Q(data__lte=fim)
+        periodo_afastamentos &= Q(data_inicio__lte=fim)
+
+    militares = {militar_id: (nome, graduacao) for militar_id, nome, graduacao in
+                 Militar.objects.values_list('id', 'nome', 'graduacao').iterator(chunk_size=TAMANHO_BLOCO)}
+
+    def com_nome(violacao):
+        violacao['militar'] = militares.get(violacao['militar_id'], ('', ''))[0]
+        return violacao
+
+    if regras - {REGRA_CARGO_ESPECIAL_DUPLICADO}:
+        servicos = _agrupar_por_militar(
+            Servico.objects.filter(periodo_servicos).order_by('militar_id', 'data')
+            .values_list('militar_id', 'id', 'data', 'tipo').iterator(chunk_size=TAMANHO_BLOCO)
+        )
+        afastamentos = _agrupar_por_militar(
+            Afastamento.objects.filter(periodo_afastamentos).order_by('militar_id', 'data_inicio')
+            .values_list('militar_id', 'id', 'data_inicio', 'data_fim').iterator(chunk_size=TAMANHO_BLOCO)
+        )
+
+        # Intercala os dois fluxos (ambos em ordem de militar)
+        proximo_servicos = next(servicos, None)
+        proximo_afastamentos = next(afastamentos, None)
+        while proximo_servicos is not None or proximo_afastamentos is not None:
+            militar_id = min(grupo[0] for grupo in (proximo_servicos, proximo_afastamentos) if grupo is not None)
+            servicos_militar, afastamentos_militar = [], []
+            if proximo_servicos is not None and proximo_servicos[0] == militar_id:
+                servicos_militar = proximo_servicos[1]
+                proximo_servicos = next(servicos, None)
+            if proximo_afastamentos is not None and proximo_afastamentos[0] == militar_id:
+                afastamentos_militar = proximo_afastamentos[1]
+                proximo_afastamentos = next(afastamentos, None)
+
+            graduacao = militares.get(militar_id, ('', ''))[1]
+            for violacao in varrer_militar(militar_id, graduacao, servicos_militar, afastamentos_militar):
+                if violacao['regra'] in regras:
+                    yield com_nome(violacao)
+
+    if REGRA_CARGO_ESPECIAL_DUPLICADO in regras:
+        especiais = (
+            Servico.objects.filter(periodo_servicos, tipo__in=CARGOS_ESPECIAIS).order_by('data', 'tipo', 'id')
+            .values_list('id', 'militar_id', 'data', 'tipo').iterator(chunk_size=TAMANHO_BLOCO)
+        )
+        yield from map(com_nome, varrer_cargos_especiais(especiais))
@@ -0,0 +1,145 @@
+"""
+Regras de elegibilidade: quais graduações podem exercer cada tipo de serviço.
+
+As regras ficam em uma única tabela ``{tipo: [graduações]}``:
+``REGRAS_PADRAO``, ou ``settings.ELEGIBILIDADE_SERVICO`` (dict), ou um
+arquivo JSON em ``settings.ELEGIBILIDADE_SERVICO_ARQUIVO`` — assim uma
+unidade ajusta as regras sem alterar código.
+
+Na inicialização (``CoreConfig.ready``) a tabela é validada e compilada em
+máscaras de bits: cada graduação e cada tipo têm um bit, e a verificação
+"graduação pode exercer tipo" é um ``&`` entre inteiros. As listas de tipos,
+de graduações e as opções ``(código, rótulo)`` também são montadas uma vez.
+"""
+import json
+from typing import Dict, List, Sequence, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .models import Militar, Servico
+
+
+REGRAS_PADRAO: Dict[str, List[str]] = {
+    'GUARDA': ['SD', 'CB'],
+    'PLANTAO': ['SD', 'CB'],
+    'PERMANENCIA': ['SD', 'CB'],
+    'CABO_GUARDA': ['CB'],
+    'CABO_DIA': ['CB'],
+    'COMANDANTE_GUARDA': ['3SG'],
+    'ADJUNTO': ['2SG', '1SG'],
+    'OFICIAL_DIA': ['1TEN', '2TEN'],
+}
+
+GRADUACOES = tuple(codigo for codigo, _rotulo in Militar.GRADUACOES_CHOICES)
+TIPOS = tuple(codigo for codigo, _rotulo in Servico.TIPOS_SERVICO)
+_ROTULOS_TIPO = dict(Servico.TIPOS_SERVICO)
+
+BIT_GRADUACAO = {graduacao: 1 << i for i, graduacao in enumerate(GRADUACOES)}
+BIT_TIPO = {tipo: 1 << i for i, tipo in enumerate(TIPOS)}
+
+
+class RegrasCompiladas:
+    """Tabela de elegibilidade compilada em máscaras e listas prontas (somente leitura)."""
+    __slots__ = ('mascara_tipos', 'mascara_graduacoes', 'tipos', 'graduacoes', 'opcoes')
+
+    def __init__(self, tabela: Dict[str, Sequence[str]]):
+        desconhecidos = sorted(set(tabela) - set(TIPOS))
+        if desconhecidos:
+            raise ImproperlyConfigured(f'Elegibilidade: tipos de serviço desconhecidos: {", ".join(desconhecidos)}.')
+        for tipo, graduacoes in tabela.items():
+            invalidas = sorted(set(graduacoes) - set(GRADUACOES))
+            if invalidas:
+                raise ImproperlyConfigured(
+                    f'Elegibilidade: graduações desconhecidas em {tipo}: {", ".join(invalidas)}.'
+                )
+
+        # graduação -> máscara de tipos e tipo -> máscara de graduações
+        self.mascara_tipos = dict.fromkeys(GRADUACOES, 0)
+        self.mascara_graduacoes = dict.fromkeys(TIPOS, 0)
+        for tipo, graduacoes in tabela.items():
+            for graduacao in graduacoes:
+                self.mascara_tipos[graduacao] |= BIT_TIPO[tipo]
+                self.mascara_graduacoes[tipo] |= BIT_GRADUACAO[graduacao]
+
+        # Listas na ordem canônica dos choices, montadas uma única vez
+        self.tipos = {
+            graduacao: tuple(t for t in TIPOS if mascara & BIT_TIPO[t])
+            for graduacao, mascara in self.mascara_tipos.items()
+        }
+        self.graduacoes = {
+            tipo: tuple(g for g in GRADUACOES if mascara & BIT_GRADUACAO[g])
+            for tipo, mascara in self.mascara_graduacoes.items()
+        }
+        self.opcoes = {
+            graduacao: tuple((t, _ROTULOS_TIPO[t]) for t in tipos)
+            for graduacao, tipos in self.tipos.items()
+        }
+
+
+def carregar_tabela() -> Dict[str, List[str]]:
+    """
+    Tabela de regras configurada: ``ELEGIBILIDADE_SERVICO``, o arquivo JSON
+    de ``ELEGIBILIDADE_SERVICO_ARQUIVO`` ou ``REGRAS_PADRAO``.
+    """
+    tabela = getattr(settings, 'ELEGIBILIDADE_SERVICO', None)
+    if tabela is not None:
+        return tabela
+    arquivo = getattr(settings, 'ELEGIBILIDADE_SERVICO_ARQUIVO', '')
+    if arquivo:
+        try:
+            with open(arquivo, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise ImproperlyConfigured(f'Não foi possível ler as regras de elegibilidade em {arquivo}: {e}')
+    return REGRAS_PADRAO
+
+
+_regras = None
+
+
+def recarregar() -> RegrasCompiladas:
+    """Lê e compila a tabela de regras (na inicialização ou quando a configuração muda)."""
+    global _regras
+    _regras = RegrasCompiladas(carregar_tabela())
+    return _regras
+
+
+def regras() -> RegrasCompiladas:
+    """Regras compiladas em uso."""
+    return _regras or recarregar()
+
+
+@receiver(setting_changed)
+def _configuracao_alterada(setting, **kwargs):
+    if setting in ('ELEGIBILIDADE_SERVICO', 'ELEGIBILIDADE_SERVICO_ARQUIVO'):
+        recarregar()
+
+
+# ==================== CONSULTAS ====================
+
+def pode_exercer(graduacao: str, tipo: str) -> bool:
+    """Verifica se a graduação pode exercer o tipo de serviço (um ``&`` entre máscaras)."""
+    return bool(regras().mascara_tipos.get(graduacao, 0) & BIT_TIPO.get(tipo, 0))
+
+
+def tipos_da_graduacao(graduacao: str) -> Tuple[str, ...]:
+    """Tipos de serviço permitidos para a graduação."""
+    return regras().tipos.get(graduacao, ())
+
+
+def graduacoes_do_tipo(tipo: str) -> Tuple[str, ...]:
+    """Graduações que podem exercer o tipo de serviço."""
+    return regras().graduacoes.get(tipo, ())
+
+
+def opcoes_tipo(graduacao: str) -> Tuple[Tuple[str, str], ...]:
+    """Opções ``(código, rótulo)`` de tipo de serviço para a graduação."""
+    return regras().opcoes.get(graduacao, ())
+
+
+def mascara_graduacoes(tipo: str) -> int:
+    """Máscara de bits (``BIT_GRADUACAO``) das graduações que podem exercer o tipo."""
+    return regras().mascara_graduacoes.get(tipo, 0)
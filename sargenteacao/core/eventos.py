@@ -0,0 +1,215 @@
+"""
+Pub/sub em processo para eventos de alteração da escala (serviços e afastamentos).
+
+Os sinais de gravação publicam eventos (após o commit da transação) e o
+endpoint SSE assíncrono entrega cada evento aos assinantes cujo filtro
+(datas e subunidade) corresponde. O barramento vive na memória do processo:
+com ``settings.EVENTOS_REDIS_URL`` os eventos passam por um canal pub/sub do
+Redis e cada processo com assinantes os repassa ao seu barramento, de modo
+que todos os workers recebem as gravações de todos. Sem Redis, assinantes
+só recebem eventos gravados pelo mesmo processo.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional, Set
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Canal pub/sub dos eventos no Redis
+CANAL_EVENTOS = 'sargenteacao:eventos'
+# Espera antes de reconectar ao Redis após uma falha (segundos)
+REDIS_RECONEXAO = 2
+
+
+# Eventos pendentes por assinante antes de sinalizar "recarregar"
+TAMANHO_FILA_EVENTOS = 200
+
+
+class Assinatura:
+    """Assinante do barramento, com fila própria no event loop que o criou."""
+
+    def __init__(self, loop, datas: Optional[Set[date]] = None, subunidade: str = ''):
+        self.loop = loop
+        self.datas = set(datas or ())
+        self.subunidade = subunidade
+        self.fila = asyncio.Queue(maxsize=TAMANHO_FILA_EVENTOS)
+        # Sinaliza que eventos foram descartados (fila cheia)
+        self.perdeu_eventos = False
+
+    def aceita(self, evento: Dict[str, Any]) -> bool:
+        if self.subunidade and evento.get('subunidade') != self.subunidade:
+            return False
+        if self.datas:
+            inicio = date.fromisoformat(evento['inicio'])
+            fim = date.fromisoformat(evento['fim'])
+            return any(inicio <= d <= fim for d in self.datas)
+        return True
+
+    def _entregar(self, evento: Dict[str, Any]) -> None:
+        # Executado no event loop do assinante
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.perdeu_eventos = True
+
+
+class Barramento:
+    """Barramento de eventos thread-safe (publicação síncrona, consumo assíncrono)."""
+
+    def __init__(self):
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+        self._sequencia = itertools.count(1)
+
+    def assinar(self, datas: Optional[Iterable[date]] = None, subunidade: str = '') -> Assinatura:
+        """Cria uma assinatura ligada ao event loop em execução."""
+        assinatura = Assinatura(asyncio.get_running_loop(), set(datas or ()), subunidade)
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        if url_redis():
+            _iniciar_ouvinte_redis()
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura) -> None:
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    @property
+    def total_assinantes(self) -> int:
+        return len(self._assinaturas)
+
+    def sinalizar_perda(self) -> None:
+        """Marca todos os assinantes para recarregar (eventos podem ter sido perdidos)."""
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            assinatura.perdeu_eventos = True
+
+    def publicar(self, evento: Dict[str, Any]) -> None:
+        """Entrega o evento a todos os assinantes cujo filtro corresponde."""
+        evento = {**evento, 'seq': next(self._sequencia)}
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            if not assinatura.aceita(evento):
+                continue
+            try:
+                assinatura.loop.call_soon_threadsafe(assinatura._entregar, evento)
+            except RuntimeError:
+                # Event loop encerrado: assinante abandonado
+                self.cancelar(assinatura)
+
+
+barramento = Barramento()
+
+
+def url_redis() -> str:
+    """URL do Redis usado para distribuir os eventos entre processos ('' = só no processo)."""
+    return getattr(settings, 'EVENTOS_REDIS_URL', '')
+
+
+_cliente_redis = None
+_ouvinte_redis = None
+_ouvinte_lock = threading.Lock()
+
+
+def cliente_redis():
+    """Cliente Redis do processo (o pacote ``redis`` só é importado com o Redis configurado)."""
+    global _cliente_redis
+    if _cliente_redis is None:
+        import redis
+        _cliente_redis = redis.Redis.from_url(url_redis())
+    return _cliente_redis
+
+
+def ha_assinantes() -> bool:
+    """Se vale montar eventos: com Redis, os assinantes podem estar em outro processo."""
+    return bool(url_redis()) or barramento.total_assinantes > 0
+
+
+def receber_mensagem(dados) -> None:
+    """Repassa ao barramento local um evento recebido do canal do Redis."""
+    barramento.publicar(json.loads(dados))
+
+
+def _ouvir_redis() -> None:
+    # Thread do processo: assina o canal e repassa cada evento ao barramento.
+    # Numa queda da conexão, os assinantes recebem "recarregar".
+    while True:
+        try:
+            pubsub = cliente_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CANAL_EVENTOS)
+            for mensagem in pubsub.listen():
+                receber_mensagem(mensagem['data'])
+        except Exception:
+            logger.exception('Conexão com o canal de eventos do Redis perdida')
+            barramento.sinalizar_perda()
+            time.sleep(REDIS_RECONEXAO)
+
+
+def _iniciar_ouvinte_redis() -> None:
+    global _ouvinte_redis
+    with _ouvinte_lock:
+        if _ouvinte_redis is None or not _ouvinte_redis.is_alive():
+            _ouvinte_redis = threading.Thread(target=_ouvir_redis, name='eventos-redis', daemon=True)
+            _ouvinte_redis.start()
+
+
+def _publicar_redis(evento: Dict[str, Any]) -> None:
+    try:
+        cliente_redis().publish(CANAL_EVENTOS, json.dumps(evento))
+    except Exception:
+        # A gravação já foi confirmada: o stream perde o evento, não a requisição
+        logger.exception('Falha ao publicar evento no Redis')
+
+
+def publicar_evento(evento: Dict[str, Any]) -> None:
+    """
+    Publica o evento após o commit da transação corrente (ou imediatamente).
+
+    Com ``EVENTOS_REDIS_URL``, o evento vai para o canal do Redis e chega aos
+    assinantes de todos os processos (inclusive deste, pelo ouvinte).
+    """
+    if url_redis():
+        transaction.on_commit(lambda: _publicar_redis(evento))
+    elif barramento.total_assinantes:
+        transaction.on_commit(lambda: barramento.publicar(evento))
+
+
+def evento_servico(acao: str, servico_id: int, data: date, militar_id: int,
+                   subunidade: str, tipo: str) -> Dict[str, Any]:
+    """Monta o evento de alteração de um serviço."""
+    return {
+        'modelo': 'servico',
+        'acao': acao,
+        'id': servico_id,
+        'militar': militar_id,
+        'subunidade': subunidade,
+        'tipo': tipo,
+        'data': data.isoformat(),
+        # O serviço também afeta o efetivo do dia seguinte ("serviço ontem")
+        'inicio': data.isoformat(),
+        'fim': (data + timedelta(days=1)).isoformat(),
+    }
+
+
+def evento_afastamento(acao: str, afastamento) -> Dict[str, Any]:
+    """Monta o evento de alteração de um afastamento."""
+    return {
+        'modelo': 'afastamento',
+        'acao': acao,
+        'id': afastamento.id,
+        'militar': afastamento.militar_id,
+        'subunidade': afastamento.militar.subunidade,
+        'tipo': afastamento.tipo,
+        'inicio': afastamento.data_inicio.isoformat(),
+        'fim': afastamento.data_fim.isoformat(),
+    }
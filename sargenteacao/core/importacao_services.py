@@ -0,0 +1,285 @@
+"""
+Serviços de importação/sincronização em lote de militares a partir de CSV.
+
+O arquivo é lido por completo (para que a gravação possa ser repetida se o
+banco estiver bloqueado) e processado em lotes (chunks). Cada lote faz
+um número constante de idas ao banco: uma consulta para carregar os registros
+existentes (usada para calcular as diferenças) e um único ``bulk_create`` com
+``update_conflicts`` (upsert) sobre a chave natural ``(nome, subunidade)``.
+No PostgreSQL (psycopg 3) o upsert usa ``COPY`` para uma tabela temporária.
+"""
+import csv
+import itertools
+import unicodedata
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import connection, transaction
+
+from .models import Militar
+from .resumo_services import atualizar_total_militares_resumo
+from .utils.busca import chave_busca
+from .services import invalidar_cache_militares
+from .utils.db import repetir_em_bloqueio, suporta_copy
+
+
+# Tamanho padrão do lote de upsert
+CHUNK_SIZE_IMPORTACAO = 500
+
+# Colunas obrigatórias do CSV (cabeçalho normalizado, sem acentos)
+COLUNAS_IMPORTACAO = ('nome', 'graduacao', 'subunidade', 'ativo')
+
+# Campos atualizados quando o militar já existe
+CAMPOS_ATUALIZAVEIS = ('graduacao', 'ativo')
+
+VALORES_VERDADEIROS = {'1', 's', 'sim', 'true', 't', 'x', 'ativo', 'y', 'yes'}
+VALORES_FALSOS = {'0', 'n', 'nao', 'false', 'f', 'inativo', 'no', ''}
+
+
+def _sem_acentos(texto: str) -> str:
+    """Remove acentos e normaliza para minúsculas."""
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).strip().lower()
+
+
+# Aceita tanto o código ('3SG') quanto o rótulo ('3º Sargento')
+_GRADUACOES_POR_CHAVE = {}
+for _codigo, _rotulo in Militar.GRADUACOES_CHOICES:
+    _GRADUACOES_POR_CHAVE[_sem_acentos(_codigo)] = _codigo
+    _GRADUACOES_POR_CHAVE[_sem_acentos(_rotulo)] = _codigo
+
+
+def normalizar_graduacao(valor: str) -> Optional[str]:
+    """
+    Valida uma graduação contra ``Militar.GRADUACOES_CHOICES``.
+
+    Args:
+        valor: Código ou rótulo da graduação
+
+    Returns:
+        Código da graduação ou None se inválida
+    """
+    return _GRADUACOES_POR_CHAVE.get(_sem_acentos(valor or ''))
+
+
+def normalizar_ativo(valor: str) -> Optional[bool]:
+    """
+    Converte o valor textual da coluna ``ativo`` em booleano.
+
+    Returns:
+        True/False, ou None se o valor não for reconhecido
+    """
+    chave = _sem_acentos(valor or '')
+    if chave in VALORES_VERDADEIROS:
+        return True
+    if chave in VALORES_FALSOS:
+        return False
+    return None
+
+
+def ler_csv_militares(linhas: Iterable[str]) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    Lê o CSV em streaming, validando cada linha.
+
+    O delimitador (``,`` ou ``;``) é detectado a partir do cabeçalho.
+
+    Args:
+        linhas: Iterável de linhas de texto (arquivo aberto, por exemplo)
+
+    Yields:
+        Tuplas (número_da_linha, dados, erro) - ``dados`` é None quando há erro
+    """
+    linhas = iter(linhas)
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return
+
+    delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    reader = csv.reader(itertools.chain([cabecalho], linhas), delimiter=delimitador)
+    colunas = [_sem_acentos(c) for c in next(reader)]
+
+    faltando = [c for c in COLUNAS_IMPORTACAO if c not in colunas]
+    if faltando:
+        yield 1, None, f'Colunas obrigatórias ausentes: {", ".join(faltando)}'
+        return
+
+    indices = {c: colunas.index(c) for c in COLUNAS_IMPORTACAO}
+
+    for numero, registro in enumerate(reader, start=2):
+        if not any(campo.strip() for campo in registro):
+            continue
+        if len(registro) < len(colunas):
+            registro = registro + [''] * (len(colunas) - len(registro))
+
+        nome = registro[indices['nome']].strip()
+        subunidade = registro[indices['subunidade']].strip() or 'Geral'
+        graduacao = normalizar_graduacao(registro[indices['graduacao']])
+        ativo = normalizar_ativo(registro[indices['ativo']])
+
+        if not nome:
+            yield numero, None, 'Nome é obrigatório.'
+        elif graduacao is None:
+            yield numero, None, f'Graduação inválida: "{registro[indices["graduacao"]].strip()}".'
+        elif ativo is None:
+            yield numero, None, f'Valor de ativo inválido: "{registro[indices["ativo"]].strip()}".'
+        else:
+            yield numero, {
+                'nome': nome,
+                'graduacao': graduacao,
+                'subunidade': subunidade,
+                'ativo': ativo,
+            }, None
+
+
+def _sincronizar_lote(lote: Dict[Tuple[str, str], Dict], relatorio: Dict[str, Any], dry_run: bool) -> None:
+    """
+    Aplica um lote de registros com upsert.
+
+    Faz exatamente uma consulta de leitura e, se houver alterações, um
+    único ``bulk_create(update_conflicts=True)``.
+    """
+    nomes = {nome for nome, _subunidade in lote}
+    existentes = {
+        (m['nome'], m['subunidade']): m
+        for m in Militar.objects.filter(nome__in=nomes).values('nome', 'subunidade', *CAMPOS_ATUALIZAVEIS)
+        if (m['nome'], m['subunidade']) in lote
+    }
+
+    a_gravar = []
+    for chave, dados in lote.items():
+        atual = existentes.get(chave)
+        if atual is None:
+            relatorio['criados'] += 1
+            relatorio['diferencas'].append({
+                'acao': 'criado',
+                'nome': dados['nome'],
+                'subunidade': dados['subunidade'],
+                'alteracoes': {campo: [None, dados[campo]] for campo in CAMPOS_ATUALIZAVEIS},
+            })
+            a_gravar.append(Militar(**dados, nome_busca=chave_busca(dados['nome'])[:100]))
+            continue
+
+        alteracoes = {
+            campo: [atual[campo], dados[campo]]
+            for campo in CAMPOS_ATUALIZAVEIS
+            if atual[campo] != dados[campo]
+        }
+        if not alteracoes:
+            relatorio['inalterados'] += 1
+            continue
+
+        relatorio['atualizados'] += 1
+        relatorio['diferencas'].append({
+            'acao': 'atualizado',
+            'nome': dados['nome'],
+            'subunidade': dados['subunidade'],
+            'alteracoes': alteracoes,
+        })
+        a_gravar.append(Militar(**dados, nome_busca=chave_busca(dados['nome'])[:100]))
+
+    if a_gravar and not dry_run:
+        if suporta_copy():
+            _upsert_via_copy(a_gravar)
+        else:
+            Militar.objects.bulk_create(
+                a_gravar,
+                update_conflicts=True,
+                unique_fields=['nome', 'subunidade'],
+                update_fields=list(CAMPOS_ATUALIZAVEIS),
+            )
+
+
+def _upsert_via_copy(militares: List[Militar]) -> None:
+    """
+    Upsert via ``COPY`` (PostgreSQL com psycopg 3).
+
+    O lote é carregado com ``COPY FROM STDIN`` em uma tabela temporária
+    (descartada no commit) e aplicado com um único
+    ``INSERT ... ON CONFLICT (nome, subunidade) DO UPDATE``.
+    """
+    tabela = Militar._meta.db_table
+    colunas = ('nome', 'graduacao', 'subunidade', 'ativo', 'nome_busca')
+    atualizacoes = ', '.join(f'{campo} = EXCLUDED.{campo}' for campo in CAMPOS_ATUALIZAVEIS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS tmp_importacao_militares '
+            '(nome varchar(100), graduacao varchar(20), subunidade varchar(50), ativo boolean, nome_busca varchar(100)) '
+            'ON COMMIT DROP'
+        )
+        cursor.execute('TRUNCATE tmp_importacao_militares')
+        with cursor.cursor.copy(
+            f'COPY tmp_importacao_militares ({", ".join(colunas)}) FROM STDIN'
+        ) as copia:
+            for militar in militares:
+                copia.write_row(tuple(getattr(militar, campo) for campo in colunas))
+        cursor.execute(
+            f'INSERT INTO {tabela} ({", ".join(colunas)}) '
+            f'SELECT {", ".join(colunas)} FROM tmp_importacao_militares '
+            f'ON CONFLICT (nome, subunidade) DO UPDATE SET {atualizacoes}'
+        )
+
+
+def importar_militares_csv(linhas: Iterable[str], chunk_size: int = CHUNK_SIZE_IMPORTACAO,
+                           dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Importa/sincroniza militares a partir de um CSV (nome, graduação, subunidade, ativo).
+
+    Militares são identificados por ``(nome, subunidade)``: os novos são
+    criados e os existentes têm graduação/ativo atualizados. A importação
+    inteira roda em uma transação; linhas inválidas são ignoradas e
+    reportadas em ``erros``.
+
+    O CSV é lido por completo antes da transação: se o banco estiver
+    bloqueado, a gravação é repetida com os mesmos registros (``linhas``
+    pode ser um arquivo, que só é percorrido uma vez), e erros de
+    decodificação surgem antes de qualquer gravação.
+
+    Args:
+        linhas: Iterável de linhas do CSV
+        chunk_size: Quantidade de registros por lote de upsert
+        dry_run: Se True, apenas calcula as diferenças sem gravar
+
+    Returns:
+        Dicionário com contagens, erros por linha e diferenças aplicadas
+    """
+    registros = []
+    erros = []
+    for numero, dados, erro in ler_csv_militares(linhas):
+        if erro:
+            erros.append({'linha': numero, 'erro': erro})
+        else:
+            registros.append(dados)
+    return _gravar_importacao(registros, erros, chunk_size, dry_run)
+
+
+@repetir_em_bloqueio()
+def _gravar_importacao(registros: List[Dict], erros: List[Dict], chunk_size: int,
+                       dry_run: bool) -> Dict[str, Any]:
+    """Aplica os registros já lidos em lotes, em uma transação (repetida se o banco estiver bloqueado)."""
+    relatorio = {
+        'criados': 0,
+        'atualizados': 0,
+        'inalterados': 0,
+        'erros': list(erros),
+        'diferencas': [],
+        'dry_run': dry_run,
+    }
+
+    # Linhas repetidas em qualquer ponto do arquivo: a última prevalece (cada
+    # militar entra em um único lote e é contado uma vez)
+    unicos = {}
+    for dados in registros:
+        unicos[(dados['nome'], dados['subunidade'])] = dados
+    chaves = list(unicos)
+
+    with transaction.atomic():
+        for inicio in range(0, len(chaves), chunk_size):
+            lote = {chave: unicos[chave] for chave in chaves[inicio:inicio + chunk_size]}
+            _sincronizar_lote(lote, relatorio, dry_run)
+
+    if not dry_run and (relatorio['criados'] or relatorio['atualizados']):
+        # O upsert em lote não dispara sinais (o efetivo em cache guarda a
+        # lista de militares ativos; o resumo diário, o total de militares)
+        invalidar_cache_militares()
+        atualizar_total_militares_resumo()
+
+    return relatorio
@@ -0,0 +1,92 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+
+from core.benchmark_services import (
+    ESCALAS_PADRAO,
+    REPETICOES_PADRAO,
+    TOLERANCIA_REGRESSAO,
+    comparar_resultados,
+    executar_benchmark,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede serviços, PDFs e views com dados sintéticos em várias escalas e salva o resultado em JSON. '
+        'Roda em um banco de teste descartável.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escalas', default=','.join(str(e) for e in ESCALAS_PADRAO),
+            help='Quantidades de militares separadas por vírgula (padrão: 100,1000,10000)'
+        )
+        parser.add_argument('--repeticoes', type=int, default=REPETICOES_PADRAO, help='Execuções por cenário')
+        parser.add_argument('--anos', type=int, default=1, help='Anos de histórico por escala')
+        parser.add_argument('--semente', type=int, default=42, help='Semente dos dados sintéticos')
+        parser.add_argument('--saida', help='Arquivo JSON de saída (padrão: benchmarks/benchmark_<data>.json)')
+        parser.add_argument('--comparar', help='JSON de uma execução anterior para apontar regressões')
+        parser.add_argument(
+            '--tolerancia', type=float, default=TOLERANCIA_REGRESSAO,
+            help=f'Aumento relativo da mediana considerado regressão (padrão: {TOLERANCIA_REGRESSAO})'
+        )
+        parser.add_argument(
+            '--falhar-em-regressao', action='store_true',
+            help='Termina com erro se houver regressão em relação a --comparar'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            escalas = [int(e) for e in options['escalas'].split(',') if e.strip()]
+        except ValueError:
+            raise CommandError('--escalas deve conter apenas números separados por vírgula.')
+        if not escalas or min(escalas) < 1 or options['repeticoes'] < 1:
+            raise CommandError('Informe escalas e repetições maiores que zero.')
+
+        anterior = None
+        if options['comparar']:
+            try:
+                anterior = json.loads(Path(options['comparar']).read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Não foi possível ler {options["comparar"]}: {e}')
+
+        # Banco de teste descartável: os dados reais nunca são tocados
+        configuracao = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            resultado = executar_benchmark(
+                escalas=escalas,
+                repeticoes=options['repeticoes'],
+                anos=options['anos'],
+                semente=options['semente'],
+                registrar=self.stdout.write,
+            )
+        finally:
+            teardown_databases(configuracao, verbosity=0)
+
+        saida = Path(options['saida'] or Path(settings.BASE_DIR) / 'benchmarks' / time.strftime('benchmark_%Y%m%d_%H%M%S.json'))
+        saida.parent.mkdir(parents=True, exist_ok=True)
+        saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Resultado salvo em {saida}'))
+
+        if anterior is None:
+            return
+
+        regressoes = 0
+        for item in comparar_resultados(anterior, resultado, options['tolerancia']):
+            linha = (
+                f"[{item['escala']}] {item['cenario']}: {item['antes_ms']:.1f} -> {item['depois_ms']:.1f} ms "
+                f"({item['variacao']:+.0%}), consultas {item['consultas_antes']} -> {item['consultas_depois']}"
+            )
+            if item['regressao']:
+                regressoes += 1
+                self.stdout.write(self.style.ERROR(f'REGRESSÃO {linha}'))
+            else:
+                self.stdout.write(linha)
+
+        if regressoes and options['falhar_em_regressao']:
+            raise CommandError(f'{regressoes} regressão(ões) em relação a {options["comparar"]}.')
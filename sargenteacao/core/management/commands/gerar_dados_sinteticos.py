@@ -0,0 +1,61 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sinteticos_services import (
+    SUBUNIDADES_PADRAO,
+    TAXA_SERVICO_DIARIA,
+    gerar_dados_sinteticos,
+    limpar_dados_escala,
+)
+
+
+class Command(BaseCommand):
+    help = 'Gera militares, serviços e afastamentos sintéticos respeitando as regras da escala.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--militares', type=int, default=100, help='Quantidade de militares (padrão: 100)')
+        parser.add_argument('--anos', type=int, default=1, help='Anos de histórico de serviços (padrão: 1)')
+        parser.add_argument('--fim', help='Último dia do histórico (AAAA-MM-DD, padrão: hoje)')
+        parser.add_argument(
+            '--subunidades', default=','.join(SUBUNIDADES_PADRAO),
+            help='Subunidades separadas por vírgula'
+        )
+        parser.add_argument(
+            '--taxa-servico', type=float, default=TAXA_SERVICO_DIARIA,
+            help=f'Fração do efetivo escalada por dia (padrão: {TAXA_SERVICO_DIARIA})'
+        )
+        parser.add_argument('--semente', type=int, help='Semente aleatória (dados reproduzíveis)')
+        parser.add_argument(
+            '--limpar', action='store_true',
+            help='Remove TODOS os militares, serviços e afastamentos antes de gerar'
+        )
+
+    def handle(self, *args, **options):
+        if options['militares'] < 1 or options['anos'] < 1:
+            raise CommandError('--militares e --anos devem ser maiores que zero.')
+        try:
+            fim = date.fromisoformat(options['fim']) if options['fim'] else None
+        except ValueError:
+            raise CommandError('--fim deve estar no formato AAAA-MM-DD.')
+        subunidades = [s.strip() for s in options['subunidades'].split(',') if s.strip()]
+        if not subunidades:
+            raise CommandError('Informe ao menos uma subunidade.')
+
+        if options['limpar']:
+            limpar_dados_escala()
+
+        inicio = time.perf_counter()
+        resultado = gerar_dados_sinteticos(
+            militares=options['militares'],
+            anos=options['anos'],
+            fim=fim,
+            subunidades=subunidades,
+            taxa_servico=options['taxa_servico'],
+            semente=options['semente'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Militares: {resultado['militares']} | Serviços: {resultado['servicos']} | "
+            f"Afastamentos: {resultado['afastamentos']} | {time.perf_counter() - inicio:.1f}s"
+        ))
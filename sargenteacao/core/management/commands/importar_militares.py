@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importacao_services import CHUNK_SIZE_IMPORTACAO, importar_militares_csv
+
+
+class Command(BaseCommand):
+    help = 'Importa/sincroniza militares a partir de um CSV (nome, graduação, subunidade, ativo).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo CSV')
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE_IMPORTACAO,
+            help=f'Registros por lote de upsert (padrão: {CHUNK_SIZE_IMPORTACAO})'
+        )
+        parser.add_argument('--encoding', default='utf-8-sig', help='Codificação do arquivo')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas mostra as diferenças, sem gravar')
+        parser.add_argument('--diff', action='store_true', help='Lista cada militar criado/atualizado')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size deve ser maior que zero.')
+
+        try:
+            with open(options['arquivo'], encoding=options['encoding'], newline='') as arquivo:
+                relatorio = importar_militares_csv(
+                    arquivo,
+                    chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'],
+                )
+        except OSError as e:
+            raise CommandError(f'Não foi possível ler o arquivo: {e}')
+        except UnicodeDecodeError:
+            raise CommandError(
+                f"O arquivo não está em {options['encoding']}: informe a codificação com --encoding "
+                '(ex.: --encoding latin-1).'
+            )
+
+        if options['diff']:
+            for item in relatorio['diferencas']:
+                alteracoes = ', '.join(
+                    f'{campo}: {antes} -> {depois}' for campo, (antes, depois) in item['alteracoes'].items()
+                )
+                self.stdout.write(f"[{item['acao']}] {item['nome']} ({item['subunidade']}) {alteracoes}")
+
+        for erro in relatorio['erros']:
+            self.stderr.write(f"Linha {erro['linha']}: {erro['erro']}")
+
+        prefixo = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefixo}Criados: {relatorio['criados']} | Atualizados: {relatorio['atualizados']} | "
+            f"Inalterados: {relatorio['inalterados']} | Erros: {len(relatorio['erros'])}"
+        ))
@@ -0,0 +1,37 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from core.models import ResumoDiario
+from core.resumo_services import reconstruir_resumos
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula o resumo diário do dashboard a partir do banco. '
+        'Padrão: todas as datas que já têm resumo, incluindo hoje.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Primeira data (AAAA-MM-DD)')
+        parser.add_argument('--fim', help='Última data (AAAA-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            inicio = datetime.strptime(options['inicio'], '%Y-%m-%d').date() if options['inicio'] else None
+            fim = datetime.strptime(options['fim'], '%Y-%m-%d').date() if options['fim'] else None
+        except ValueError:
+            raise CommandError('Use datas no formato AAAA-MM-DD.')
+
+        hoje = date.today()
+        existentes = ResumoDiario.objects.aggregate(primeira=Min('data'), ultima=Max('data'))
+        inicio = inicio or min(existentes['primeira'] or hoje, hoje)
+        fim = fim or max(existentes['ultima'] or hoje, hoje)
+        if inicio > fim:
+            raise CommandError('--inicio deve ser anterior ou igual a --fim.')
+
+        total = reconstruir_resumos(inicio, fim)
+        self.stdout.write(self.style.SUCCESS(
+            f'Resumo diário reconstruído: {total} datas ({inicio:%d/%m/%Y} a {fim:%d/%m/%Y}).'
+        ))
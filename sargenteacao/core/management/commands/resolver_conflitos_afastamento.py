@@ -0,0 +1,51 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.conflitos_services import aplicar_substituicoes, detectar_conflitos, propor_substituicoes
+
+
+class Command(BaseCommand):
+    help = (
+        'Varre a escala futura em busca de serviços dentro de afastamentos e '
+        'propõe substitutos (com --aplicar, grava as trocas em uma transação). '
+        'Pensado para execução periódica (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Primeira data considerada (AAAA-MM-DD, padrão hoje)')
+        parser.add_argument('--aplicar', action='store_true', help='Grava as substituições propostas')
+
+    def handle(self, *args, **options):
+        try:
+            desde = datetime.strptime(options['desde'], '%Y-%m-%d').date() if options['desde'] else date.today()
+        except ValueError:
+            raise CommandError('Use datas no formato AAAA-MM-DD.')
+
+        propostas = propor_substituicoes(detectar_conflitos(inicio=desde))
+        if not propostas:
+            self.stdout.write(self.style.SUCCESS(f'Nenhum conflito a partir de {desde:%d/%m/%Y}.'))
+            return
+
+        for proposta in propostas:
+            servico, substituto = proposta['servico'], proposta['substituto']
+            self.stdout.write(
+                f'{servico.data:%d/%m/%Y} {servico.get_tipo_display()}: {servico.militar.nome} -> '
+                f'{substituto.nome if substituto else "sem substituto"}'
+            )
+        sem_substituto = sum(1 for p in propostas if p['substituto'] is None)
+
+        if not options['aplicar']:
+            self.stdout.write(self.style.WARNING(
+                f'{len(propostas)} conflitos ({sem_substituto} sem substituto). Use --aplicar para gravar.'
+            ))
+            return
+
+        resultado = aplicar_substituicoes(propostas)
+        if resultado['erros']:
+            for erro in resultado['erros']:
+                self.stderr.write(f"{erro['data']:%d/%m/%Y}: {erro.get('erro')}")
+            raise CommandError('Nenhuma substituição gravada.')
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(resultado['substituidos'])} serviços substituídos ({sem_substituto} sem substituto)."
+        ))
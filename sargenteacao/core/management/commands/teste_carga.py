@@ -0,0 +1,95 @@
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.carga_services import (
+    DURACAO_PADRAO,
+    PAUSA_PADRAO,
+    PREFIXO_USUARIO,
+    RAMPA_PADRAO,
+    USUARIOS_PADRAO,
+    executar_carga,
+    preparar_usuarios_carga,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Simula o pico de registro de serviços da manhã contra um servidor em execução '
+        '(login, efetivo, registro, aditamento) e reporta throughput, p50/p95/p99 e taxas '
+        'de bloqueio/erro por endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Endereço do servidor')
+        parser.add_argument('--usuarios', type=int, default=USUARIOS_PADRAO, help='Usuários simultâneos')
+        parser.add_argument('--duracao', type=float, default=DURACAO_PADRAO, help='Duração em segundos')
+        parser.add_argument('--rampa', type=float, default=RAMPA_PADRAO,
+                            help='Segundos até todos os usuários estarem ativos')
+        parser.add_argument('--pausa', type=float, default=PAUSA_PADRAO,
+                            help='Pausa média entre ações de um usuário (segundos)')
+        parser.add_argument('--data', help='Data da escala (AAAA-MM-DD, padrão: hoje)')
+        parser.add_argument('--prefixo', default=PREFIXO_USUARIO,
+                            help='Prefixo dos usuários de teste (<prefixo>01, <prefixo>02...)')
+        parser.add_argument('--senha', default='carga123', help='Senha dos usuários de teste')
+        parser.add_argument(
+            '--preparar', action='store_true',
+            help='Cria/atualiza os usuários de teste (grupo Sargenteante) no banco configurado antes de iniciar'
+        )
+        parser.add_argument('--semente', type=int, help='Semente das escolhas aleatórias')
+        parser.add_argument('--saida', help='Arquivo JSON com o resultado')
+
+    def handle(self, *args, **options):
+        if options['usuarios'] < 1 or options['duracao'] <= 0:
+            raise CommandError('Informe usuários e duração maiores que zero.')
+        try:
+            data_ref = datetime.strptime(options['data'], '%Y-%m-%d').date() if options['data'] else None
+        except ValueError:
+            raise CommandError('--data deve estar no formato AAAA-MM-DD.')
+
+        if options['preparar']:
+            usuarios = preparar_usuarios_carga(options['usuarios'], options['senha'], options['prefixo'])
+            self.stdout.write(f'{len(usuarios)} usuários de teste preparados.')
+        else:
+            usuarios = [f"{options['prefixo']}{i:02d}" for i in range(1, options['usuarios'] + 1)]
+
+        resultado = executar_carga(
+            options['url'],
+            usuarios,
+            options['senha'],
+            duracao=options['duracao'],
+            rampa=options['rampa'],
+            pausa=options['pausa'],
+            data_ref=data_ref,
+            semente=options['semente'],
+            registrar=self.stdout.write,
+        )
+
+        self.stdout.write(
+            f"{'endpoint':<24}{'req':>7}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'bloq.':>8}{'erro':>8}"
+        )
+        for endpoint, dados in resultado['endpoints'].items():
+            linha = (
+                f"{endpoint:<24}{dados['requisicoes']:>7}{dados['throughput_rps'] or 0:>8.2f}"
+                f"{dados['p50_ms'] or 0:>9.1f}{dados['p95_ms'] or 0:>9.1f}{dados['p99_ms'] or 0:>9.1f}"
+                f"{dados['taxa_bloqueio']:>8.1%}{dados['taxa_erro']:>8.1%}"
+            )
+            if dados['erros'] or dados['bloqueios']:
+                linha = self.style.ERROR(linha)
+            elif endpoint == 'TOTAL':
+                linha = self.style.SUCCESS(linha)
+            self.stdout.write(linha)
+
+        if resultado['endpoints'].get('login', {}).get('erros'):
+            self.stdout.write(self.style.WARNING(
+                'Houve falhas de login: use --preparar ou confira --prefixo/--senha.'
+            ))
+
+        saida = Path(options['saida'] or Path(settings.BASE_DIR) / 'benchmarks' / time.strftime('carga_%Y%m%d_%H%M%S.json'))
+        saida.parent.mkdir(parents=True, exist_ok=True)
+        saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Resultado salvo em {saida}'))
@@ -0,0 +1,74 @@
+import csv
+import json
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.consistencia_services import CAMPOS_VIOLACAO, REGRAS, verificar_consistencia
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifica as regras da escala em todo o histórico de serviços e afastamentos '
+        '(serviço durante afastamento, dias seguidos, graduação, afastamentos sobrepostos '
+        'e cargos especiais repetidos) e grava as violações em CSV ou JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=['csv', 'json'], default='csv')
+        parser.add_argument('--saida', help='Arquivo de saída (padrão: saída padrão)')
+        parser.add_argument('--inicio', help='Primeira data (AAAA-MM-DD)')
+        parser.add_argument('--fim', help='Última data (AAAA-MM-DD)')
+        parser.add_argument(
+            '--regra', action='append', choices=REGRAS, dest='regras',
+            help='Regra a verificar (pode repetir; padrão: todas)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            inicio = datetime.strptime(options['inicio'], '%Y-%m-%d').date() if options['inicio'] else None
+            fim = datetime.strptime(options['fim'], '%Y-%m-%d').date() if options['fim'] else None
+        except ValueError:
+            raise CommandError('Use datas no formato AAAA-MM-DD.')
+
+        violacoes = verificar_consistencia(inicio, fim, options['regras'] or REGRAS)
+        if options['saida']:
+            destino = open(options['saida'], 'w', encoding='utf-8', newline='')
+        else:
+            # As linhas já trazem a quebra de linha
+            destino = self.stdout
+            destino.ending = ''
+        comeco = time.perf_counter()
+        try:
+            totais = self._gravar(violacoes, destino, options['formato'])
+        finally:
+            if options['saida']:
+                destino.close()
+        decorrido = time.perf_counter() - comeco
+
+        # Resumo separado dos dados (stderr quando os dados vão para a saída padrão)
+        resumo = self.stdout if options['saida'] else self.stderr
+        detalhes = ', '.join(f'{regra}: {total}' for regra, total in sorted(totais.items()))
+        resumo.write(
+            f'{sum(totais.values())} violações em {decorrido:.2f}s' + (f' ({detalhes})' if detalhes else '') + '.'
+        )
+
+    def _gravar(self, violacoes, destino, formato):
+        """Grava as violações à medida que são encontradas; retorna o total por regra."""
+        totais = Counter()
+        if formato == 'csv':
+            escritor = csv.DictWriter(destino, fieldnames=CAMPOS_VIOLACAO)
+            escritor.writeheader()
+            for violacao in violacoes:
+                totais[violacao['regra']] += 1
+                escritor.writerow({**violacao, 'data': violacao['data'].isoformat()})
+        else:
+            destino.write('[')
+            for violacao in violacoes:
+                destino.write(',\n' if totais else '\n')
+                totais[violacao['regra']] += 1
+                json.dump({**violacao, 'data': violacao['data'].isoformat()}, destino, ensure_ascii=False)
+            destino.write('\n]\n' if totais else ']\n')
+        return totais
@@ -0,0 +1,166 @@
+"""
+Métricas de desempenho no formato do Prometheus (``prometheus_client``).
+
+Cobre latência das requisições por view, consultas SQL por requisição,
+acertos/erros e tempo de recálculo do cache, tempo e tamanho dos PDFs e
+tempo das operações de escala (registro e edição em lote).
+
+Com vários processos (gunicorn), defina ``PROMETHEUS_MULTIPROC_DIR`` com um
+diretório vazio e gravável: cada worker grava suas métricas em arquivos
+nesse diretório e ``/metrics`` agrega todos (ver ``gunicorn.conf.py``).
+"""
+import functools
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+# Buckets (segundos) para requisições, PDFs e operações de escala
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250)
+
+BUCKETS_BYTES = (1_000, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 500_000, 1_000_000)
+
+VIEW_NAO_RESOLVIDA = '<nao_resolvida>'
+
+
+REQUISICAO_SEGUNDOS = Histogram(
+    'sargenteacao_requisicao_segundos', 'Latência das requisições por view',
+    ['view', 'metodo', 'status'], buckets=BUCKETS_LATENCIA,
+)
+CONSULTAS_POR_REQUISICAO = Histogram(
+    'sargenteacao_db_consultas_por_requisicao', 'Consultas SQL executadas por requisição',
+    ['view'], buckets=BUCKETS_CONSULTAS,
+)
+DB_SEGUNDOS_POR_REQUISICAO = Histogram(
+    'sargenteacao_db_segundos_por_requisicao', 'Tempo em consultas SQL por requisição',
+    ['view'], buckets=BUCKETS_LATENCIA,
+)
+CACHE_CONSULTAS = Counter(
+    'sargenteacao_cache_consultas', 'Leituras de cache por função (resultado: acerto ou erro)',
+    ['funcao', 'resultado'],
+)
+CACHE_RECALCULO_SEGUNDOS = Histogram(
+    'sargenteacao_cache_recalculo_segundos', 'Tempo de recálculo de valores em cache',
+    ['funcao'], buckets=BUCKETS_LATENCIA,
+)
+PDF_SEGUNDOS = Histogram(
+    'sargenteacao_pdf_geracao_segundos', 'Tempo de geração dos PDFs',
+    ['documento'], buckets=BUCKETS_LATENCIA,
+)
+PDF_BYTES = Histogram(
+    'sargenteacao_pdf_bytes', 'Tamanho dos PDFs gerados',
+    ['documento'], buckets=BUCKETS_BYTES,
+)
+ESCALA_SEGUNDOS = Histogram(
+    'sargenteacao_escala_operacao_segundos', 'Tempo das operações de escala (registro/edição em lote)',
+    ['operacao'], buckets=BUCKETS_LATENCIA,
+)
+
+
+# ==================== CONSULTAS SQL POR REQUISIÇÃO ====================
+
+# [consultas, segundos] da requisição em andamento (propaga para as threads
+# de sync_to_async, pois asgiref copia o contexto)
+_consultas_requisicao: ContextVar[Optional[list]] = ContextVar('consultas_requisicao', default=None)
+
+
+def contar_consulta(execute, sql, params, many, context):
+    """``execute_wrapper`` instalado em toda conexão (ver ``CoreConfig.ready``)."""
+    acumulado = _consultas_requisicao.get()
+    if acumulado is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        acumulado[0] += 1
+        acumulado[1] += time.perf_counter() - inicio
+
+
+def instalar_contador_consultas(sender, connection, **kwargs):
+    """Receptor de ``connection_created``: instala ``contar_consulta`` na conexão."""
+    if contar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(contar_consulta)
+
+
+def iniciar_requisicao():
+    """Começa a contar as consultas da requisição; retorna o token do contexto."""
+    return _consultas_requisicao.set([0, 0.0])
+
+
+def finalizar_requisicao(token, request, response, inicio: float) -> None:
+    """Registra latência e consultas da requisição iniciada com ``iniciar_requisicao``."""
+    consultas, segundos_db = _consultas_requisicao.get()
+    _consultas_requisicao.reset(token)
+    match = getattr(request, 'resolver_match', None)
+    view = (match.view_name if match else None) or VIEW_NAO_RESOLVIDA
+    REQUISICAO_SEGUNDOS.labels(view, request.method, str(response.status_code)).observe(time.perf_counter() - inicio)
+    CONSULTAS_POR_REQUISICAO.labels(view).observe(consultas)
+    DB_SEGUNDOS_POR_REQUISICAO.labels(view).observe(segundos_db)
+
+
+# ==================== CACHE, PDFs E ESCALA ====================
+
+def observar_cache(funcao: str, acerto: bool, tempo_calculo: Optional[float] = None) -> None:
+    """Registra uma leitura de cache e, se houve recálculo, o tempo gasto."""
+    CACHE_CONSULTAS.labels(funcao, 'acerto' if acerto else 'erro').inc()
+    if tempo_calculo is not None:
+        CACHE_RECALCULO_SEGUNDOS.labels(funcao).observe(tempo_calculo)
+
+
+def medir_pdf(documento: str):
+    """Decorator para geradores de PDF que retornam ``HttpResponse``: mede tempo e tamanho."""
+    def decorator(func: Callable):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            inicio = time.perf_counter()
+            response = func(*args, **kwargs)
+            PDF_SEGUNDOS.labels(documento).observe(time.perf_counter() - inicio)
+            PDF_BYTES.labels(documento).observe(len(response.content))
+            return response
+        return wrapper
+    return decorator
+
+
+def medir_escala(operacao: str):
+    """Decorator que mede o tempo de uma operação de escala."""
+    def decorator(func: Callable):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with ESCALA_SEGUNDOS.labels(operacao).time():
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ==================== EXPOSIÇÃO ====================
+
+def gerar_metricas() -> tuple:
+    """
+    Gera o texto de exposição do Prometheus.
+
+    Com ``PROMETHEUS_MULTIPROC_DIR`` definido, agrega as métricas de todos
+    os processos; senão, expõe as do processo atual.
+
+    Returns:
+        Tupla (conteúdo em bytes, content-type)
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
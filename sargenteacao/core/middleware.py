@@ -0,0 +1,108 @@
+"""
+Middlewares do app core.
+"""
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .metricas import finalizar_requisicao, iniciar_requisicao
+from .perfilamento import modo_perfilamento, perfilar_requisicao
+from .utils.db import erro_de_bloqueio
+
+
+# Segundos sugeridos ao cliente antes de tentar novamente
+RETRY_AFTER_BLOQUEIO = 1
+
+
+class BancoBloqueadoMiddleware(MiddlewareMixin):
+    """
+    Responde ``503 Service Unavailable`` (com ``Retry-After``) quando a view
+    falha por lock do banco mesmo após as novas tentativas de
+    ``repetir_em_bloqueio``, em vez de um 500 genérico.
+
+    O cabeçalho ``X-Banco-Bloqueado`` permite distinguir esses casos de
+    outros erros (usado pelo teste de carga para medir a taxa de bloqueios).
+    """
+
+    def process_exception(self, request, exception):
+        if not erro_de_bloqueio(exception):
+            return None
+        resposta = HttpResponse(
+            'Sistema ocupado, tente novamente em instantes.',
+            status=503,
+            content_type='text/plain; charset=utf-8',
+        )
+        resposta['Retry-After'] = str(RETRY_AFTER_BLOQUEIO)
+        resposta['X-Banco-Bloqueado'] = '1'
+        return resposta
+
+
+class PerfilamentoMiddleware:
+    """
+    Perfila uma requisição sob demanda (``?_perfil=`` ou ``X-Perfilar``),
+    apenas para administradores. Ver ``core.perfilamento``.
+
+    Com ``PERFILAMENTO_HABILITADO`` desligado o middleware é removido da
+    cadeia na inicialização (``MiddlewareNotUsed``).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFILAMENTO_HABILITADO:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        modo = modo_perfilamento(request)
+        if modo is None:
+            return self.get_response(request)
+        return perfilar_requisicao(request, self.get_response, modo)
+
+    async def __acall__(self, request):
+        modo = modo_perfilamento(request)
+        if modo is None:
+            return await self.get_response(request)
+        # O perfilamento roda em uma thread: a view síncrona executa nela
+        # (thread_sensitive), que é a thread amostrada
+        return await sync_to_async(perfilar_requisicao)(request, async_to_sync(self.get_response), modo)
+
+
+class MetricasMiddleware:
+    """
+    Registra latência, consultas SQL e tempo de banco de cada requisição,
+    rotulados pelo nome da view (ver ``core.metricas``).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        token = iniciar_requisicao()
+        response = self.get_response(request)
+        finalizar_requisicao(token, request, response, inicio)
+        return response
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        token = iniciar_requisicao()
+        response = await self.get_response(request)
+        finalizar_requisicao(token, request, response, inicio)
+        return response
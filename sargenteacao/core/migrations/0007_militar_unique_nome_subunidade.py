@@ -0,0 +1,54 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+# Duplicados listados na mensagem de erro (os demais são resumidos)
+LIMITE_DUPLICADOS_LISTADOS = 50
+
+
+def exigir_sem_duplicados(apps, schema_editor):
+    """
+    Militares repetidos (mesmo nome e subunidade) impediriam a constraint.
+
+    A migração não altera dados de pessoal: se houver repetidos, ela é
+    interrompida com a lista (nome, subunidade e IDs) para que um operador
+    os corrija pelo admin (unificando os registros ou distinguindo os
+    nomes) e rode ``migrate`` novamente.
+    """
+    Militar = apps.get_model('core', 'Militar')
+    repetidos = list(
+        Militar.objects.values('nome', 'subunidade')
+        .annotate(total=Count('id')).filter(total__gt=1)
+        .order_by('subunidade', 'nome')
+    )
+    if not repetidos:
+        return
+
+    linhas = []
+    for chave in repetidos[:LIMITE_DUPLICADOS_LISTADOS]:
+        ids = Militar.objects.filter(
+            nome=chave['nome'], subunidade=chave['subunidade']
+        ).order_by('id').values_list('id', flat=True)
+        linhas.append(f'  - {chave["nome"]} ({chave["subunidade"]}): IDs {", ".join(map(str, ids))}')
+    if len(repetidos) > LIMITE_DUPLICADOS_LISTADOS:
+        linhas.append(f'  ... e mais {len(repetidos) - LIMITE_DUPLICADOS_LISTADOS}')
+    raise RuntimeError(
+        f'{len(repetidos)} militar(es) repetido(s) por nome e subunidade impedem a restrição '
+        'unique_militar_nome_subunidade. Corrija-os pelo admin e rode migrate novamente:\n'
+        + '\n'.join(linhas)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_add_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(exigir_sem_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='militar',
+            constraint=models.UniqueConstraint(fields=('nome', 'subunidade'), name='unique_militar_nome_subunidade'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_militar_unique_nome_subunidade'),
+    ]
+
+    operations = [
+        # Index for Militar (subunidade, graduacao) - API list filters
+        migrations.AddIndex(
+            model_name='militar',
+            index=models.Index(fields=['subunidade', 'graduacao'], name='militar_sub_grad_idx'),
+        ),
+    ]
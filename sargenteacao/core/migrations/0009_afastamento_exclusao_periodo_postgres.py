@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+# Constraint de exclusão (somente PostgreSQL): um militar não pode ter dois
+# afastamentos com períodos sobrepostos. O índice GiST sobre
+# daterange(data_inicio, data_fim, '[]') também atende às consultas de
+# sobreposição de período. Em outros bancos a regra continua apenas na
+# validação do serializer.
+CONSTRAINT_NOME = 'afastamento_sem_sobreposicao'
+
+
+def criar_exclusao(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        f'ALTER TABLE core_afastamento ADD CONSTRAINT {CONSTRAINT_NOME} '
+        "EXCLUDE USING gist (militar_id WITH =, daterange(data_inicio, data_fim, '[]') WITH &&)"
+    )
+
+
+def remover_exclusao(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'ALTER TABLE core_afastamento DROP CONSTRAINT IF EXISTS {CONSTRAINT_NOME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_militar_sub_grad_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_exclusao, remover_exclusao),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_afastamento_exclusao_periodo_postgres'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(unique=True)),
+                ('total_militares', models.IntegerField(default=0)),
+                ('afastados', models.IntegerField(default=0)),
+                ('escalados', models.IntegerField(default=0)),
+                ('escalados_por_tipo', models.JSONField(default=dict)),
+                ('escalados_por_subunidade', models.JSONField(default=dict)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário',
+                'verbose_name_plural': 'Resumos Diários',
+                'ordering': ['-data'],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations, models
+
+from core.utils.busca import chave_busca
+
+
+# Índice trigram (somente PostgreSQL): atende também ao LIKE '% termo%' da
+# busca por palavra. O índice B-tree de nome_busca (com o índice "_like"
+# que o Django cria no PostgreSQL) atende à busca por prefixo.
+INDICE_TRGM = 'militar_nome_busca_trgm'
+
+
+def preencher_nome_busca(apps, schema_editor):
+    Militar = apps.get_model('core', 'Militar')
+    militares = list(Militar.objects.only('id', 'nome'))
+    for militar in militares:
+        militar.nome_busca = chave_busca(militar.nome)[:100]
+    Militar.objects.bulk_update(militares, ['nome_busca'], batch_size=500)
+
+
+def criar_indice_trgm(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDICE_TRGM} ON core_militar USING gin (nome_busca gin_trgm_ops)'
+    )
+
+
+def remover_indice_trgm(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDICE_TRGM}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_resumodiario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='militar',
+            name='nome_busca',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(preencher_nome_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice_trgm, remover_indice_trgm),
+    ]
@@ -0,0 +1,56 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Q
+
+
+def preencher_ultimos_servicos(apps, schema_editor):
+    # Ainda não há feriados: a escala vermelha são os sábados e domingos
+    Servico = apps.get_model('core', 'Servico')
+    UltimoServico = apps.get_model('core', 'UltimoServico')
+    vermelha = Q(data__week_day__in=(1, 7))
+    linhas = (
+        Servico.objects.order_by()
+        .values('militar_id')
+        .annotate(preta=Max('data', filter=~vermelha), vermelha=Max('data', filter=vermelha))
+        .values_list('militar_id', 'preta', 'vermelha')
+    )
+    UltimoServico.objects.bulk_create(
+        [UltimoServico(militar_id=militar_id, data_preta=preta, data_vermelha=verm) for militar_id, preta, verm in linhas],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_militar_nome_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feriado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(unique=True)),
+                ('descricao', models.CharField(blank=True, max_length=100)),
+            ],
+            options={
+                'verbose_name': 'Feriado',
+                'verbose_name_plural': 'Feriados',
+                'ordering': ['data'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UltimoServico',
+            fields=[
+                ('militar', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ultimo_servico', serialize=False, to='core.militar')),
+                ('data_preta', models.DateField(blank=True, null=True)),
+                ('data_vermelha', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Último Serviço',
+                'verbose_name_plural': 'Últimos Serviços',
+            },
+        ),
+        migrations.RunPython(preencher_ultimos_servicos, migrations.RunPython.noop),
+    ]
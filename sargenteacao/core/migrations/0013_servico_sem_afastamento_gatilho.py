@@ -0,0 +1,91 @@
+from django.db import migrations
+
+
+# Gatilho no banco: um serviço não pode ser gravado (ou movido, por troca de
+# militar ou de data) para um dia em que o militar está afastado. Com a regra
+# garantida pelo banco, caminhos que já validaram os dados podem gravar com
+# Servico.save(validar=False), em uma única instrução.
+#
+# A regra vale apenas para gravações de serviço: incluir um afastamento sobre
+# serviços já escalados continua permitido (os conflitos são listados e
+# resolvidos pelo fluxo de substituições). Atualizações que não trocam
+# militar nem data não são bloqueadas, para não travar dados antigos.
+#
+# A mensagem do erro é core.models.GATILHO_SERVICO_AFASTADO.
+GATILHO = 'servico_sem_afastamento'
+
+SQLITE_CONDICAO = (
+    'EXISTS (SELECT 1 FROM core_afastamento WHERE militar_id = NEW.militar_id '
+    'AND data_inicio <= NEW.data AND data_fim >= NEW.data)'
+)
+
+SQLITE_CRIAR = [
+    f'''
+    CREATE TRIGGER {GATILHO}_insert BEFORE INSERT ON core_servico
+    WHEN {SQLITE_CONDICAO}
+    BEGIN SELECT RAISE(ABORT, '{GATILHO}'); END
+    ''',
+    f'''
+    CREATE TRIGGER {GATILHO}_update BEFORE UPDATE OF militar_id, data ON core_servico
+    WHEN (NEW.militar_id IS NOT OLD.militar_id OR NEW.data IS NOT OLD.data) AND {SQLITE_CONDICAO}
+    BEGIN SELECT RAISE(ABORT, '{GATILHO}'); END
+    ''',
+]
+
+SQLITE_REMOVER = [
+    f'DROP TRIGGER IF EXISTS {GATILHO}_insert',
+    f'DROP TRIGGER IF EXISTS {GATILHO}_update',
+]
+
+POSTGRES_CRIAR = [
+    f'''
+    CREATE OR REPLACE FUNCTION core_{GATILHO}() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND NEW.militar_id = OLD.militar_id AND NEW.data = OLD.data THEN
+            RETURN NEW;
+        END IF;
+        IF EXISTS (
+            SELECT 1 FROM core_afastamento
+            WHERE militar_id = NEW.militar_id AND data_inicio <= NEW.data AND data_fim >= NEW.data
+        ) THEN
+            RAISE EXCEPTION '{GATILHO}' USING ERRCODE = 'check_violation';
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    ''',
+    f'''
+    CREATE TRIGGER {GATILHO} BEFORE INSERT OR UPDATE OF militar_id, data ON core_servico
+    FOR EACH ROW EXECUTE FUNCTION core_{GATILHO}()
+    ''',
+]
+
+POSTGRES_REMOVER = [
+    f'DROP TRIGGER IF EXISTS {GATILHO} ON core_servico',
+    f'DROP FUNCTION IF EXISTS core_{GATILHO}()',
+]
+
+
+def _executar(schema_editor, comandos):
+    vendor = schema_editor.connection.vendor
+    for sql in comandos.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def criar_gatilho(apps, schema_editor):
+    _executar(schema_editor, {'sqlite': SQLITE_CRIAR, 'postgresql': POSTGRES_CRIAR})
+
+
+def remover_gatilho(apps, schema_editor):
+    _executar(schema_editor, {'sqlite': SQLITE_REMOVER, 'postgresql': POSTGRES_REMOVER})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_feriado_ultimoservico'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_gatilho, remover_gatilho),
+    ]
@@ -1,8 +1,16 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.db.models import Q
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
+from .utils.busca import chave_busca
+
+
+# Mensagem do gatilho do banco que impede serviço durante afastamento
+# (migração 0013)
+GATILHO_SERVICO_AFASTADO = 'servico_sem_afastamento'
+MENSAGEM_SERVICO_AFASTADO = 'Não é possível registrar serviço para militar afastado.'
+
 
 class Militar(models.Model):
     GRADUACOES_CHOICES = [
@@ -26,6 +34,37 @@ class Militar(models.Model):
     graduacao = models.CharField(max_length=20, choices=GRADUACOES_CHOICES)
     subunidade = models.CharField(max_length=50)
     ativo = models.BooleanField(default=True)
+    # Nome sem acentos/minúsculo para as buscas (ver core.utils.busca);
+    # preenchido no save() e nas gravações em lote
+    nome_busca = models.CharField(max_length=100, default='', editable=False, db_index=True)
+
+    class Meta:
+        constraints = [
+            # Chave natural usada na importação/sincronização em lote (upsert)
+            models.UniqueConstraint(
+                fields=['nome', 'subunidade'],
+                name='unique_militar_nome_subunidade',
+            )
+        ]
+        indexes = [
+            # Filtros da API/listagens por subunidade e graduação
+            models.Index(fields=['subunidade', 'graduacao'], name='militar_sub_grad_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Subunidade como carregada do banco: se mudar, os escalados por
+        # subunidade do resumo diário precisam ser recontados
+        instance._subunidade_original = instance.__dict__.get('subunidade')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.nome_busca = chave_busca(self.nome)[:100]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nome' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nome_busca'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.nome} ({self.get_graduacao_display()})"
@@ -65,6 +104,14 @@ class Afastamento(models.Model):
         verbose_name = 'Afastamento'
         verbose_name_plural = 'Afastamentos'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Período como carregado do banco: numa edição, o resumo diário
+        # desconta o período anterior e soma o novo
+        instance._periodo_original = (instance.__dict__.get('data_inicio'), instance.__dict__.get('data_fim'))
+        return instance
+
     def __str__(self):
         return f'{self.militar.nome} - {self.tipo} ({self.data_inicio} a {self.data_fim})'
 
@@ -118,6 +165,14 @@ class Servico(models.Model):
         verbose_name = 'Serviço'
         verbose_name_plural = 'Serviços'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Militar/data como carregados do banco: numa edição, os caches da
+        # data e do militar anteriores também precisam ser invalidados
+        instance._original = (instance.__dict__.get('militar_id'), instance.__dict__.get('data'))
+        return instance
+
     def clean(self):
         # Não permitir serviço durante afastamento
         afastado = Afastamento.objects.filter(
@@ -127,13 +182,103 @@ class Servico(models.Model):
         ).exists()
 
         if afastado:
-            raise ValidationError(
-                'Não é possível registrar serviço para militar afastado.'
-            )
+            raise ValidationError(MENSAGEM_SERVICO_AFASTADO)
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+    def save(self, *args, validar=True, **kwargs):
+        """
+        Grava o serviço.
+
+        Args:
+            validar: Executa ``full_clean`` antes de gravar (consultas de
+                afastamento e de unicidade) e mantém as tabelas derivadas
+                (resumo diário e último serviço) na hora, pelos sinais.
+                Caminhos que já validaram os dados passam ``False`` e
+                gravam com uma única instrução: o afastamento é garantido
+                pelo gatilho do banco, a unicidade pelas constraints, e a
+                manutenção das tabelas derivadas é feita uma vez por
+                transação, no commit (``core.signals``).
+        """
+        if validar:
+            self.full_clean()
+        self._adiar_derivados = not validar
+        try:
+            # Sem savepoint: dentro de uma transação externa, a falha a invalida,
+            # como no save do Django
+            with transaction.atomic(savepoint=False):
+                super().save(*args, **kwargs)
+        except IntegrityError as e:
+            if GATILHO_SERVICO_AFASTADO in str(e):
+                raise ValidationError(MENSAGEM_SERVICO_AFASTADO) from e
+            raise
+        finally:
+            self._adiar_derivados = False
 
     def __str__(self):
         return f"{self.militar.nome} - {self.get_tipo_display()} - {self.data.strftime('%d/%m/%Y')}"
+
+
+class Feriado(models.Model):
+    """Feriados: entram na escala vermelha junto com sábados e domingos."""
+    data = models.DateField(unique=True)
+    descricao = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        ordering = ['data']
+        verbose_name = 'Feriado'
+        verbose_name_plural = 'Feriados'
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Data como carregada do banco: numa edição, os serviços da data
+        # anterior também mudam de escala
+        instance._data_original = instance.__dict__.get('data')
+        return instance
+
+    def __str__(self):
+        return f"{self.data.strftime('%d/%m/%Y')} - {self.descricao}" if self.descricao else self.data.strftime('%d/%m/%Y')
+
+
+class UltimoServico(models.Model):
+    """
+    Data do último serviço do militar em cada escala (preta: dias úteis;
+    vermelha: fins de semana e feriados), mantida pelas gravações
+    (ver ``core.calendario``).
+    """
+    militar = models.OneToOneField(
+        Militar,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ultimo_servico'
+    )
+    data_preta = models.DateField(null=True, blank=True)
+    data_vermelha = models.DateField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Último Serviço'
+        verbose_name_plural = 'Últimos Serviços'
+
+    def __str__(self):
+        return f"{self.militar_id}: preta {self.data_preta}, vermelha {self.data_vermelha}"
+
+
+class ResumoDiario(models.Model):
+    """
+    Contadores do dashboard por data, mantidos pelas gravações
+    (ver ``core.resumo_services``).
+    """
+    data = models.DateField(unique=True)
+    total_militares = models.IntegerField(default=0)
+    afastados = models.IntegerField(default=0)
+    escalados = models.IntegerField(default=0)
+    escalados_por_tipo = models.JSONField(default=dict)
+    escalados_por_subunidade = models.JSONField(default=dict)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-data']
+        verbose_name = 'Resumo Diário'
+        verbose_name_plural = 'Resumos Diários'
+
+    def __str__(self):
+        return f"Resumo de {self.data.strftime('%d/%m/%Y')}"
@@ -0,0 +1,27 @@
+"""
+Classes de paginação da API REST.
+
+A paginação por cursor (keyset) mantém o custo de cada página constante,
+independente do tamanho da tabela, ao contrário da paginação por offset.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class CursorPaginacaoPadrao(CursorPagination):
+    """Paginação por cursor com tamanho de página configurável (?page_size=)."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
+
+
+class MilitarCursorPagination(CursorPaginacaoPadrao):
+    ordering = ('id',)
+
+
+class AfastamentoCursorPagination(CursorPaginacaoPadrao):
+    ordering = ('-data_inicio', '-id')
+
+
+class ServicoCursorPagination(CursorPaginacaoPadrao):
+    ordering = ('-data', '-id')
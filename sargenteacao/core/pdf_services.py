@@ -8,17 +8,19 @@ from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 
+from .metricas import medir_pdf
 from .models import Servico
 from .services import ADITAMENTO_SECTIONS, TIPO_SERVICO_LABELS
 
 
+@medir_pdf('aditamento')
 def gerar_aditamento_pdf(data: date, servicos) -> HttpResponse:
     """
     Gera o PDF do aditamento para uma data específica.
     
     Args:
         data: Data de referência
-        servicos: QuerySet de serviços
+        servicos: Serviços do dia (QuerySet com ``select_related('militar')`` ou lista)
         
     Returns:
         HttpResponse com o PDF
@@ -59,7 +61,12 @@ def gerar_aditamento_pdf(data: date, servicos) -> HttpResponse:
 
     c.setFont("Helvetica", 10)
 
-    if not servicos.exists():
+    # Uma única consulta: os serviços são agrupados por tipo em memória
+    servicos_por_tipo = {}
+    for s in servicos:
+        servicos_por_tipo.setdefault(s.tipo, []).append(s)
+
+    if not servicos_por_tipo:
         c.drawString(50, y, "Nenhum militar escalado.")
     else:
         for tipo, titulo in ADITAMENTO_SECTIONS:
@@ -68,9 +75,9 @@ def gerar_aditamento_pdf(data: date, servicos) -> HttpResponse:
             c.drawString(50, y, titulo)
             y -= 14
 
-            entries = servicos.filter(tipo=tipo)
+            entries = servicos_por_tipo.get(tipo, [])
 
-            if not entries.exists():
+            if not entries:
                 c.setFont("Helvetica-Oblique", 10)
                 c.drawString(60, y, "— Nenhum militar neste tipo —")
                 y -= 16
@@ -124,6 +131,7 @@ def _adicionar_pagina_aditamento(c, data, largura, altura):
     return c
 
 
+@medir_pdf('relatorio_mensal')
 def gerar_relatorio_mensal_pdf(militar, servicos, mes: int, ano: int) -> HttpResponse:
     """
     Gera o PDF do relatório mensal de serviços de um militar.
@@ -138,6 +146,9 @@ def gerar_relatorio_mensal_pdf(militar, servicos, mes: int, ano: int) -> HttpRes
         HttpResponse com o PDF
     """
     from calendar import month_name
+
+    # Materializa uma única vez (total, verificação de vazio e listagem)
+    servicos = list(servicos)
     
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = (
@@ -159,7 +170,7 @@ def gerar_relatorio_mensal_pdf(militar, servicos, mes: int, ano: int) -> HttpRes
     y -= 20
     pdf.drawString(50, y, f"Mês/Ano: {month_name[mes].upper()} / {ano}")
     y -= 20
-    pdf.drawString(50, y, f"Total de serviços: {servicos.count()}")
+    pdf.drawString(50, y, f"Total de serviços: {len(servicos)}")
     y -= 30
 
     # 📋 Tabela simples
@@ -171,7 +182,7 @@ def gerar_relatorio_mensal_pdf(militar, servicos, mes: int, ano: int) -> HttpRes
 
     pdf.setFont("Helvetica", 11)
 
-    if servicos.exists():
+    if servicos:
         for servico in servicos:
             pdf.drawString(50, y, servico.data.strftime('%d/%m/%Y'))
             y -= 18
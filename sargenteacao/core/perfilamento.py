@@ -0,0 +1,235 @@
+"""
+Perfilamento sob demanda de uma única requisição (somente administradores).
+
+Com ``PERFILAMENTO_HABILITADO`` ativo, uma requisição com ``?_perfil=`` ou o
+cabeçalho ``X-Perfilar`` é executada sob um dos perfiladores:
+
+- ``amostragem`` (padrão): uma thread amostra a pilha da requisição a cada
+  ``PERFILAMENTO_INTERVALO_MS`` e grava as pilhas no formato "folded"
+  (``flamegraph.pl``, speedscope, inferno);
+- ``cprofile``: ``cProfile`` determinístico, gravado no formato ``pstats``
+  (snakeviz, ``python -m pstats``).
+
+Em ambos os modos o SQL executado (com duração) é gravado junto. Cada perfil
+fica em ``PERFILAMENTO_DIR/<id>/`` e pode ser baixado em ``perfis/<id>/<arquivo>/``.
+Com o perfilamento desabilitado o middleware nem é instalado (custo zero).
+"""
+import cProfile
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+
+from .utils.permissoes import is_admin
+
+
+MODOS_PERFILAMENTO = ('amostragem', 'cprofile')
+
+# Arquivos de um perfil: nome na URL -> (arquivo em disco, content-type)
+ARQUIVOS_PERFIL = {
+    'folded': ('perfil.folded', 'text/plain; charset=utf-8'),
+    'prof': ('perfil.prof', 'application/octet-stream'),
+    'sql': ('sql.json', 'application/json'),
+}
+
+_RE_ID_PERFIL = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$')
+
+_RAIZ_PROJETO = str(Path(settings.BASE_DIR).resolve())
+
+
+def diretorio_perfis() -> Path:
+    return Path(settings.PERFILAMENTO_DIR)
+
+
+def modo_perfilamento(request) -> Optional[str]:
+    """
+    Modo de perfilamento pedido pela requisição (sem verificar permissão).
+
+    ``?_perfil=1`` / ``X-Perfilar: 1`` usam a amostragem; ``cprofile`` ou
+    ``amostragem`` escolhem o modo explicitamente.
+
+    Returns:
+        Modo pedido ou None
+    """
+    valor = (request.GET.get('_perfil') or request.headers.get('X-Perfilar') or '').strip().lower()
+    if not valor or valor in ('0', 'false', 'nao'):
+        return None
+    return valor if valor in MODOS_PERFILAMENTO else 'amostragem'
+
+
+# ==================== AMOSTRAGEM DE PILHA ====================
+
+def _rotulo_frame(frame) -> str:
+    codigo = frame.f_code
+    arquivo = codigo.co_filename
+    if arquivo.startswith(_RAIZ_PROJETO):
+        arquivo = os.path.relpath(arquivo, _RAIZ_PROJETO)
+    else:
+        arquivo = os.path.basename(arquivo)
+    return f'{codigo.co_name} ({arquivo}:{codigo.co_firstlineno})'
+
+
+class AmostradorPilha:
+    """Amostra periodicamente a pilha de uma thread (``sys._current_frames``)."""
+
+    def __init__(self, thread_id: int, intervalo: float):
+        self.thread_id = thread_id
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name='perfilamento', daemon=True)
+
+    def _executar(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.thread_id)
+            pilha = []
+            while frame is not None:
+                pilha.append(_rotulo_frame(frame))
+                frame = frame.f_back
+            if pilha:
+                self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        """Pilhas no formato "folded" (uma linha ``raiz;...;folha contagem`` por pilha)."""
+        return ''.join(f'{pilha} {contagem}\n' for pilha, contagem in self.pilhas.most_common())
+
+
+class _RegistroSQL:
+    """``execute_wrapper`` que registra SQL, parâmetros e duração de cada consulta."""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append({
+                'banco': context['connection'].alias,
+                'sql': sql,
+                'params': [repr(p) for p in params] if params and not many else None,
+                'many': many,
+                'ms': round((time.perf_counter() - inicio) * 1000, 3),
+            })
+
+
+# ==================== EXECUÇÃO E ARMAZENAMENTO ====================
+
+def perfilar_requisicao(request, get_response: Callable, modo: str):
+    """
+    Executa a requisição sob o perfilador e grava o perfil (se o usuário for admin).
+
+    A resposta ganha os cabeçalhos ``X-Perfil-Id`` e ``X-Perfil-Download``.
+
+    Args:
+        request: Requisição em andamento
+        get_response: Próximo handler da cadeia de middlewares
+        modo: ``amostragem`` ou ``cprofile``
+    """
+    if not is_admin(request.user):
+        return get_response(request)
+
+    registro_sql = _RegistroSQL()
+    perfilador = cProfile.Profile() if modo == 'cprofile' else None
+    amostrador = None
+    inicio = time.perf_counter()
+    with ExitStack() as pilha:
+        for conexao in connections.all():
+            pilha.enter_context(conexao.execute_wrapper(registro_sql))
+        if perfilador is not None:
+            perfilador.enable()
+            pilha.callback(perfilador.disable)
+        else:
+            intervalo = settings.PERFILAMENTO_INTERVALO_MS / 1000
+            amostrador = pilha.enter_context(AmostradorPilha(threading.get_ident(), intervalo))
+        response = get_response(request)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+
+    perfil_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    destino = diretorio_perfis() / perfil_id
+    destino.mkdir(parents=True, exist_ok=True)
+    if perfilador is not None:
+        perfilador.dump_stats(destino / ARQUIVOS_PERFIL['prof'][0])
+        arquivo = 'prof'
+    else:
+        (destino / ARQUIVOS_PERFIL['folded'][0]).write_text(amostrador.folded(), encoding='utf-8')
+        arquivo = 'folded'
+    (destino / ARQUIVOS_PERFIL['sql'][0]).write_text(
+        json.dumps(registro_sql.consultas, indent=2, ensure_ascii=False), encoding='utf-8'
+    )
+    meta = {
+        'id': perfil_id,
+        'modo': modo,
+        'arquivo': arquivo,
+        'metodo': request.method,
+        'caminho': request.get_full_path(),
+        'usuario': request.user.get_username(),
+        'status': response.status_code,
+        'duracao_ms': round(duracao_ms, 1),
+        'consultas': len(registro_sql.consultas),
+        'sql_ms': round(sum(c['ms'] for c in registro_sql.consultas), 1),
+        'amostras': sum(amostrador.pilhas.values()) if amostrador is not None else None,
+        'criado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    (destino / 'meta.json').write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding='utf-8')
+    _limpar_perfis_antigos()
+
+    response['X-Perfil-Id'] = perfil_id
+    response['X-Perfil-Download'] = reverse('perfil_download', args=[perfil_id, arquivo])
+    return response
+
+
+def _limpar_perfis_antigos() -> None:
+    """Mantém apenas os ``PERFILAMENTO_MAX_PERFIS`` perfis mais recentes."""
+    maximo = settings.PERFILAMENTO_MAX_PERFIS
+    perfis = sorted(p for p in diretorio_perfis().iterdir() if p.is_dir() and _RE_ID_PERFIL.match(p.name))
+    for antigo in perfis[:-maximo] if len(perfis) > maximo else []:
+        shutil.rmtree(antigo, ignore_errors=True)
+
+
+def listar_perfis() -> List[Dict[str, Any]]:
+    """Metadados dos perfis gravados, do mais recente para o mais antigo."""
+    raiz = diretorio_perfis()
+    if not raiz.is_dir():
+        return []
+    perfis = []
+    for pasta in sorted(raiz.iterdir(), reverse=True):
+        meta = pasta / 'meta.json'
+        if _RE_ID_PERFIL.match(pasta.name) and meta.is_file():
+            perfis.append(json.loads(meta.read_text(encoding='utf-8')))
+    return perfis
+
+
+def caminho_arquivo_perfil(perfil_id: str, arquivo: str) -> Optional[Path]:
+    """
+    Caminho de um arquivo de perfil, ou None se o id/arquivo for inválido ou não existir.
+
+    Args:
+        perfil_id: Identificador do perfil
+        arquivo: ``folded``, ``prof`` ou ``sql``
+    """
+    if not _RE_ID_PERFIL.match(perfil_id) or arquivo not in ARQUIVOS_PERFIL:
+        return None
+    caminho = diretorio_perfis() / perfil_id / ARQUIVOS_PERFIL[arquivo][0]
+    return caminho if caminho.is_file() else None
@@ -0,0 +1,348 @@
+"""
+Pipeline de regras de disponibilidade do efetivo (descanso e carga de serviço).
+
+``_calcular_efetivo`` carrega, em um número fixo de consultas, o estado de
+todos os militares ativos para a data (``EstadoEfetivo``: colunas paralelas
+com id, graduação, afastamento, serviços recentes...) e executa as regras em
+ordem. Cada regra percorre o lote inteiro em memória e pode:
+
+- bloquear o militar (``estado.bloquear``): fica inapto, com motivo e
+  status; vale o primeiro bloqueio;
+- vetar tipos de serviço (``estado.vetar``): continua apto, mas sem esses
+  tipos nas opções de registro.
+
+Uma regra declara quantos dias anteriores precisa ver (``janela_dias``); os
+serviços da maior janela entre as regras vêm na mesma consulta, então
+acrescentar regras não acrescenta consultas.
+
+As regras vêm de ``settings.REGRAS_EFETIVO`` (lista de caminhos ou pares
+``[caminho, {parâmetros}]``), ou do JSON em ``REGRAS_EFETIVO_ARQUIVO``;
+sem configuração vale ``PIPELINE_PADRAO`` (as regras históricas do sistema).
+"""
+import json
+import math
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .elegibilidade import BIT_TIPO
+
+
+# 🔖 Status padronizados
+STATUS_BAIXA = 'BAIXA'
+STATUS_NORMAL = 'NORMAL'
+STATUS_ALTA = 'ALTA'
+STATUS_BLOQUEADO = 'BLOQUEADO'
+STATUS_INAPTO = 'INAPTO'
+STATUS_PRIMEIRO = 'PRIMEIRO SERVIÇO'
+STATUS_JA_ESCALADO = 'JÁ ESCALADO'
+
+# Dias de folga até os quais o status é BAIXA e NORMAL (acima: ALTA)
+LIMIARES_FOLGA_PADRAO = (1, 4)
+
+
+class Bloqueio:
+    """Motivo de um militar não estar apto na data."""
+    __slots__ = ('motivo', 'status', 'dias_folga', 'ja_escalado')
+
+    def __init__(self, motivo: str, status: str, dias_folga: Any, ja_escalado: bool):
+        self.motivo = motivo
+        self.status = status
+        self.dias_folga = dias_folga
+        self.ja_escalado = ja_escalado
+
+
+# Marca "manter os dias de folga calculados" em ``bloquear``
+_MANTER = object()
+
+
+class EstadoEfetivo:
+    """
+    Estado de todos os militares ativos em uma data, em colunas paralelas
+    (o índice ``i`` é o mesmo em todas as listas).
+
+    Attributes:
+        data: Data avaliada
+        militares: Instâncias de ``Militar``
+        graduacoes: Graduação de cada militar
+        afastamentos: Rótulo do afastamento vigente ou None
+        escalados: Se o militar já tem serviço na data
+        ultimas_datas: Data do último serviço (qualquer escala) ou None
+        dias_folga: Dias de folga usados na ordenação e no status: desde o
+            último serviço na escala da data (``ultimas_escala``) ou, sem
+            ela, desde o último serviço
+        servicos: Serviços anteriores dentro da janela, ``[(data, tipo)]``
+            do mais recente para o mais antigo
+        bloqueios: Primeiro bloqueio de cada militar (None = apto)
+        vetos: Máscara (``BIT_TIPO``) dos tipos vetados
+    """
+
+    def __init__(self, data: date, militares: Sequence, afastamentos: Dict[int, str],
+                 escalados: Iterable[int], ultimas_datas: Dict[int, date],
+                 servicos: Dict[int, List[tuple]], ultimas_escala: Optional[Dict[int, date]] = None):
+        self.data = data
+        self.militares = list(militares)
+        ids = [m.id for m in self.militares]
+        escalados = set(escalados)
+        self.graduacoes = [m.graduacao for m in self.militares]
+        self.afastamentos = [afastamentos.get(i) for i in ids]
+        self.escalados = [i in escalados for i in ids]
+        self.ultimas_datas = [ultimas_datas.get(i) for i in ids]
+        contagem = self.ultimas_datas if ultimas_escala is None else [ultimas_escala.get(i) for i in ids]
+        self.dias_folga = [(data - d).days if d else None for d in contagem]
+        self.servicos = [sorted(servicos.get(i, ()), reverse=True) for i in ids]
+        self.bloqueios: List[Optional[Bloqueio]] = [None] * len(ids)
+        self.vetos = [0] * len(ids)
+
+    def __len__(self):
+        return len(self.militares)
+
+    def livres(self) -> List[int]:
+        """Índices dos militares ainda não bloqueados."""
+        return [i for i, bloqueio in enumerate(self.bloqueios) if bloqueio is None]
+
+    def bloquear(self, i: int, motivo: str, status: str = STATUS_BLOQUEADO,
+                 dias_folga: Any = _MANTER, ja_escalado: bool = False) -> None:
+        """Bloqueia o militar ``i`` (se ainda não estiver bloqueado)."""
+        if self.bloqueios[i] is None:
+            self.bloqueios[i] = Bloqueio(
+                motivo, status, self.dias_folga[i] if dias_folga is _MANTER else dias_folga, ja_escalado
+            )
+
+    def vetar(self, i: int, mascara: int) -> None:
+        """Retira os tipos da máscara das opções do militar ``i``."""
+        self.vetos[i] |= mascara
+
+
+# ==================== REGRAS ====================
+
+class Regra:
+    """
+    Regra do pipeline. Subclasses implementam ``avaliar`` sobre o lote
+    inteiro, sem consultas ao banco.
+    """
+    # Dias anteriores à data cujos serviços a regra precisa ver
+    janela_dias = 0
+
+    def inicio_janela(self, data: date) -> date:
+        return data - timedelta(days=self.janela_dias)
+
+    @property
+    def alcance_dias(self) -> int:
+        """Quantos dias à frente um serviço pode mudar o resultado da regra."""
+        return self.janela_dias
+
+    def avaliar(self, estado: EstadoEfetivo) -> None:
+        raise NotImplementedError
+
+
+class RegraAfastamento(Regra):
+    """Militar afastado na data fica inapto (motivo: tipo do afastamento)."""
+
+    def avaliar(self, estado):
+        for i in estado.livres():
+            if estado.afastamentos[i]:
+                estado.bloquear(i, estado.afastamentos[i], STATUS_INAPTO, dias_folga=None)
+
+
+class RegraServicoOntem(Regra):
+    """Não pode tirar serviço em dias seguidos."""
+    janela_dias = 1
+
+    def avaliar(self, estado):
+        ontem = estado.data - timedelta(days=1)
+        for i in estado.livres():
+            if estado.ultimas_datas[i] == ontem:
+                estado.bloquear(i, 'Serviço ontem', STATUS_BAIXA, dias_folga=0)
+
+
+class RegraJaEscalado(Regra):
+    """Militar que já tem serviço na data não pode receber outro."""
+
+    def avaliar(self, estado):
+        for i in estado.livres():
+            if estado.escalados[i]:
+                estado.bloquear(i, STATUS_JA_ESCALADO, STATUS_JA_ESCALADO, ja_escalado=True)
+
+
+class RegraDescansoAposTipo(Regra):
+    """
+    Descanso mínimo após um tipo de serviço (ex.: 48h após GUARDA).
+
+    Args:
+        tipo: Tipo de serviço que exige descanso
+        horas: Descanso mínimo em horas (arredondado para dias inteiros)
+    """
+
+    def __init__(self, tipo: str = 'GUARDA', horas: int = 48):
+        self.tipo = tipo
+        self.horas = horas
+        self.janela_dias = math.ceil(horas / 24)
+
+    def avaliar(self, estado):
+        limite = estado.data - timedelta(days=self.janela_dias)
+        motivo = f'Descanso de {self.horas}h após {self.tipo.replace("_", " ").title()}'
+        for i in estado.livres():
+            for data, tipo in estado.servicos[i]:
+                if data < limite:
+                    break
+                if tipo == self.tipo:
+                    estado.bloquear(i, motivo)
+                    break
+
+
+class RegraMaximoServicosMes(Regra):
+    """
+    Limite de serviços por mês (contando os anteriores à data no mesmo mês).
+
+    Args:
+        maximo: Quantidade máxima de serviços no mês
+    """
+
+    def __init__(self, maximo: int = 8):
+        self.maximo = maximo
+
+    def inicio_janela(self, data):
+        return data.replace(day=1)
+
+    @property
+    def alcance_dias(self):
+        return 30
+
+    def avaliar(self, estado):
+        inicio_mes = estado.data.replace(day=1)
+        motivo = f'Limite de {self.maximo} serviços no mês'
+        for i in estado.livres():
+            no_mes = sum(1 for data, _tipo in estado.servicos[i] if data >= inicio_mes)
+            if no_mes >= self.maximo:
+                estado.bloquear(i, motivo)
+
+
+class RegraCargoEspecialFinsDeSemana(Regra):
+    """
+    Sem cargo especial em dois fins de semana seguidos: num sábado ou
+    domingo, quem teve cargo especial no fim de semana anterior continua
+    apto, mas sem os cargos especiais nas opções.
+
+    Args:
+        tipos: Tipos vetados (padrão: ``CARGOS_ESPECIAIS``)
+    """
+    janela_dias = 8
+
+    def __init__(self, tipos: Sequence[str] = None):
+        if tipos is None:
+            from .services import CARGOS_ESPECIAIS
+            tipos = CARGOS_ESPECIAIS
+        self.tipos = set(tipos)
+        self.mascara = 0
+        for tipo in self.tipos:
+            self.mascara |= BIT_TIPO[tipo]
+
+    def avaliar(self, estado):
+        if estado.data.weekday() < 5:
+            return
+        # Sábado e domingo da semana anterior
+        sabado_anterior = estado.data - timedelta(days=estado.data.weekday() - 5 + 7)
+        fim_de_semana = (sabado_anterior, sabado_anterior + timedelta(days=1))
+        for i in estado.livres():
+            for data, tipo in estado.servicos[i]:
+                if data < sabado_anterior:
+                    break
+                if data in fim_de_semana and tipo in self.tipos:
+                    estado.vetar(i, self.mascara)
+                    break
+
+
+# ==================== PIPELINE ====================
+
+PIPELINE_PADRAO = [
+    'core.regras_efetivo.RegraAfastamento',
+    'core.regras_efetivo.RegraServicoOntem',
+    'core.regras_efetivo.RegraJaEscalado',
+]
+
+
+class Pipeline:
+    """Sequência de regras aplicada ao estado do efetivo."""
+
+    def __init__(self, regras: Sequence[Regra], limiares_folga: Sequence[int] = LIMIARES_FOLGA_PADRAO):
+        self.regras = list(regras)
+        self.limiares_folga = tuple(limiares_folga)
+
+    def inicio_janela(self, data: date) -> date:
+        """Data mais antiga cujos serviços alguma regra precisa ver."""
+        return min([data] + [regra.inicio_janela(data) for regra in self.regras])
+
+    @property
+    def alcance_dias(self) -> int:
+        """Dias seguintes ao de um serviço cujo efetivo ele pode alterar."""
+        return max([1] + [regra.alcance_dias for regra in self.regras])
+
+    def avaliar(self, estado: EstadoEfetivo) -> EstadoEfetivo:
+        for regra in self.regras:
+            regra.avaliar(estado)
+        return estado
+
+    def status_apto(self, dias_folga: Optional[int]) -> str:
+        """Status visual de um militar apto conforme os dias de folga."""
+        if dias_folga is None:
+            return STATUS_PRIMEIRO
+        baixa, normal = self.limiares_folga
+        if dias_folga <= baixa:
+            return STATUS_BAIXA
+        if dias_folga <= normal:
+            return STATUS_NORMAL
+        return STATUS_ALTA
+
+
+def _instanciar(item) -> Regra:
+    if isinstance(item, str):
+        caminho, parametros = item, {}
+    else:
+        caminho, parametros = item
+    try:
+        return import_string(caminho)(**parametros)
+    except (ImportError, TypeError, KeyError) as e:
+        raise ImproperlyConfigured(f'Regra do efetivo inválida ({caminho}): {e}')
+
+
+def carregar_configuracao() -> List:
+    """Regras configuradas: ``REGRAS_EFETIVO``, o JSON de ``REGRAS_EFETIVO_ARQUIVO`` ou o padrão."""
+    configuracao = getattr(settings, 'REGRAS_EFETIVO', None)
+    if configuracao is not None:
+        return configuracao
+    arquivo = getattr(settings, 'REGRAS_EFETIVO_ARQUIVO', '')
+    if arquivo:
+        try:
+            with open(arquivo, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise ImproperlyConfigured(f'Não foi possível ler as regras do efetivo em {arquivo}: {e}')
+    return PIPELINE_PADRAO
+
+
+_pipeline = None
+
+
+def recarregar() -> Pipeline:
+    """Monta o pipeline a partir da configuração (na inicialização ou quando ela muda)."""
+    global _pipeline
+    limiares = getattr(settings, 'EFETIVO_LIMIARES_FOLGA', LIMIARES_FOLGA_PADRAO)
+    _pipeline = Pipeline([_instanciar(item) for item in carregar_configuracao()], limiares)
+    return _pipeline
+
+
+def pipeline() -> Pipeline:
+    """Pipeline em uso."""
+    return _pipeline or recarregar()
+
+
+@receiver(setting_changed)
+def _configuracao_alterada(setting, **kwargs):
+    if setting in ('REGRAS_EFETIVO', 'REGRAS_EFETIVO_ARQUIVO', 'EFETIVO_LIMIARES_FOLGA'):
+        recarregar()
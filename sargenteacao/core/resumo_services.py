@@ -0,0 +1,208 @@
+"""
+Resumo diário mantido para o dashboard (``ResumoDiario``).
+
+Cada data tem uma linha com o total de militares, os afastados e os
+escalados (também por tipo e por subunidade), de modo que o dashboard e o
+widget ``resumo/`` leem uma única linha em vez de três ``COUNT`` por acesso.
+
+As linhas são criadas sob demanda (na primeira leitura da data) e mantidas
+pelas gravações:
+
+- serviços: os escalados da data são recontados (uma consulta agrupada);
+- afastamentos: ``afastados`` recebe +1/-1 no período, com ``F()``;
+- militares: ``total_militares`` é recontado em todas as linhas.
+
+Caminhos em lote que não disparam sinais chamam essas funções diretamente
+(ou ``descartar_resumos``). O comando ``reconstruir_resumo_diario`` recalcula
+um período a partir do banco.
+"""
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import Afastamento, Militar, ResumoDiario, Servico
+
+
+# ==================== CONSTRUÇÃO ====================
+
+def _contar_escalados(datas: Iterable[date] = (), inicio: Optional[date] = None,
+                      fim: Optional[date] = None) -> Dict[date, Dict[str, Counter]]:
+    """
+    Conta os serviços por data, tipo e subunidade em uma única consulta agrupada.
+
+    Returns:
+        {data: {'tipo': Counter, 'subunidade': Counter}}
+    """
+    filtro = Q(data__range=(inicio, fim)) if inicio is not None else Q(data__in=list(datas))
+    contagens = defaultdict(lambda: {'tipo': Counter(), 'subunidade': Counter()})
+    linhas = (
+        Servico.objects.filter(filtro)
+        .values_list('data', 'tipo', 'militar__subunidade')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for data, tipo, subunidade, total in linhas:
+        contagens[data]['tipo'][tipo] += total
+        contagens[data]['subunidade'][subunidade] += total
+    return contagens
+
+
+def _contar_afastados(inicio: date, fim: date) -> Dict[date, int]:
+    """Afastamentos vigentes em cada data do período (uma consulta)."""
+    variacao = Counter()
+    periodos = Afastamento.objects.filter(
+        data_inicio__lte=fim, data_fim__gte=inicio
+    ).values_list('data_inicio', 'data_fim')
+    for comeco, termino in periodos:
+        variacao[max(comeco, inicio)] += 1
+        variacao[min(termino, fim) + timedelta(days=1)] -= 1
+
+    por_data = {}
+    vigentes = 0
+    dia = inicio
+    while dia <= fim:
+        vigentes += variacao[dia]
+        por_data[dia] = vigentes
+        dia += timedelta(days=1)
+    return por_data
+
+
+def _campos_escalados(contagem: Dict[str, Counter]) -> dict:
+    return {
+        'escalados': sum(contagem['tipo'].values()),
+        'escalados_por_tipo': dict(sorted(contagem['tipo'].items())),
+        'escalados_por_subunidade': dict(sorted(contagem['subunidade'].items())),
+    }
+
+
+def construir_resumos(inicio: date, fim: date) -> List[ResumoDiario]:
+    """
+    Calcula (sem gravar) os resumos de um período a partir do banco.
+
+    Usa três consultas, independentemente do tamanho do período.
+
+    Args:
+        inicio: Primeira data
+        fim: Última data (inclusive)
+
+    Returns:
+        Lista de ``ResumoDiario`` não salvos, um por data
+    """
+    total_militares = Militar.objects.count()
+    afastados = _contar_afastados(inicio, fim)
+    escalados = _contar_escalados(inicio=inicio, fim=fim)
+    vazio = {'tipo': Counter(), 'subunidade': Counter()}
+
+    resumos = []
+    dia = inicio
+    while dia <= fim:
+        resumos.append(ResumoDiario(
+            data=dia,
+            total_militares=total_militares,
+            afastados=afastados[dia],
+            **_campos_escalados(escalados.get(dia, vazio)),
+        ))
+        dia += timedelta(days=1)
+    return resumos
+
+
+def reconstruir_resumos(inicio: date, fim: date) -> int:
+    """
+    Recalcula e regrava os resumos do período.
+
+    Args:
+        inicio: Primeira data
+        fim: Última data (inclusive)
+
+    Returns:
+        Número de linhas gravadas
+    """
+    resumos = construir_resumos(inicio, fim)
+    with transaction.atomic():
+        ResumoDiario.objects.filter(data__range=(inicio, fim)).delete()
+        ResumoDiario.objects.bulk_create(resumos)
+    return len(resumos)
+
+
+def obter_resumo_diario(data: date) -> ResumoDiario:
+    """
+    Resumo de uma data: uma leitura, ou o cálculo e a gravação na primeira vez.
+
+    Args:
+        data: Data do resumo
+
+    Returns:
+        ``ResumoDiario`` da data
+    """
+    resumo = ResumoDiario.objects.filter(data=data).first()
+    if resumo is not None:
+        return resumo
+
+    resumo = construir_resumos(data, data)[0]
+    try:
+        with transaction.atomic():
+            resumo.save()
+    except IntegrityError:
+        # Outra requisição gravou o resumo da data ao mesmo tempo
+        resumo = ResumoDiario.objects.get(data=data)
+    return resumo
+
+
+# ==================== MANUTENÇÃO INCREMENTAL ====================
+
+def atualizar_resumo_servicos(datas: Iterable[date]) -> None:
+    """
+    Reconta os escalados das datas que já têm resumo.
+
+    Args:
+        datas: Datas dos serviços criados, alterados ou excluídos
+    """
+    # Só há o que atualizar nas datas já lidas (em geral, apenas hoje)
+    datas = set(ResumoDiario.objects.filter(data__in=set(datas)).values_list('data', flat=True)) if datas else set()
+    if not datas:
+        return
+    contagens = _contar_escalados(datas)
+    vazio = {'tipo': Counter(), 'subunidade': Counter()}
+    agora = timezone.now()
+    for data in datas:
+        ResumoDiario.objects.filter(data=data).update(
+            atualizado_em=agora, **_campos_escalados(contagens.get(data, vazio))
+        )
+
+
+def ajustar_resumo_afastados(inicio: date, fim: date, delta: int) -> None:
+    """
+    Soma ``delta`` aos afastados das datas do período que já têm resumo.
+
+    Args:
+        inicio: Início do afastamento
+        fim: Fim do afastamento (inclusive)
+        delta: +1 para afastamento incluído, -1 para removido
+    """
+    ResumoDiario.objects.filter(data__range=(inicio, fim)).update(
+        afastados=F('afastados') + delta, atualizado_em=timezone.now()
+    )
+
+
+def atualizar_total_militares_resumo() -> None:
+    """Reconta os militares cadastrados e atualiza todas as linhas do resumo."""
+    ResumoDiario.objects.update(
+        total_militares=Militar.objects.count(), atualizado_em=timezone.now()
+    )
+
+
+def atualizar_resumo_militar(militar_id: int) -> None:
+    """Reconta os escalados das datas em que o militar tem serviço (mudança de subunidade)."""
+    datas = ResumoDiario.objects.filter(
+        data__in=Servico.objects.filter(militar_id=militar_id).values('data')
+    ).values_list('data', flat=True)
+    atualizar_resumo_servicos(datas)
+
+
+def descartar_resumos() -> None:
+    """Remove todos os resumos (recalculados sob demanda). Para cargas em lote."""
+    ResumoDiario.objects.all().delete()
@@ -1,2 +1,4 @@
+from .campos_dinamicos import CamposDinamicosMixin
 from .militar_serializer import MilitarSerializer
-from .afastamento_serializer import AfastamentoSerializer
\ No newline at end of file
+from .afastamento_serializer import AfastamentoSerializer
+from .servico_serializer import ServicoSerializer, EscalaLoteSerializer
@@ -1,7 +1,9 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from ..models import Afastamento  # type: ignore
+from .campos_dinamicos import CamposDinamicosMixin
 
-class AfastamentoSerializer(serializers.ModelSerializer):
+class AfastamentoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Afastamento
         fields = '__all__'
@@ -40,3 +42,19 @@ class AfastamentoSerializer(serializers.ModelSerializer):
             )
 
         return data
+
+    # No PostgreSQL a constraint de exclusão (militar, período) também barra
+    # sobreposições gravadas concorrentemente após a validação acima
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError("Já existe um afastamento nesse período.")
+
+    def update(self, instance, validated_data):
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError("Já existe um afastamento nesse período.")
@@ -0,0 +1,23 @@
+from ..utils.api import get_campos_solicitados
+
+
+class CamposDinamicosMixin:
+    """
+    Permite escolher os campos retornados via ?fields=nome,graduacao.
+
+    Só se aplica a leituras (GET/HEAD/OPTIONS), para não interferir na
+    validação de escritas.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return
+        if not request.query_params.get('fields'):
+            return
+
+        campos = set(get_campos_solicitados(request, list(self.fields)))
+        for nome in list(self.fields):
+            if nome not in campos:
+                self.fields.pop(nome)
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from ..models import Militar
+from .campos_dinamicos import CamposDinamicosMixin
 
-class MilitarSerializer(serializers.ModelSerializer):
+class MilitarSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Militar
-        fields = '__all__'
+        # nome_busca é derivado do nome (uso interno das buscas)
+        exclude = ('nome_busca',)
@@ -0,0 +1,64 @@
+from rest_framework import serializers
+from ..models import Afastamento, Servico
+from ..services import pode_atribuir_tipo
+from .campos_dinamicos import CamposDinamicosMixin
+
+
+class ServicoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Servico
+        fields = ['id', 'militar', 'data', 'tipo', 'registrado_por', 'data_registro']
+        read_only_fields = ['registrado_por', 'data_registro']
+
+    def validate(self, data):
+        militar = data.get('militar', getattr(self.instance, 'militar', None))
+        tipo = data.get('tipo', getattr(self.instance, 'tipo', 'GUARDA'))
+        data_servico = data.get('data', getattr(self.instance, 'data', None))
+
+        # 1️⃣ Regras de graduação, duplicidade e cargos especiais
+        pode_atribuir, erro = pode_atribuir_tipo(
+            militar, tipo, data_servico,
+            servico_id=self.instance.id if self.instance else None
+        )
+        if not pode_atribuir:
+            raise serializers.ValidationError(erro)
+
+        # 2️⃣ Militar afastado na data
+        afastado = Afastamento.objects.filter(
+            militar=militar,
+            data_inicio__lte=data_servico,
+            data_fim__gte=data_servico
+        ).exists()
+        if afastado:
+            raise serializers.ValidationError(
+                'Não é possível registrar serviço para militar afastado.'
+            )
+
+        return data
+
+    # Os dados já foram validados acima: grava sem repetir full_clean (o
+    # gatilho do banco e as constraints continuam garantindo as regras)
+    def create(self, validated_data):
+        servico = Servico(**validated_data)
+        servico.save(validar=False)
+        return servico
+
+    def update(self, instance, validated_data):
+        for campo, valor in validated_data.items():
+            setattr(instance, campo, valor)
+        instance.save(validar=False)
+        return instance
+
+
+class ItemEscalaSerializer(serializers.Serializer):
+    """Item da escala em lote: criação (militar/tipo) ou atualização (id + campos)."""
+    id = serializers.IntegerField(required=False)
+    militar = serializers.IntegerField(required=False)
+    tipo = serializers.ChoiceField(choices=Servico.TIPOS_SERVICO, required=False)
+
+
+class EscalaLoteSerializer(serializers.Serializer):
+    """Payload das operações em lote sobre a escala de um dia."""
+    data = serializers.DateField()
+    servicos = ItemEscalaSerializer(many=True, required=False, default=list)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
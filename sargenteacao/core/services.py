@@ -1,10 +1,27 @@
-from datetime import date, timedelta
-from typing import List, Dict, Optional, Any
+import heapq
+from calendar import monthrange
+from collections import Counter
+from datetime import MAXYEAR, MINYEAR, date, timedelta
+from typing import List, Dict, Iterable, Optional, Any, Tuple
 from django.contrib.auth.models import User
-from django.core.cache import cache
-from django.db.models import Count, Q, Sum, Case, When, IntegerField
-
-from .models import Militar, Afastamento, Servico
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q, Sum, Case, When, IntegerField
+
+from .calendario import ESCALA_VERMELHA, escala_da_data, recalcular_ultimos_servicos, ultimos_servicos
+from .elegibilidade import BIT_TIPO, graduacoes_do_tipo, opcoes_tipo, pode_exercer, tipos_da_graduacao
+from .eventos import barramento, evento_servico, publicar_evento
+from .models import GATILHO_SERVICO_AFASTADO, MENSAGEM_SERVICO_AFASTADO, Militar, Afastamento, Servico
+from .metricas import medir_escala
+from .regras_efetivo import (  # noqa: F401 (status reexportados)
+    STATUS_ALTA, STATUS_BAIXA, STATUS_BLOQUEADO, STATUS_INAPTO, STATUS_JA_ESCALADO,
+    STATUS_NORMAL, STATUS_PRIMEIRO, EstadoEfetivo, pipeline as pipeline_efetivo,
+)
+from .resumo_services import atualizar_resumo_servicos
+from .utils.busca import corresponde_busca, filtro_busca_nome, termos_busca
+from .utils.cache import invalidar_tags, memoizar, obter_ou_calcular, versoes_tags
+from .utils.db import repetir_em_bloqueio
 
 
 # ==================== CONFIGURAÇÃO DE CACHE ====================
@@ -15,20 +32,46 @@ CACHE_TIMEOUT_EFETIVO = 300
 # Prefixo para as chaves de cache
 CACHE_PREFIX_EFETIVO = 'efetivo_'
 
+# Tempo de cache das consultas memoizadas (estatísticas, calendário, histórico)
+CACHE_TIMEOUT_CONSULTAS = 600
+
 
 # ==================== FUNÇÕES AUXILIARES DE CACHE ====================
 
+# Tags de dependência dos caches (ver ``core.utils.cache.memoizar``).
+# Invalidar uma tag incrementa sua versão, e a chave antiga simplesmente
+# deixa de ser usada. Tags por data/militar permitem invalidação precisa:
+# 'servico:data=2026-01-05', 'servico:militar=42', 'efetivo:data=2026-01-05'.
+TAG_SERVICO = 'servico'
+TAG_AFASTAMENTO = 'afastamento'
+TAG_MILITAR = 'militar'
+TAG_EFETIVO = 'efetivo'
+
+
+def _tag_efetivo_data(data: date) -> str:
+    return f"{TAG_EFETIVO}:data={data.isoformat()}"
+
+
 def gerar_chave_cache_efetivo(data: date) -> str:
     """
     Gera uma chave de cache para o efetivo de uma data específica.
     
+    A chave inclui a versão global e a versão da data, então muda sempre
+    que o efetivo da data é invalidado. A própria chave serve de
+    versão/ETag para as APIs que expõem o efetivo.
+    
     Args:
         data: Data para a qual gerar a chave de cache
         
     Returns:
         String com a chave de cache formatada
     """
-    return f"{CACHE_PREFIX_EFETIVO}{data.isoformat()}"
+    tag_data = _tag_efetivo_data(data)
+    versoes = versoes_tags([TAG_EFETIVO, tag_data])
+    return (
+        f"{CACHE_PREFIX_EFETIVO}{data.isoformat()}"
+        f"_g{versoes[TAG_EFETIVO]}_v{versoes[tag_data]}"
+    )
 
 
 def invalidar_cache_efetivo(data: date) -> None:
@@ -38,18 +81,50 @@ def invalidar_cache_efetivo(data: date) -> None:
     Args:
         data: Data para a qual invalidar o cache
     """
-    chave = gerar_chave_cache_efetivo(data)
-    cache.delete(chave)
+    invalidar_tags(_tag_efetivo_data(data))
+
 
+def invalidar_todo_cache_efetivo() -> None:
+    """
+    Invalida o cache do efetivo de todas as datas.
+    
+    Usado quando mudam dados que afetam qualquer data (militares ou afastamentos).
+    """
+    invalidar_tags(TAG_EFETIVO)
+
+
+def invalidar_cache_servicos(datas: List[date], militar_ids: List[int] = ()) -> None:
+    """
+    Invalida os caches que dependem dos serviços das datas/militares informados.
+    
+    Inclui o efetivo de cada data e dos dias seguintes que as regras do
+    efetivo enxergam ("serviço ontem", descansos, limites no mês).
+    
+    Args:
+        datas: Datas dos serviços alterados
+        militar_ids: Militares dos serviços alterados
+    """
+    alcance = pipeline_efetivo().alcance_dias
+    tags = [TAG_SERVICO]
+    for data in set(datas):
+        tags.append(f"{TAG_SERVICO}:data={data.isoformat()}")
+        tags += [_tag_efetivo_data(data + timedelta(days=n)) for n in range(alcance + 1)]
+    tags += [f"{TAG_SERVICO}:militar={militar_id}" for militar_id in set(militar_ids)]
+    invalidar_tags(*tags)
+
+
+def invalidar_cache_afastamentos(militar_ids: List[int] = ()) -> None:
+    """Invalida os caches que dependem de afastamentos (inclui todo o efetivo)."""
+    invalidar_tags(
+        TAG_AFASTAMENTO, TAG_EFETIVO,
+        *[f"{TAG_AFASTAMENTO}:militar={militar_id}" for militar_id in set(militar_ids)]
+    )
+
+
+def invalidar_cache_militares() -> None:
+    """Invalida os caches que dependem do cadastro de militares (inclui todo o efetivo)."""
+    invalidar_tags(TAG_MILITAR, TAG_EFETIVO)
 
-# 🔖 Status padronizados
-STATUS_BAIXA = 'BAIXA'
-STATUS_NORMAL = 'NORMAL'
-STATUS_ALTA = 'ALTA'
-STATUS_BLOQUEADO = 'BLOQUEADO'
-STATUS_INAPTO = 'INAPTO'
-STATUS_PRIMEIRO = 'PRIMEIRO SERVIÇO'
-STATUS_JA_ESCALADO = 'JÁ ESCALADO'
 
 # Cargos especiais que devem ser únicos por dia
 CARGOS_ESPECIAIS = {'OFICIAL_DIA', 'ADJUNTO', 'COMANDANTE_GUARDA', 'CABO_GUARDA', 'CABO_DIA'}
@@ -72,65 +147,33 @@ ADITAMENTO_SECTIONS = [
 
 # ==================== REGRAS DE NEGÓCIO ====================
 
-def tipos_permitidos_por_graduacao(grad: str) -> List[str]:
+def tipos_permitidos_por_graduacao(grad: str) -> Tuple[str, ...]:
     """
-    Retorna a lista de tipos de serviço permitidos para uma determinada graduação.
+    Retorna os tipos de serviço permitidos para uma determinada graduação.
+    
+    As regras vêm da tabela compilada de ``core.elegibilidade``.
     
     Args:
         grad: A graduação militar (SD, CB, 3SG, etc.)
         
     Returns:
-        Lista de códigos de tipo de serviço permitidos
+        Tupla de códigos de tipo de serviço permitidos
     """
-    base = ['GUARDA', 'PLANTAO', 'PERMANENCIA']
-    allowed = []
-    
-    if grad in ('SD', 'CB'):
-        allowed.extend(base)
-    if grad == 'CB':
-        allowed.extend(['CABO_GUARDA', 'CABO_DIA'])
-    if grad == '3SG':
-        allowed.append('COMANDANTE_GUARDA')
-    if grad in ('2SG', '1SG'):
-        allowed.append('ADJUNTO')
-    if grad in ('1TEN', '2TEN'):
-        allowed.append('OFICIAL_DIA')
-    
-    return allowed
+    return tipos_da_graduacao(grad)
 
 
-def graduacoes_permitidas_por_tipo(tipo: str) -> List[str]:
+def graduacoes_permitidas_por_tipo(tipo: str) -> Tuple[str, ...]:
     """
-    Retorna a lista de graduações permitidas para um determinado tipo de serviço.
-    Esta é a função inversa de tipos_permitidos_por_graduacao.
+    Retorna as graduações permitidas para um determinado tipo de serviço.
+    Esta é a função inversa de tipos_permitidos_por_graduacao (mesma tabela).
     
     Args:
         tipo: O código do tipo de serviço (GUARDA, CABO_GUARDA, etc.)
         
     Returns:
-        Lista de códigos de graduação permitidos
+        Tupla de códigos de graduação permitidos
     """
-    # GUARDA, PLANTAO, PERMANENCIA podem ser feitos por todas as graduações
-    if tipo in ('GUARDA', 'PLANTAO', 'PERMANENCIA'):
-        return ['SD', 'CB', '3SG', '2SG', '1SG', '1TEN', '2TEN']
-    
-    # CABO_GUARDA e CABO_DIA só podem ser feitos por CB
-    if tipo in ('CABO_GUARDA', 'CABO_DIA'):
-        return ['CB']
-    
-    # COMANDANTE_GUARDA só pode ser feito por 3SG
-    if tipo == 'COMANDANTE_GUARDA':
-        return ['3SG']
-    
-    # ADJUNTO pode ser feito por 2SG ou 1SG
-    if tipo == 'ADJUNTO':
-        return ['2SG', '1SG']
-    
-    # OFICIAL_DIA pode ser feito por 1TEN ou 2TEN
-    if tipo == 'OFICIAL_DIA':
-        return ['1TEN', '2TEN']
-    
-    return []
+    return graduacoes_do_tipo(tipo)
 
 
 def get_opcoes_tipo_por_militar(militar: Militar) -> List[tuple]:
@@ -143,9 +186,7 @@ def get_opcoes_tipo_por_militar(militar: Militar) -> List[tuple]:
     Returns:
         Lista de tuplas (código, label) com os tipos permitidos
     """
-    grad = militar.graduacao
-    allowed_codes = tipos_permitidos_por_graduacao(grad)
-    return [(code, TIPO_SERVICO_LABELS[code]) for code in allowed_codes]
+    return list(opcoes_tipo(militar.graduacao))
 
 
 def get_tipos_ocupados_por_data(data: date) -> List[str]:
@@ -171,7 +212,9 @@ def calcular_efetivo_por_data(data_referencia: date):
     Calcula o efetivo para uma data específica.
     
     OTIMIZADO: Usa cache para evitar queries repetidas.
-    O resultado é armazenado em cache por 5 minutos.
+    O resultado é armazenado em cache por 5 minutos. Com vários workers,
+    apenas um recalcula a mesma data por vez (single-flight) e o valor é
+    renovado antes de expirar (ver ``core.utils.cache``).
     
     Args:
         data_referencia: Data para calcular o efetivo
@@ -179,137 +222,105 @@ def calcular_efetivo_por_data(data_referencia: date):
     Returns:
         Lista de dicionários com informações do militar e seu status
     """
-    # 🔍 Verificar se o resultado já está em cache
     chave_cache = gerar_chave_cache_efetivo(data_referencia)
-    resultado_cache = cache.get(chave_cache)
-    
-    if resultado_cache is not None:
-        return resultado_cache
-    
-    # Se não está em cache, calcular o efetivo
+    return obter_ou_calcular(
+        chave_cache,
+        lambda: _calcular_efetivo(data_referencia),
+        CACHE_TIMEOUT_EFETIVO,
+        metrica=f'{__name__}.calcular_efetivo_por_data',
+    )
+
+
+def _calcular_efetivo(data_referencia: date) -> List[Dict[str, Any]]:
+    """
+    Calcula o efetivo da data sem consultar o cache.
+
+    Carrega o estado de todos os militares ativos em quatro consultas e
+    aplica o pipeline de regras (``core.regras_efetivo``) em memória. Os
+    serviços da janela mais longa entre as regras vêm na mesma consulta dos
+    serviços do dia, então o número de consultas não depende das regras.
+    """
     hoje = data_referencia
-    ontem = hoje - timedelta(days=1)
+    pipeline = pipeline_efetivo()
 
     # ========== OTIMIZAÇÃO: Buscar todos os dados de uma vez ==========
     
     # 1️⃣ Buscar TODOS os militares ativos de uma vez
-    militares = Militar.objects.filter(ativo=True)
-    militares_list = list(militares)
+    militares_list = list(Militar.objects.filter(ativo=True))
     militar_ids = [m.id for m in militares_list]
     
     if not militares_list:
-        cache.set(chave_cache, [], CACHE_TIMEOUT_EFETIVO)
         return []
     
-    # 2️⃣ Buscar TODOS os serviços de HOJE de uma vez (para todos os militares)
-    servicos_hoje = set(
-        Servico.objects.filter(data=hoje, militar_id__in=militar_ids)
-        .values_list('militar_id', flat=True)
-    )
+    # 2️⃣ Buscar os serviços de HOJE e da janela das regras de uma vez
+    servicos_hoje = set()
+    servicos_janela = {}
+    linhas = Servico.objects.filter(
+        data__range=(pipeline.inicio_janela(hoje), hoje),
+        militar_id__in=militar_ids,
+    ).values_list('militar_id', 'data', 'tipo')
+    for militar_id, data, tipo in linhas:
+        if data == hoje:
+            servicos_hoje.add(militar_id)
+        else:
+            servicos_janela.setdefault(militar_id, []).append((data, tipo))
     
     # 3️⃣ Buscar TODOS os afastamentos ATIVOS de uma vez
-    afastamentos_hoje = Afastamento.objects.filter(
-        data_inicio__lte=hoje,
-        data_fim__gte=hoje,
-        militar_id__in=militar_ids
-    ).select_related('militar')
-    
-    # Criar dict: {militar_id: afastamento}
-    afastamentos_dict = {a.militar_id: a for a in afastamentos_hoje}
-    
-    # 4️⃣ Buscar o ÚLTIMO serviço de CADA militar de uma vez
-    # Usamos uma subconsulta para pegar apenas o último serviço por militar
-    from django.db.models import Max
-    
-    # Pegar IDs dos últimos serviços
-    ultimo_servico_ids = (
-        Servico.objects.filter(militar_id__in=militar_ids)
-        .values('militar_id')
-        .annotate(max_data=Max('data'))
-    )
-    
-    # Agora buscar os serviços completos desses IDs
-    ultimo_servico_data = {}
-    if ultimo_servico_ids.exists():
-        # Criar um dicionário {militar_id: data_do_ultimo_servico}
-        for item in ultimo_servico_ids:
-            ultimo_servico_data[item['militar_id']] = item['max_data']
-    
-    # Se precisamos dos objetos Servico completos (para algo além da data),
-    # buscaríamos aqui. Mas como só precisamos da data, o dict acima é suficiente.
+    rotulos_afastamento = dict(Afastamento.TIPOS_AFASTAMENTO)
+    afastamentos_dict = {
+        militar_id: rotulos_afastamento.get(tipo, tipo)
+        for militar_id, tipo in Afastamento.objects.filter(
+            data_inicio__lte=hoje,
+            data_fim__gte=hoje,
+            militar_id__in=militar_ids
+        ).values_list('militar_id', 'tipo')
+    }
     
-    # ========== Processar dados em memória ==========
-    resultado = []
+    # 4️⃣ Buscar a data do ÚLTIMO serviço de CADA militar, por escala (pré-calculada)
+    ultimos = ultimos_servicos(militar_ids)
+    ultimo_servico_data = {
+        militar_id: max(d for d in datas if d)
+        for militar_id, datas in ultimos.items() if any(datas)
+    }
+    # Escalas preta/vermelha separadas: a folga conta só a escala da data
+    escala = ultimo_na_escala = None
+    if getattr(settings, 'ESCALA_PRETA_VERMELHA', False):
+        escala = escala_da_data(hoje)
+        indice_escala = 1 if escala == ESCALA_VERMELHA else 0
+        ultimo_na_escala = {militar_id: datas[indice_escala] for militar_id, datas in ultimos.items()}
     
-    for militar in militares_list:
-        militar_id = militar.id
-        
-        # 🔎 Já escalado hoje? (agora é O(1) com set)
-        ja_escalado = militar_id in servicos_hoje
-        
-        # 1️⃣ Verificar afastamento (agora é O(1) com dict)
-        afastamento_ativo = afastamentos_dict.get(militar_id)
-        
-        if afastamento_ativo:
-            resultado.append({
-                'militar': militar,
-                'apto': False,
-                'motivo': afastamento_ativo.get_tipo_display(),
-                'dias_folga': None,
-                'status': STATUS_INAPTO,
-                'ja_escalado': False
-            })
-            continue
+    # ========== Aplicar as regras em memória ==========
+    estado = pipeline.avaliar(EstadoEfetivo(
+        hoje, militares_list, afastamentos_dict, servicos_hoje, ultimo_servico_data, servicos_janela,
+        ultimo_na_escala,
+    ))
 
-        # 2️⃣ Último serviço (agora é O(1) com dict)
-        ultima_data = ultimo_servico_data.get(militar_id)
-        
-        if not ultima_data:
-            dias_folga = None
-        else:
-            dias_folga = (hoje - ultima_data).days
-
-            # ❌ Não pode tirar serviço em dias seguidos (regra de negócio)
-            if ultima_data == ontem:
-                resultado.append({
-                    'militar': militar,
-                    'apto': False,
-                    'motivo': 'Serviço ontem',
-                    'dias_folga': 0,
-                    'status': STATUS_BAIXA,
-                    'ja_escalado': False
-                })
-                continue
-
-        # 3️⃣ Já escalado hoje (bloqueia)
-        if ja_escalado:
+    resultado = []
+    for i, militar in enumerate(estado.militares):
+        bloqueio = estado.bloqueios[i]
+        if bloqueio is not None:
             resultado.append({
                 'militar': militar,
                 'apto': False,
-                'motivo': STATUS_JA_ESCALADO,
-                'dias_folga': dias_folga,
-                'status': STATUS_JA_ESCALADO,
-                'ja_escalado': True
+                'motivo': bloqueio.motivo,
+                'dias_folga': bloqueio.dias_folga,
+                'status': bloqueio.status,
+                'ja_escalado': bloqueio.ja_escalado,
+                'tipos_vetados': (),
+                'escala': escala,
             })
             continue
 
-        # 4️⃣ Definir status visual
-        if dias_folga is None:
-            status = STATUS_PRIMEIRO
-        elif dias_folga <= 1:
-            status = STATUS_BAIXA
-        elif dias_folga <= 4:
-            status = STATUS_NORMAL
-        else:
-            status = STATUS_ALTA
-
+        dias_folga = estado.dias_folga[i]
         resultado.append({
             'militar': militar,
             'apto': True,
             'motivo': 'Apto',
             'dias_folga': dias_folga,
-            'status': status,
-            'ja_escalado': False
+            'status': pipeline.status_apto(dias_folga),
+            'ja_escalado': False,
+            'tipos_vetados': tuple(t for t, bit in BIT_TIPO.items() if estado.vetos[i] & bit),
+            'escala': escala,
         })
 
     # 🔽 Ordenação inteligente (mais justo)
@@ -322,9 +333,6 @@ def calcular_efetivo_por_data(data_referencia: date):
         reverse=True
     )
 
-    # 💾 Armazenar o resultado em cache
-    cache.set(chave_cache, resultado, CACHE_TIMEOUT_EFETIVO)
-    
     return resultado
 
 
@@ -333,6 +341,35 @@ def calcular_efetivo_do_dia():
     return calcular_efetivo_por_data(date.today())
 
 
+def serializar_efetivo(efetivo: List[Dict], subunidade: str = '') -> List[Dict]:
+    """
+    Converte o efetivo calculado em uma lista de dicionários serializáveis (JSON).
+    
+    Args:
+        efetivo: Lista retornada por calcular_efetivo_por_data
+        subunidade: Filtro opcional por subunidade
+        
+    Returns:
+        Lista de dicionários com dados do militar e seu status
+    """
+    return [
+        {
+            'id': e['militar'].id,
+            'nome': e['militar'].nome,
+            'graduacao': e['militar'].graduacao,
+            'subunidade': e['militar'].subunidade,
+            'apto': e['apto'],
+            'motivo': e['motivo'],
+            'dias_folga': e['dias_folga'],
+            'status': e['status'],
+            'ja_escalado': e['ja_escalado'],
+            'escala': e.get('escala'),
+        }
+        for e in efetivo
+        if not subunidade or e['militar'].subunidade == subunidade
+    ]
+
+
 # ==================== SERVIÇOS ====================
 
 def filtrar_militares_aptos(efetivo: List[Dict], query: str = '', graduacao: str = '') -> List[Dict]:
@@ -341,22 +378,26 @@ def filtrar_militares_aptos(efetivo: List[Dict], query: str = '', graduacao: str
     
     Args:
         efetivo: Lista de efetivo calculada
-        query: Texto para busca no nome
+        query: Texto para busca no nome (sem acentos, por início de palavra)
         graduacao: Graduação para filtro
         
     Returns:
         Lista filtrada de militares aptos
     """
+    termos = termos_busca(query)
     militares_aptos = []
     for e in efetivo:
         if e['apto']:
-            if query and query.lower() not in e['militar'].nome.lower():
+            if not corresponde_busca(e['militar'].nome_busca, termos):
                 continue
             if graduacao and e['militar'].graduacao != graduacao:
                 continue
-            grad = e['militar'].graduacao
-            allowed_codes = tipos_permitidos_por_graduacao(grad)
-            e['opcoes_tipo'] = [(code, TIPO_SERVICO_LABELS[code]) for code in allowed_codes]
+            opcoes = opcoes_tipo(e['militar'].graduacao)
+            vetados = e.get('tipos_vetados')
+            if vetados:
+                # Tipos vetados pelas regras do efetivo (ex.: cargo especial em fins de semana seguidos)
+                opcoes = tuple(opcao for opcao in opcoes if opcao[0] not in vetados)
+            e['opcoes_tipo'] = opcoes
             militares_aptos.append(e)
     return militares_aptos
 
@@ -365,10 +406,11 @@ def filtrar_militares_nao_aptos(efetivo: List[Dict], query: str = '', graduacao:
     """
     Filtra militares não aptos com base em query de busca e graduação.
     """
+    termos = termos_busca(query)
     return [
         e for e in efetivo
         if not e['apto']
-        and (not query or query.lower() in e['militar'].nome.lower())
+        and corresponde_busca(e['militar'].nome_busca, termos)
         and (not graduacao or e['militar'].graduacao == graduacao)
     ]
 
@@ -387,8 +429,7 @@ def pode_atribuir_tipo(militar: Militar, tipo: str, data: date, servico_id: int
         Tupla (bool, str) - (pode_atribuir, mensagem_erro)
     """
     # Verifica se o tipo é permitido para a graduação
-    allowed_codes = tipos_permitidos_por_graduacao(militar.graduacao)
-    if tipo not in allowed_codes:
+    if not pode_exercer(militar.graduacao, tipo):
         return False, 'Tipo de serviço não permitido para a graduação selecionada.'
     
     # Verifica se o militar já tem serviço nesta data
@@ -409,11 +450,17 @@ def pode_atribuir_tipo(militar: Militar, tipo: str, data: date, servico_id: int
     return True, ''
 
 
+@medir_escala('registrar_servicos')
+@repetir_em_bloqueio()
 def registrar_servicos(militares_selecionados: List[Militar], tipos: Dict[int, str], 
                        data: date, registrado_por: User) -> Dict[str, Any]:
     """
     Registra serviços para militares selecionados.
     
+    As regras de ``pode_atribuir_tipo`` são verificadas em memória a partir
+    de uma única consulta dos serviços do dia, e os serviços válidos são
+    gravados com um único ``bulk_create`` (número de consultas constante).
+    
     Args:
         militares_selecionados: Lista de objetos Militar
         tipos: Dicionário {militar_id: tipo_servico}
@@ -423,38 +470,95 @@ def registrar_servicos(militares_selecionados: List[Militar], tipos: Dict[int, s
     Returns:
         Dicionário com estatísticas do registro
     """
-    registrados = 0
     ignorados = 0
     erros = []
     
+    # Pré-carga: militares já escalados e cargos especiais ocupados no dia
+    militares_escalados = set()
+    tipos_ocupados = set()
+    for militar_id, tipo in Servico.objects.filter(data=data).values_list('militar_id', 'tipo'):
+        militares_escalados.add(militar_id)
+        if tipo in CARGOS_ESPECIAIS:
+            tipos_ocupados.add(tipo)
+    
+    # Pré-carga: afastados na data (bulk_create não executa Servico.clean)
+    afastados = set(
+        Afastamento.objects.filter(
+            militar_id__in=[militar.id for militar in militares_selecionados],
+            data_inicio__lte=data,
+            data_fim__gte=data
+        ).values_list('militar_id', flat=True)
+    )
+    
+    novos = []
     for militar in militares_selecionados:
         tipo = tipos.get(militar.id, 'GUARDA')
         
-        # Validações
-        pode_atribuir, erro = pode_atribuir_tipo(militar, tipo, data)
-        if not pode_atribuir:
-            erros.append(f'{militar.nome}: {erro}')
+        # Validações (mesmas regras de pode_atribuir_tipo)
+        if not pode_exercer(militar.graduacao, tipo):
+            erros.append(f'{militar.nome}: Tipo de serviço não permitido para a graduação selecionada.')
             continue
-        
-        try:
-            Servico.objects.create(
-                militar=militar,
-                data=data,
-                tipo=tipo,
-                registrado_por=registrado_por
+        if militar.id in militares_escalados:
+            erros.append(f'{militar.nome}: Militar já possui serviço na data.')
+            continue
+        if militar.id in afastados:
+            erros.append(f'{militar.nome}: Não é possível registrar serviço para militar afastado.')
+            continue
+        if tipo in tipos_ocupados:
+            erros.append(
+                f'{militar.nome}: Tipo {tipo.replace("_", " ").title()} já atribuído para a data selecionada.'
             )
-            registrados += 1
-        except Exception as e:
-            erros.append(f'{militar.nome}: {str(e)}')
-            ignorados += 1
+            continue
+        
+        militares_escalados.add(militar.id)
+        if tipo in CARGOS_ESPECIAIS:
+            tipos_ocupados.add(tipo)
+        novos.append(Servico(militar=militar, data=data, tipo=tipo, registrado_por=registrado_por))
+    
+    # Gravação em lote: em caso de lock o registro inteiro pode ser repetido
+    criados = []
+    try:
+        with transaction.atomic():
+            criados = Servico.objects.bulk_create(novos)
+    except IntegrityError:
+        # Conflito com uma gravação concorrente: grava um a um (com sinais),
+        # ignorando os conflitantes
+        with transaction.atomic():
+            for servico in novos:
+                try:
+                    with transaction.atomic():
+                        # Já validado acima; o banco garante as regras restantes
+                        servico.save(validar=False)
+                except (IntegrityError, ValidationError) as e:
+                    erros.append(f'{servico.militar.nome}: {str(e)}')
+                    ignorados += 1
+        return {
+            'registrados': len(novos) - ignorados,
+            'ignorados': ignorados,
+            'erros': erros
+        }
+    
+    if criados:
+        # bulk_create não dispara sinais: invalida os caches, atualiza o resumo
+        # diário e publica os eventos aqui
+        invalidar_cache_servicos([data], [s.militar_id for s in criados])
+        atualizar_resumo_servicos([data])
+        recalcular_ultimos_servicos([s.militar_id for s in criados])
+        if barramento.total_assinantes:
+            for servico in criados:
+                publicar_evento(evento_servico(
+                    'criado', servico.id, data, servico.militar_id,
+                    servico.militar.subunidade, servico.tipo
+                ))
     
     return {
-        'registrados': registrados,
+        'registrados': len(criados),
         'ignorados': ignorados,
         'erros': erros
     }
 
 
+@repetir_em_bloqueio()
 def atualizar_servico(servico: Servico, novo_militar: Militar, novo_tipo: str, 
                      atualizado_por: User, data: date) -> tuple:
     """
@@ -477,11 +581,13 @@ def atualizar_servico(servico: Servico, novo_militar: Militar, novo_tipo: str,
     servico.militar = novo_militar
     servico.tipo = novo_tipo
     servico.registrado_por = atualizado_por
-    servico.save()
+    # Afastamento: gatilho do banco (ValidationError, como em full_clean)
+    servico.save(validar=False)
     
     return True, 'Serviço atualizado com sucesso.'
 
 
+@repetir_em_bloqueio()
 def excluir_servico(servico: Servico) -> bool:
     """
     Exclui um serviço.
@@ -496,6 +602,7 @@ def excluir_servico(servico: Servico) -> bool:
     return True
 
 
+@repetir_em_bloqueio()
 def adicionar_servico(militar: Militar, tipo: str, data: date, registrado_por: User) -> tuple:
     """
     Adiciona um novo serviço.
@@ -513,18 +620,311 @@ def adicionar_servico(militar: Militar, tipo: str, data: date, registrado_por: U
     if not pode_atribuir:
         return False, erro
     
-    Servico.objects.create(
+    # Afastamento: gatilho do banco (ValidationError, como em full_clean)
+    Servico(
         militar=militar,
         data=data,
         tipo=tipo,
         registrado_por=registrado_por
-    )
+    ).save(validar=False)
     
     return True, 'Serviço adicionado com sucesso.'
 
 
+def _validar_atribuicao_em_memoria(militar: Optional[Militar], tipo: str, afastados: set) -> str:
+    """
+    Valida a atribuição de um tipo a um militar usando dados pré-carregados.
+
+    Returns:
+        Mensagem de erro, ou string vazia se a atribuição é válida
+    """
+    if militar is None:
+        return 'Militar não encontrado.'
+    if not pode_exercer(militar.graduacao, tipo):
+        return 'Tipo de serviço não permitido para a graduação selecionada.'
+    if militar.id in afastados:
+        return 'Não é possível registrar serviço para militar afastado.'
+    return ''
+
+
+@medir_escala('aplicar_escala_em_lote')
+@repetir_em_bloqueio()
+def aplicar_escala_em_lote(data: date, criar: List[Dict] = (), atualizar: List[Dict] = (),
+                           excluir: List[int] = (), registrado_por: User = None) -> Dict[str, Any]:
+    """
+    Aplica, de forma atômica, um conjunto de alterações na escala de um dia.
+
+    Todas as regras de ``pode_atribuir_tipo`` (graduação, um serviço por
+    militar no dia, cargos especiais únicos) e o bloqueio por afastamento
+    são verificados em memória, sobre o estado final do dia, a partir de
+    uma única pré-carga (serviços do dia, militares e afastamentos). Se
+    houver qualquer erro, nada é gravado.
+
+    Args:
+        data: Data da escala
+        criar: Itens {'militar': id, 'tipo': código}
+        atualizar: Itens {'id': id_servico, 'militar': id (opcional), 'tipo': código (opcional)}
+        excluir: IDs de serviços da data a excluir
+        registrado_por: Usuário responsável pelas alterações
+
+    Returns:
+        Dicionário com os IDs criados/atualizados/excluídos e a lista de erros
+    """
+    erros = []
+    excluir = set(excluir)
+
+    # 1️⃣ Pré-carga: serviços do dia
+    existentes = {s.id: s for s in Servico.objects.filter(data=data)}
+
+    for servico_id in excluir - set(existentes):
+        erros.append({'id': servico_id, 'erro': 'Serviço não encontrado na data.'})
+
+    militar_ids = {item['militar'] for item in criar}
+    for item in atualizar:
+        servico = existentes.get(item['id'])
+        militar_ids.add(item.get('militar', servico.militar_id if servico else None))
+    militar_ids.discard(None)
+
+    # 2️⃣ Pré-carga: militares envolvidos e afastamentos na data
+    militares = Militar.objects.in_bulk(militar_ids)
+    afastados = set(
+        Afastamento.objects.filter(
+            militar_id__in=militar_ids,
+            data_inicio__lte=data,
+            data_fim__gte=data
+        ).values_list('militar_id', flat=True)
+    )
+
+    # Estado final do dia: {chave: (militar_id, tipo)}
+    estado = {sid: (s.militar_id, s.tipo) for sid, s in existentes.items() if sid not in excluir}
+    alterados = {}
+    novos = {}
+
+    for item in atualizar:
+        servico = existentes.get(item['id'])
+        if servico is None or item['id'] in excluir:
+            erros.append({'id': item['id'], 'erro': 'Serviço não encontrado na data.'})
+            continue
+        militar_id = item.get('militar', servico.militar_id)
+        tipo = item.get('tipo', servico.tipo)
+        erro = _validar_atribuicao_em_memoria(militares.get(militar_id), tipo, afastados)
+        if erro:
+            erros.append({'id': servico.id, 'erro': erro})
+            continue
+        estado[servico.id] = (militar_id, tipo)
+        alterados[servico.id] = servico
+
+    for indice, item in enumerate(criar):
+        tipo = item.get('tipo', 'GUARDA')
+        erro = _validar_atribuicao_em_memoria(militares.get(item['militar']), tipo, afastados)
+        if erro:
+            erros.append({'indice': indice, 'erro': erro})
+            continue
+        estado[('novo', indice)] = (item['militar'], tipo)
+        novos[indice] = (item['militar'], tipo)
+
+    # 3️⃣ Regras de unicidade sobre o estado final (apenas itens novos/alterados são culpados)
+    ocorrencias_militar = Counter(militar_id for militar_id, _tipo in estado.values())
+    ocorrencias_tipo = Counter(tipo for _militar_id, tipo in estado.values() if tipo in CARGOS_ESPECIAIS)
+    chaves_modificadas = list(alterados) + [('novo', indice) for indice in novos]
+    for chave in chaves_modificadas:
+        militar_id, tipo = estado[chave]
+        referencia = {'id': chave} if not isinstance(chave, tuple) else {'indice': chave[1]}
+        if ocorrencias_militar[militar_id] > 1:
+            erros.append({**referencia, 'erro': 'Militar já possui serviço na data.'})
+        elif ocorrencias_tipo[tipo] > 1:
+            erros.append({
+                **referencia,
+                'erro': f'Tipo {tipo.replace("_", " ").title()} já atribuído para a data selecionada.'
+            })
+
+    resultado = {'criados': [], 'atualizados': [], 'excluidos': [], 'erros': erros}
+    if erros:
+        return resultado
+
+    # Militares afetados (antes e depois da troca), para invalidar seus caches
+    militares_afetados = {servico.militar_id for servico in alterados.values()}
+    for servico_id, servico in alterados.items():
+        servico.militar_id, servico.tipo = estado[servico_id]
+        servico.registrado_por = registrado_por
+        militares_afetados.add(servico.militar_id)
+    militares_afetados.update(militar_id for militar_id, _tipo in novos.values())
+
+    # 4️⃣ Gravação atômica: exclusões, atualizações e inserções em lote
+    try:
+        with transaction.atomic():
+            if excluir:
+                Servico.objects.filter(id__in=excluir).delete()
+            if alterados:
+                Servico.objects.bulk_update(list(alterados.values()), ['militar', 'tipo', 'registrado_por'])
+            criados = []
+            if novos:
+                criados = Servico.objects.bulk_create([
+                    Servico(militar_id=militar_id, data=data, tipo=tipo, registrado_por=registrado_por)
+                    for militar_id, tipo in novos.values()
+                ])
+    except IntegrityError as e:
+        if GATILHO_SERVICO_AFASTADO in str(e):
+            # Afastamento incluído depois da pré-carga
+            e = MENSAGEM_SERVICO_AFASTADO
+        erros.append({'erro': f'Conflito ao gravar a escala: {e}'})
+        return resultado
+
+    # bulk_create/bulk_update não disparam sinais: invalida os caches e
+    # atualiza o resumo diário aqui
+    invalidar_cache_servicos([data], militares_afetados)
+    atualizar_resumo_servicos([data])
+    recalcular_ultimos_servicos(militares_afetados)
+
+    # 📡 Eventos para o stream SSE (bulk_create/bulk_update não disparam sinais;
+    # as exclusões já são publicadas pelo sinal post_delete)
+    if barramento.total_assinantes:
+        for acao, servicos in (('criado', criados), ('atualizado', alterados.values())):
+            for servico in servicos:
+                publicar_evento(evento_servico(
+                    acao, servico.id, data, servico.militar_id,
+                    militares[servico.militar_id].subunidade, servico.tipo
+                ))
+
+    resultado['criados'] = [s.id for s in criados]
+    resultado['atualizados'] = list(alterados)
+    resultado['excluidos'] = sorted(excluir)
+    return resultado
+
+
+# ==================== SUBSTITUIÇÕES ====================
+
+# Quantidade padrão de substitutos sugeridos
+SUBSTITUTOS_PADRAO = 5
+
+
+def candidatos_substitutos(data: date, subunidade: str = '',
+                           excluir: Iterable[int] = ()) -> Tuple[List[Dict], Dict[int, int]]:
+    """
+    Militares aptos na data (efetivo em cache) e seus serviços no mês.
+
+    Os serviços do mês vêm em uma única consulta agrupada, só dos aptos.
+
+    Args:
+        data: Data do serviço
+        subunidade: Filtro opcional por subunidade
+        excluir: IDs de militares a desconsiderar
+
+    Returns:
+        Tupla (entradas do efetivo, {militar_id: serviços no mês})
+    """
+    excluir = set(excluir)
+    candidatos = [
+        e for e in calcular_efetivo_por_data(data)
+        if e['apto']
+        and e['militar'].id not in excluir
+        and (not subunidade or e['militar'].subunidade == subunidade)
+    ]
+    if not candidatos:
+        return [], {}
+
+    inicio, fim = periodo_historico(data.year, data.month)
+    servicos_mes = dict(
+        Servico.objects.filter(
+            data__range=(inicio, fim), militar_id__in=[e['militar'].id for e in candidatos]
+        ).order_by().values('militar_id').annotate(total=Count('id')).values_list('militar_id', 'total')
+    )
+    return candidatos, servicos_mes
+
+
+def prioridade_substituto(entrada: Dict, servicos_mes: Dict[int, int]) -> tuple:
+    """
+    Chave de ordenação dos substitutos (menor = melhor): primeiro serviço,
+    mais dias de folga, menos serviços no mês, nome.
+    """
+    dias_folga = entrada['dias_folga']
+    return (
+        dias_folga is not None,
+        -(dias_folga or 0),
+        servicos_mes.get(entrada['militar'].id, 0),
+        entrada['militar'].nome,
+    )
+
+
+def pode_substituir(entrada: Dict, tipo: str) -> bool:
+    """Verifica se um militar apto pode assumir o tipo (graduação e vetos das regras do efetivo)."""
+    return pode_exercer(entrada['militar'].graduacao, tipo) and tipo not in entrada.get('tipos_vetados', ())
+
+
+def buscar_substitutos(data: date, tipo: str, k: int = SUBSTITUTOS_PADRAO,
+                       subunidade: str = '', excluir: Iterable[int] = ()) -> List[Dict[str, Any]]:
+    """
+    Os ``k`` melhores substitutos para um tipo de serviço em uma data.
+
+    Parte do efetivo em cache (aptos na data, já com as regras de descanso
+    aplicadas), mantém só quem pode exercer o tipo e escolhe os ``k``
+    primeiros com um heap, sem ordenar o efetivo inteiro (ordem de
+    ``prioridade_substituto``).
+
+    Args:
+        data: Data do serviço
+        tipo: Código do tipo de serviço
+        k: Quantidade de substitutos
+        subunidade: Filtro opcional por subunidade
+        excluir: IDs de militares a desconsiderar (ex.: o que será substituído)
+
+    Returns:
+        Lista de dicionários ``{'militar', 'dias_folga', 'servicos_mes', 'status'}``
+    """
+    if k <= 0:
+        return []
+    candidatos, servicos_mes = candidatos_substitutos(data, subunidade, excluir)
+    candidatos = [e for e in candidatos if pode_substituir(e, tipo)]
+
+    return [
+        {
+            'militar': e['militar'],
+            'dias_folga': e['dias_folga'],
+            'servicos_mes': servicos_mes.get(e['militar'].id, 0),
+            'status': e['status'],
+        }
+        for e in heapq.nsmallest(k, candidatos, key=lambda e: prioridade_substituto(e, servicos_mes))
+    ]
+
+
+def substituir_militar_servico(servico: Servico, militar_id: int = None,
+                               registrado_por: User = None) -> Dict[str, Any]:
+    """
+    Troca o militar de um serviço, de forma atômica.
+
+    Sem ``militar_id``, usa o primeiro substituto de ``buscar_substitutos``.
+    A troca passa por ``aplicar_escala_em_lote``: as mesmas validações,
+    numa única transação, e nada é gravado se houver erro.
+
+    Args:
+        servico: Serviço cujo militar será substituído
+        militar_id: Substituto escolhido (opcional)
+        registrado_por: Usuário responsável pela troca
+
+    Returns:
+        Resultado de ``aplicar_escala_em_lote`` acrescido de ``substituto`` (ID)
+    """
+    if militar_id is None:
+        sugestoes = buscar_substitutos(servico.data, servico.tipo, k=1, excluir=[servico.militar_id])
+        if not sugestoes:
+            return {
+                'criados': [], 'atualizados': [], 'excluidos': [], 'substituto': None,
+                'erros': [{'id': servico.id, 'erro': 'Nenhum substituto disponível.'}],
+            }
+        militar_id = sugestoes[0]['militar'].id
+
+    resultado = aplicar_escala_em_lote(
+        servico.data,
+        atualizar=[{'id': servico.id, 'militar': militar_id, 'tipo': servico.tipo}],
+        registrado_por=registrado_por,
+    )
+    resultado['substituto'] = militar_id
+    return resultado
+
+
 # ==================== ESTATÍSTICAS ====================
 
+@memoizar(timeout=CACHE_TIMEOUT_CONSULTAS, tags=[TAG_SERVICO, TAG_MILITAR])
 def calcular_estatisticas_servico(inicio: date, fim: date, 
                                   nome: str = '', graduacao: str = '', 
                                   subunidade: str = '') -> List[Dict]:
@@ -544,7 +944,7 @@ def calcular_estatisticas_servico(inicio: date, fim: date,
     servicos_qs = Servico.objects.filter(data__gte=inicio, data__lte=fim).select_related('militar')
     
     if nome:
-        servicos_qs = servicos_qs.filter(militar__nome__icontains=nome)
+        servicos_qs = servicos_qs.filter(filtro_busca_nome(nome, 'militar__nome_busca'))
     if graduacao:
         servicos_qs = servicos_qs.filter(militar__graduacao=graduacao)
     if subunidade:
@@ -628,6 +1028,7 @@ TIPO_COLORS = {
 }
 
 
+@memoizar(timeout=CACHE_TIMEOUT_CONSULTAS, tags=[TAG_SERVICO, TAG_AFASTAMENTO, TAG_MILITAR])
 def gerar_eventos_calendario(start: date, end: date, subunidade: str = None) -> List[Dict]:
     """
     Gera eventos para o calendário.
@@ -653,7 +1054,7 @@ def gerar_eventos_calendario(start: date, end: date, subunidade: str = None) ->
     for s in qs_serv:
         events.append({
             'id': f'srv-{s.id}',
-            'title': s.militar.nome,
+            'title': f'{s.militar.get_graduacao_display()} {s.militar.nome}',
             'start': s.data.isoformat(),
             'end': (s.data + timedelta(days=1)).isoformat(),
             'allDay': True,
@@ -668,7 +1069,7 @@ def gerar_eventos_calendario(start: date, end: date, subunidade: str = None) ->
     for a in qs_afast:
         events.append({
             'id': f'af-{a.id}',
-            'title': a.militar.nome,
+            'title': f'{a.militar.get_graduacao_display()} {a.militar.nome}',
             'start': a.data_inicio.isoformat(),
             'end': (a.data_fim + timedelta(days=1)).isoformat(),
             'allDay': True,
@@ -682,8 +1083,50 @@ def gerar_eventos_calendario(start: date, end: date, subunidade: str = None) ->
     return events
 
 
+# ==================== MILITARES ====================
+
+@memoizar(timeout=CACHE_TIMEOUT_CONSULTAS, tags=[TAG_MILITAR])
+def listar_subunidades() -> List[str]:
+    """
+    Lista as subunidades cadastradas, em ordem alfabética.
+    
+    Returns:
+        Lista com o nome de cada subunidade
+    """
+    return list(
+        Militar.objects.values_list('subunidade', flat=True).distinct().order_by('subunidade')
+    )
+
+
 # ==================== HISTÓRICO ====================
 
+# Serviços por página no histórico do militar
+HISTORICO_POR_PAGINA = 50
+
+
+def periodo_historico(ano: int = None, mes: int = None) -> tuple:
+    """
+    Converte ano/mês em um intervalo de datas (início, fim), inclusivo.
+
+    Filtrar por intervalo (``data BETWEEN``) usa o índice (militar, data);
+    ``data__month`` vira ``EXTRACT``/``strftime`` e obriga a ler todas as
+    linhas do militar.
+
+    Args:
+        ano: Ano (opcional; sem ano não há filtro)
+        mes: Mês (opcional; sem mês, o ano inteiro)
+
+    Returns:
+        Tupla (início, fim) ou (None, None), também para ano/mês fora do
+        intervalo válido
+    """
+    if not ano or not (MINYEAR <= ano <= MAXYEAR) or (mes and not 1 <= mes <= 12):
+        return None, None
+    if not mes:
+        return date(ano, 1, 1), date(ano, 12, 31)
+    return date(ano, mes, 1), date(ano, mes, monthrange(ano, mes)[1])
+
+
 def get_historico_servicos(militar: Militar, ano: int = None, mes: int = None):
     """
     Obtém o histórico de serviços de um militar.
@@ -691,24 +1134,76 @@ def get_historico_servicos(militar: Militar, ano: int = None, mes: int = None):
     Args:
         militar: Instância do Militar
         ano: Ano para filtro (opcional)
-        mes: Mês para filtro (opcional)
+        mes: Mês para filtro (opcional, requer o ano)
         
     Returns:
-        QuerySet de serviços ordenados por data
+        QuerySet de serviços ordenados por data (mais recentes primeiro)
     """
-    servicos = Servico.objects.filter(militar=militar).order_by('-data')
+    servicos = Servico.objects.filter(militar=militar).order_by('-data', '-id')
     
-    if ano:
-        servicos = servicos.filter(data__year=ano)
-    if mes:
-        servicos = servicos.filter(data__month=mes)
+    inicio, fim = periodo_historico(ano, mes)
+    if inicio:
+        servicos = servicos.filter(data__range=(inicio, fim))
     
     return servicos
 
 
+def codificar_cursor_historico(servico: Servico) -> str:
+    """Cursor de paginação posicionado após ``servico`` (``AAAA-MM-DD.id``)."""
+    return f'{servico.data.isoformat()}.{servico.id}'
+
+
+def _decodificar_cursor_historico(cursor: str) -> Optional[tuple]:
+    try:
+        data_str, id_str = cursor.split('.')
+        return date.fromisoformat(data_str), int(id_str)
+    except (AttributeError, ValueError):
+        return None
+
+
+def paginar_historico_servicos(militar: Militar, ano: int = None, mes: int = None,
+                               cursor: str = None, limite: int = HISTORICO_POR_PAGINA) -> Dict[str, Any]:
+    """
+    Uma página do histórico de um militar, com paginação por cursor (keyset).
+
+    A ordem é (data, id) decrescente e cada página continua a partir da
+    última linha da anterior, sem ``OFFSET``: o custo é o mesmo na primeira
+    ou na centésima página. Cursor inválido volta à primeira página.
+
+    Args:
+        militar: Instância do Militar
+        ano: Ano para filtro (opcional)
+        mes: Mês para filtro (opcional, requer o ano)
+        cursor: Cursor devolvido na página anterior (``proximo_cursor``)
+        limite: Serviços por página
+
+    Returns:
+        Dicionário com 'servicos' (lista) e 'proximo_cursor' (None na última página)
+    """
+    servicos = get_historico_servicos(militar, ano, mes).select_related('registrado_por')
+
+    posicao = _decodificar_cursor_historico(cursor) if cursor else None
+    if posicao:
+        data_cursor, id_cursor = posicao
+        # data <= cursor delimita a faixa do índice; o OR desempata pelo id
+        servicos = servicos.filter(
+            Q(data__lt=data_cursor) | Q(data=data_cursor, id__lt=id_cursor),
+            data__lte=data_cursor,
+        )
+
+    # Uma linha a mais indica se existe próxima página
+    pagina = list(servicos[:limite + 1])
+    proximo_cursor = codificar_cursor_historico(pagina[limite - 1]) if len(pagina) > limite else None
+    return {
+        'servicos': pagina[:limite],
+        'proximo_cursor': proximo_cursor,
+    }
+
+
+@memoizar(timeout=CACHE_TIMEOUT_CONSULTAS, tags=[f'{TAG_SERVICO}:militar={{militar.id}}'])
 def get_estatisticas_historico(militar: Militar, ano: int, mes: int) -> Dict:
     """
-    Obtém estatísticas do histórico de um militar.
+    Obtém estatísticas do histórico de um militar em uma única consulta agregada.
     
     Args:
         militar: Instância do Militar
@@ -716,16 +1211,16 @@ def get_estatisticas_historico(militar: Militar, ano: int, mes: int) -> Dict:
         mes: Mês de referência
         
     Returns:
-        Dicionário com estatísticas
+        Dicionário com 'total_servicos', 'ultimo_servico' (data ou None) e 'total_mes'
     """
-    servicos = Servico.objects.filter(militar=militar)
-    
-    total_servicos = servicos.count()
-    ultimo_servico = servicos.order_by('-data').first()
-    total_mes = servicos.filter(data__month=mes, data__year=ano).count()
+    inicio, fim = periodo_historico(ano, mes)
+    agregados = {'total_servicos': Count('id'), 'ultimo_servico': Max('data')}
+    if inicio:
+        agregados['total_mes'] = Count('id', filter=Q(data__range=(inicio, fim)))
+    estatisticas = Servico.objects.filter(militar=militar).aggregate(**agregados)
     
     return {
-        'total_servicos': total_servicos,
-        'ultimo_servico': ultimo_servico,
-        'total_mes': total_mes
+        'total_servicos': estatisticas['total_servicos'],
+        'ultimo_servico': estatisticas['ultimo_servico'],
+        'total_mes': estatisticas.get('total_mes', 0)
     }
@@ -0,0 +1,150 @@
+"""
+Sinais do app core: mantêm caches derivados e o resumo diário do dashboard
+coerentes com as gravações feitas por qualquer caminho (views, API, admin)
+e publicam os eventos de
+alteração da escala para os assinantes do stream SSE. Também instalam o
+contador de consultas SQL das métricas em cada conexão aberta.
+"""
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .calendario import TAG_FERIADO, recalcular_ultimos_servicos
+from .eventos import evento_afastamento, evento_servico, ha_assinantes, publicar_evento
+from .metricas import instalar_contador_consultas
+from .models import Afastamento, Feriado, Militar, Servico
+from .resumo_services import (
+    ajustar_resumo_afastados,
+    atualizar_resumo_militar,
+    atualizar_resumo_servicos,
+    atualizar_total_militares_resumo,
+)
+from .services import (
+    invalidar_cache_afastamentos,
+    invalidar_cache_militares,
+    invalidar_cache_servicos,
+    invalidar_todo_cache_efetivo,
+)
+from .utils.cache import invalidar_tags
+
+
+def _acao(kwargs):
+    if 'created' not in kwargs:
+        return 'excluido'
+    return 'criado' if kwargs['created'] else 'atualizado'
+
+
+class _ManutencaoServicos:
+    """
+    Manutenção das tabelas derivadas (resumo diário e último serviço),
+    acumulada ao longo de uma transação e executada uma vez no commit.
+    """
+
+    def __init__(self):
+        self.datas = set()
+        self.militares = set()
+        self.executada = False
+
+    def __call__(self):
+        self.executada = True
+        atualizar_resumo_servicos(self.datas)
+        recalcular_ultimos_servicos(self.militares)
+        # O efetivo calculado entre a gravação e o commit leu o último serviço
+        # antigo: invalida de novo, agora com as tabelas em dia
+        invalidar_cache_servicos(self.datas, self.militares)
+
+
+def _adiar_manutencao_servicos(datas, militares):
+    # Um único callback por transação: as gravações seguintes só somam
+    # datas/militares (se a transação for desfeita, o callback é descartado)
+    conexao = transaction.get_connection()
+    if not conexao.in_atomic_block:
+        manutencao = _ManutencaoServicos()
+        manutencao.datas.update(datas)
+        manutencao.militares.update(militares)
+        manutencao()
+        return
+    manutencao = next(
+        (f for _sids, f, _robust in conexao.run_on_commit
+         if isinstance(f, _ManutencaoServicos) and not f.executada), None
+    )
+    if manutencao is None:
+        manutencao = _ManutencaoServicos()
+        transaction.on_commit(manutencao)
+    manutencao.datas.update(datas)
+    manutencao.militares.update(militares)
+
+
+@receiver([post_save, post_delete], sender=Servico)
+def servico_alterado(sender, instance, **kwargs):
+    # Inclui o efetivo do dia seguinte ("serviço ontem") e, numa edição,
+    # a data/militar anteriores
+    militar_anterior, data_anterior = getattr(instance, '_original', (None, None))
+    datas = [d for d in (instance.data, data_anterior) if d]
+    invalidar_cache_servicos(datas, [m for m in (instance.militar_id, militar_anterior) if m])
+    # Na exclusão do próprio militar (cascata) não há o que recalcular
+    origem = kwargs.get('origin')
+    militares = [instance.militar_id, militar_anterior] if getattr(origem, 'model', type(origem)) is not Militar else []
+    if getattr(instance, '_adiar_derivados', False):
+        # Gravação confiável (Servico.save(validar=False)): só a instrução do
+        # serviço agora; resumo e último serviço uma vez no commit
+        _adiar_manutencao_servicos(datas, [m for m in militares if m])
+    else:
+        atualizar_resumo_servicos(datas)
+        if militares:
+            recalcular_ultimos_servicos(militares)
+    instance._original = (instance.militar_id, instance.data)
+
+    if ha_assinantes():
+        publicar_evento(evento_servico(
+            _acao(kwargs), instance.id, instance.data, instance.militar_id,
+            instance.militar.subunidade, instance.tipo
+        ))
+
+
+@receiver([post_save, post_delete], sender=Afastamento)
+def afastamento_alterado(sender, instance, **kwargs):
+    invalidar_cache_afastamentos([instance.militar_id])
+
+    # Resumo diário: desconta o período anterior (edição/exclusão) e soma o atual
+    anterior = getattr(instance, '_periodo_original', (None, None))
+    atual = (instance.data_inicio, instance.data_fim) if 'created' in kwargs else (None, None)
+    if anterior != atual:
+        if all(anterior):
+            ajustar_resumo_afastados(*anterior, -1)
+        if all(atual):
+            ajustar_resumo_afastados(*atual, 1)
+    instance._periodo_original = atual
+
+    if ha_assinantes():
+        publicar_evento(evento_afastamento(_acao(kwargs), instance))
+
+
+@receiver([post_save, post_delete], sender=Militar)
+def militar_alterado(sender, instance, **kwargs):
+    invalidar_cache_militares()
+
+    if kwargs.get('created', True):
+        # Inclusão ou exclusão (os serviços/afastamentos excluídos em cascata
+        # atualizam o resumo pelos próprios sinais)
+        atualizar_total_militares_resumo()
+    elif instance.subunidade != getattr(instance, '_subunidade_original', instance.subunidade):
+        atualizar_resumo_militar(instance.id)
+    instance._subunidade_original = instance.subunidade
+
+
+@receiver([post_save, post_delete], sender=Feriado)
+def feriado_alterado(sender, instance, **kwargs):
+    # Os serviços da data (e da anterior, numa edição) mudam de escala
+    datas = {d for d in (instance.data, getattr(instance, '_data_original', None)) if d}
+    invalidar_tags(TAG_FERIADO)
+    invalidar_todo_cache_efetivo()
+    recalcular_ultimos_servicos(
+        Servico.objects.filter(data__in=datas).values_list('militar_id', flat=True)
+    )
+    instance._data_original = instance.data if 'created' in kwargs else None
+
+
+# Consultas SQL por requisição (métricas do Prometheus)
+connection_created.connect(instalar_contador_consultas, dispatch_uid='metricas_contador_consultas')
@@ -0,0 +1,223 @@
+"""
+Geração de dados sintéticos em escala de batalhão (militares, serviços e
+afastamentos) para benchmarks e testes de carga.
+
+Os dados respeitam as regras de negócio da escala:
+- graduações só recebem os tipos de ``tipos_permitidos_por_graduacao``;
+- cargos especiais são únicos por dia;
+- no máximo um serviço por militar por dia e nunca em dias seguidos;
+- nenhum serviço durante afastamento, e afastamentos do mesmo militar não
+  se sobrepõem.
+
+Tudo é gravado com ``bulk_create`` em lotes; os caches dependentes são
+invalidados ao final (os sinais de gravação não são disparados).
+"""
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from .calendario import recalcular_ultimos_servicos
+from .models import Afastamento, Militar, Servico, UltimoServico
+from .resumo_services import descartar_resumos
+from .services import (
+    CARGOS_ESPECIAIS,
+    TAG_AFASTAMENTO,
+    TAG_EFETIVO,
+    TAG_MILITAR,
+    TAG_SERVICO,
+    tipos_permitidos_por_graduacao,
+)
+from .utils.busca import chave_busca
+from .utils.cache import invalidar_tags
+
+
+# Proporção aproximada de cada graduação no efetivo
+DISTRIBUICAO_GRADUACOES = (
+    ('SD', 0.55), ('CB', 0.18), ('3SG', 0.09), ('2SG', 0.05), ('1SG', 0.03),
+    ('ST', 0.02), ('ASP', 0.01), ('2TEN', 0.03), ('1TEN', 0.02), ('CAP', 0.02),
+)
+
+SUBUNIDADES_PADRAO = ('1ª Cia', '2ª Cia', '3ª Cia', 'CCAp', 'Base Adm')
+
+NOMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves',
+    'Pereira', 'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho',
+    'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+)
+
+# Fração do efetivo escalada por dia nos serviços comuns (guarda, plantão, permanência)
+TAXA_SERVICO_DIARIA = 0.06
+
+# Tipos comuns (não exclusivos por dia)
+TIPOS_COMUNS = ('GUARDA', 'GUARDA', 'GUARDA', 'PLANTAO', 'PERMANENCIA')
+
+TAMANHO_LOTE = 2000
+
+
+def _sortear_graduacao(rng: random.Random) -> str:
+    graduacoes, pesos = zip(*DISTRIBUICAO_GRADUACOES)
+    return rng.choices(graduacoes, weights=pesos)[0]
+
+
+def _gerar_periodos_afastamento(rng: random.Random, inicio: date, fim: date) -> List[tuple]:
+    """Sorteia afastamentos sem sobreposição para um militar no período."""
+    periodos = []
+    ano = inicio.year
+    while date(ano, 1, 1) <= fim:
+        # Férias anuais (30 dias) para a maioria do efetivo
+        if rng.random() < 0.9:
+            comeco = date(ano, 1, 1) + timedelta(days=rng.randrange(0, 330))
+            periodos.append(('FERIAS', comeco, comeco + timedelta(days=29)))
+        # Dispensas e dispensas médicas curtas
+        for _ in range(rng.choice((0, 0, 1, 1, 2))):
+            comeco = date(ano, 1, 1) + timedelta(days=rng.randrange(0, 360))
+            tipo = rng.choice(('DISPENSA', 'MEDICA', 'LICENCA'))
+            periodos.append((tipo, comeco, comeco + timedelta(days=rng.randrange(0, 5))))
+        ano += 1
+
+    # Descarta os que se sobrepõem a um período já aceito ou saem do intervalo
+    aceitos = []
+    for tipo, comeco, termino in sorted(periodos, key=lambda p: p[1]):
+        if termino < inicio or comeco > fim:
+            continue
+        if aceitos and comeco <= aceitos[-1][2]:
+            continue
+        aceitos.append((tipo, comeco, termino))
+    return aceitos
+
+
+def limpar_dados_escala() -> None:
+    """
+    Remove todos os militares, serviços e afastamentos (usuários são mantidos).
+
+    Usa ``DELETE`` direto para não disparar sinais linha a linha.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        for modelo in (Servico, Afastamento, UltimoServico, Militar):
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}')
+    invalidar_tags(TAG_SERVICO, TAG_AFASTAMENTO, TAG_MILITAR, TAG_EFETIVO)
+    descartar_resumos()
+
+
+def gerar_dados_sinteticos(militares: int = 100, anos: int = 1, fim: Optional[date] = None,
+                           subunidades: Sequence[str] = SUBUNIDADES_PADRAO,
+                           taxa_servico: float = TAXA_SERVICO_DIARIA,
+                           semente: Optional[int] = None,
+                           tamanho_lote: int = TAMANHO_LOTE) -> Dict[str, int]:
+    """
+    Gera um efetivo sintético com histórico de serviços e afastamentos.
+
+    Args:
+        militares: Quantidade de militares
+        anos: Anos de histórico de serviços até ``fim``
+        fim: Último dia do histórico (padrão: hoje)
+        subunidades: Subunidades entre as quais o efetivo é distribuído
+        taxa_servico: Fração do efetivo escalada por dia nos serviços comuns
+        semente: Semente do gerador aleatório (dados reproduzíveis)
+        tamanho_lote: Registros por ``bulk_create``
+
+    Returns:
+        Dicionário com a quantidade de militares, serviços e afastamentos criados
+    """
+    rng = random.Random(semente)
+    fim = fim or date.today()
+    inicio = fim - timedelta(days=365 * anos - 1)
+
+    # 1️⃣ Militares
+    novos = []
+    for i in range(militares):
+        graduacao = _sortear_graduacao(rng)
+        nome = f'{rng.choice(NOMES)} {rng.choice(NOMES)} {i + 1:05d}'
+        novos.append(Militar(
+            nome=nome,
+            nome_busca=chave_busca(nome),
+            graduacao=graduacao,
+            subunidade=subunidades[i % len(subunidades)],
+            ativo=rng.random() > 0.02,
+        ))
+    ultimo_id = Militar.objects.aggregate(maior=Max('id'))['maior'] or 0
+    with transaction.atomic():
+        Militar.objects.bulk_create(novos, batch_size=tamanho_lote)
+    # Recarrega para obter os IDs em qualquer banco
+    efetivo = list(
+        Militar.objects.filter(id__gt=ultimo_id, ativo=True)
+        .order_by('id')
+        .values_list('id', 'graduacao')
+    )
+
+    # 2️⃣ Afastamentos e dias afastados por militar
+    afastamentos = []
+    afastados_por_dia = {}
+    for militar_id, _graduacao in efetivo:
+        for tipo, comeco, termino in _gerar_periodos_afastamento(rng, inicio, fim):
+            afastamentos.append(Afastamento(
+                militar_id=militar_id, tipo=tipo, data_inicio=comeco, data_fim=termino
+            ))
+            dia = max(comeco, inicio)
+            while dia <= min(termino, fim):
+                afastados_por_dia.setdefault(dia, set()).add(militar_id)
+                dia += timedelta(days=1)
+    with transaction.atomic():
+        Afastamento.objects.bulk_create(afastamentos, batch_size=tamanho_lote)
+
+    # 3️⃣ Serviços dia a dia
+    tipos_por_militar = {militar_id: tipos_permitidos_por_graduacao(grad) for militar_id, grad in efetivo}
+    comuns = [militar_id for militar_id, tipos in tipos_por_militar.items() if 'GUARDA' in tipos]
+    especiais = {
+        tipo: [militar_id for militar_id, tipos in tipos_por_militar.items() if tipo in tipos]
+        for tipo in sorted(CARGOS_ESPECIAIS)
+    }
+    por_dia = max(1, round(len(efetivo) * taxa_servico))
+
+    total_servicos = 0
+    lote = []
+    ontem = set()
+    dia = inicio
+    while dia <= fim:
+        bloqueados = ontem | afastados_por_dia.get(dia, set())
+        hoje = set()
+
+        for tipo, candidatos in especiais.items():
+            # Algumas tentativas aleatórias bastam; se todos estiverem bloqueados o cargo fica vago
+            for _ in range(5):
+                if not candidatos:
+                    break
+                militar_id = rng.choice(candidatos)
+                if militar_id not in bloqueados and militar_id not in hoje:
+                    hoje.add(militar_id)
+                    lote.append(Servico(militar_id=militar_id, data=dia, tipo=tipo))
+                    break
+
+        disponiveis = [m for m in comuns if m not in bloqueados and m not in hoje]
+        for militar_id in rng.sample(disponiveis, min(por_dia, len(disponiveis))):
+            hoje.add(militar_id)
+            lote.append(Servico(militar_id=militar_id, data=dia, tipo=rng.choice(TIPOS_COMUNS)))
+
+        if len(lote) >= tamanho_lote:
+            with transaction.atomic():
+                Servico.objects.bulk_create(lote)
+            total_servicos += len(lote)
+            lote = []
+
+        ontem = hoje
+        dia += timedelta(days=1)
+
+    if lote:
+        with transaction.atomic():
+            Servico.objects.bulk_create(lote)
+        total_servicos += len(lote)
+
+    # bulk_create não dispara sinais: invalida os caches dependentes e o
+    # resumo diário (recalculado sob demanda)
+    invalidar_tags(TAG_SERVICO, TAG_AFASTAMENTO, TAG_MILITAR, TAG_EFETIVO)
+    descartar_resumos()
+    recalcular_ultimos_servicos([militar_id for militar_id, _graduacao in efetivo])
+
+    return {
+        'militares': len(novos),
+        'servicos': total_servicos,
+        'afastamentos': len(afastamentos),
+    }
@@ -0,0 +1,173 @@
+from datetime import date
+from unittest import mock
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from core.models import Militar, Afastamento, Servico
+from core.services import calcular_efetivo_por_data
+
+
+class ApiListagemTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username="leitor", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(7):
+            Militar.objects.create(nome=f"Militar {i}", graduacao="SD" if i % 2 else "CB",
+                                   subunidade="1ª Cia" if i < 5 else "2ª Cia", ativo=i != 3)
+        self.m = Militar.objects.get(nome="Militar 0")
+        Afastamento.objects.create(militar=self.m, tipo="FERIAS",
+                                   data_inicio=date(2026, 1, 1), data_fim=date(2026, 1, 10))
+        Afastamento.objects.create(militar=self.m, tipo="MEDICA",
+                                   data_inicio=date(2026, 3, 1), data_fim=date(2026, 3, 5))
+
+    def test_paginacao_por_cursor(self):
+        resp = self.client.get("/api/militares/", {"page_size": 3})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["results"]), 3)
+        nomes = [m["nome"] for m in resp.data["results"]]
+        resp = self.client.get(resp.data["next"])
+        nomes += [m["nome"] for m in resp.data["results"]]
+        self.assertEqual(len(set(nomes)), 6)
+
+    def test_filtros_e_campos(self):
+        resp = self.client.get("/api/militares/", {"subunidade": "1ª Cia", "ativo": "true", "fields": "nome"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["results"]), 4)
+        self.assertEqual(set(resp.data["results"][0]), {"nome"})
+
+        resp = self.client.get("/api/militares/", {"fields": "nome,senha"})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_filtro_periodo_afastamentos(self):
+        resp = self.client.get("/api/afastamentos/", {"inicio": "2026-01-05", "fim": "2026-02-01"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([a["tipo"] for a in resp.data["results"]], ["FERIAS"])
+        self.assertEqual(resp.data["results"][0]["militar"], self.m.id)
+
+        resp = self.client.get(f"/api/afastamentos/{Afastamento.objects.first().id}/", {"fields": "tipo"})
+        self.assertEqual(set(resp.data), {"tipo"})
+
+    def test_filtros_da_listagem_nao_afetam_o_detalhe(self):
+        resp = self.client.get(f"/api/militares/{self.m.id}/", {"ativo": "false", "q": "inexistente"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["nome"], "Militar 0")
+
+        afastamento = Afastamento.objects.get(tipo="MEDICA")
+        resp = self.client.get(f"/api/afastamentos/{afastamento.id}/", {"inicio": "2026-01-01", "fim": "2026-01-31"})
+        self.assertEqual(resp.status_code, 200)
+
+
+class ServicoApiTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_superuser(username="admin", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.data = date(2026, 5, 4)
+        self.sd1 = Militar.objects.create(nome="SD 1", graduacao="SD", subunidade="Geral")
+        self.sd2 = Militar.objects.create(nome="SD 2", graduacao="SD", subunidade="Geral")
+        self.cb = Militar.objects.create(nome="CB 1", graduacao="CB", subunidade="Geral")
+        self.cb2 = Militar.objects.create(nome="CB 2", graduacao="CB", subunidade="Geral")
+
+    def test_create_respeita_regras_de_graduacao(self):
+        resp = self.client.post("/api/servicos/", {"militar": self.sd1.id, "data": "2026-05-04", "tipo": "CABO_DIA"})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post("/api/servicos/", {"militar": self.cb.id, "data": "2026-05-04", "tipo": "CABO_DIA"})
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data["registrado_por"], self.user.id)
+
+    def test_bulk_create_atomico(self):
+        payload = {"data": "2026-05-04", "servicos": [
+            {"militar": self.sd1.id, "tipo": "GUARDA"},
+            {"militar": self.cb.id, "tipo": "CABO_DIA"},
+            {"militar": self.cb2.id, "tipo": "CABO_DIA"},
+        ]}
+        resp = self.client.post("/api/servicos/bulk/", payload, format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data["erros"][0]["indice"], 1)
+        self.assertFalse(Servico.objects.exists())
+
+        payload["servicos"][2]["tipo"] = "GUARDA"
+        resp = self.client.post("/api/servicos/bulk/", payload, format="json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(Servico.objects.filter(data=self.data).count(), 3)
+
+    def test_bulk_update_e_delete(self):
+        s1 = Servico.objects.create(militar=self.sd1, data=self.data, tipo="GUARDA")
+        s2 = Servico.objects.create(militar=self.cb, data=self.data, tipo="GUARDA")
+        payload = {"data": "2026-05-04", "servicos": [
+            {"id": s1.id, "militar": self.sd2.id},
+            {"id": s2.id, "tipo": "CABO_GUARDA"},
+        ]}
+        resp = self.client.patch("/api/servicos/bulk/", payload, format="json")
+        self.assertEqual(resp.status_code, 200)
+        s1.refresh_from_db()
+        s2.refresh_from_db()
+        self.assertEqual((s1.militar_id, s2.tipo), (self.sd2.id, "CABO_GUARDA"))
+
+        resp = self.client.delete("/api/servicos/bulk/", {"data": "2026-05-04", "ids": [s1.id, s2.id]}, format="json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(Servico.objects.exists())
+
+
+    def test_detalhe_ignora_filtros_e_sinais_invalidam_o_efetivo(self):
+        amanha = date(2026, 5, 5)
+        aptos = lambda: {e["militar"].id for e in calcular_efetivo_por_data(amanha) if e["apto"]}
+        self.assertIn(self.sd1.id, aptos())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post("/api/servicos/", {"militar": self.sd1.id, "data": "2026-05-04", "tipo": "GUARDA"})
+        self.assertEqual(resp.status_code, 201)
+        # Serviço ontem: o efetivo em cache do dia seguinte foi invalidado pelos sinais
+        self.assertNotIn(self.sd1.id, aptos())
+
+        resp = self.client.get(f"/api/servicos/{resp.data['id']}/", {"data": "2026-06-01"})
+        self.assertEqual(resp.status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.patch(f"/api/servicos/{resp.data['id']}/?militar={self.sd2.id}", {"data": "2026-05-03"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(self.sd1.id, aptos())
+
+
+class EfetivoJsonTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username="leitor", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.sd = Militar.objects.create(nome="SD 1", graduacao="SD", subunidade="Geral")
+
+    def test_etag_e_304(self):
+        resp = self.client.get("/api/efetivo/json/", {"data": "2026-05-04"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["efetivo"][0]["id"], self.sd.id)
+        etag = resp["ETag"]
+
+        resp = self.client.get("/api/efetivo/json/", {"data": "2026-05-04"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        Servico.objects.create(militar=self.sd, data=date(2026, 5, 4))
+        resp = self.client.get("/api/efetivo/json/", {"data": "2026-05-04"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+        self.assertTrue(resp.data["efetivo"][0]["ja_escalado"])
+
+    @mock.patch("core.views.EFETIVO_LONG_POLL_INTERVALO", 0.01)
+    def test_long_poll(self):
+        # Sem mudança: 304 ao fim da espera
+        etag = self.client.get("/api/efetivo/json/", {"data": "2026-05-04"})["ETag"]
+        resp = self.client.get("/api/efetivo/json/", {"data": "2026-05-04", "aguardar": 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        # Versão alterada por outro worker durante a espera: 200 com o novo ETag
+        with mock.patch("core.views.gerar_chave_cache_efetivo", side_effect=["v1", "v1", "v2", "v2"]):
+            resp = self.client.get(
+                "/api/efetivo/json/", {"data": "2026-05-04", "aguardar": 5}, HTTP_IF_NONE_MATCH='"v1"'
+            )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["ETag"], '"v2"')
+
+        resp = self.client.get("/api/efetivo/json/", {"aguardar": "x"})
+        self.assertEqual(resp.status_code, 400)
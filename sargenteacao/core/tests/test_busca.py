@@ -0,0 +1,67 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core.importacao_services import importar_militares_csv
+from core.models import Militar, Servico
+from core.services import calcular_efetivo_por_data, calcular_estatisticas_servico, filtrar_militares_aptos
+from core.utils.busca import chave_busca, corresponde_busca, filtro_busca_nome, termos_busca
+
+
+class ChaveBuscaTests(SimpleTestCase):
+    def test_normalizacao(self):
+        self.assertEqual(chave_busca("Sgt. João  D'Ávila"), "sgt joao d avila")
+        self.assertEqual(termos_busca("  CONCEIÇÃO  "), ["conceicao"])
+
+    def test_termos_casam_com_inicio_de_palavra(self):
+        chave = chave_busca("João da Silva")
+        self.assertTrue(corresponde_busca(chave, termos_busca("silva joão")))
+        self.assertTrue(corresponde_busca(chave, termos_busca("jo si")))
+        self.assertFalse(corresponde_busca(chave, termos_busca("ilva")))
+        self.assertTrue(corresponde_busca(chave, []))
+
+
+class BuscaMilitaresTests(TestCase):
+    def setUp(self):
+        self.joao = Militar.objects.create(nome="João da Silva", graduacao="SD", subunidade="1ª Cia")
+        self.jose = Militar.objects.create(nome="José Conceição", graduacao="CB", subunidade="1ª Cia")
+        Militar.objects.create(nome="Maria Joaquina", graduacao="SD", subunidade="2ª Cia")
+
+    def buscar(self, texto):
+        return set(Militar.objects.filter(filtro_busca_nome(texto)).values_list("nome", flat=True))
+
+    def test_banco_e_memoria_dao_o_mesmo_resultado(self):
+        efetivo = calcular_efetivo_por_data(date(2026, 5, 4))
+        for texto in ("joao", "JOÃO", "silva", "jo", "conceicao", "maria jo", "xyz", ""):
+            with self.subTest(texto=texto):
+                em_memoria = {e["militar"].nome for e in filtrar_militares_aptos(efetivo, texto)}
+                self.assertEqual(self.buscar(texto), em_memoria)
+        self.assertEqual(self.buscar("jo"), {"João da Silva", "José Conceição", "Maria Joaquina"})
+
+    def test_chave_mantida_no_save_e_na_importacao(self):
+        self.joao.nome = "João Ávila"
+        self.joao.save(update_fields=["nome"])
+        self.joao.refresh_from_db()
+        self.assertEqual(self.joao.nome_busca, "joao avila")
+
+        importar_militares_csv(iter(["nome,graduacao,subunidade,ativo", "Ângela Íris,SD,3ª Cia,1"]))
+        self.assertEqual(Militar.objects.get(nome="Ângela Íris").nome_busca, "angela iris")
+
+    def test_caixas_de_busca(self):
+        Servico.objects.create(militar=self.jose, data=date(2026, 5, 4))
+        self.assertEqual(
+            [s["militar"].nome for s in calcular_estatisticas_servico.sem_cache(
+                date(2026, 5, 1), date(2026, 5, 31), nome="jose"
+            )],
+            ["José Conceição"],
+        )
+
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        resposta = self.client.get(reverse("api_efetivo"), {"q": "joao"})
+        self.assertEqual([m.nome for m in resposta.context["militares"]], ["João da Silva"])
+
+        resposta = self.client.get(reverse("militar-list"), {"q": "conceição"})
+        self.assertEqual([m["nome"] for m in resposta.json()["results"]], ["José Conceição"])
+        self.assertNotIn("nome_busca", resposta.json()["results"][0])
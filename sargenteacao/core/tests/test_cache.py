@@ -0,0 +1,91 @@
+import threading
+import time
+from datetime import date
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Militar, Servico
+from core.services import get_estatisticas_historico, listar_subunidades
+from core.utils import cache as cache_utils
+from core.utils.cache import invalidar_tags, metricas_cache, obter_ou_calcular
+
+
+class ObterOuCalcularTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_single_flight_entre_threads(self):
+        chamadas = []
+
+        def calcular():
+            chamadas.append(1)
+            time.sleep(0.2)
+            return "efetivo"
+
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda: resultados.append(obter_ou_calcular("chave", calcular, 60)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(resultados, ["efetivo"] * 5)
+
+    def test_renovacao_antecipada(self):
+        obter_ou_calcular("chave", lambda: "v1", 60)
+        # Longe do vencimento: nunca renova
+        self.assertEqual(obter_ou_calcular("chave", lambda: "v2", 60), "v1")
+
+        # Perto do vencimento e com cálculo caro: renova antes de expirar
+        envelope = cache.get("chave")
+        envelope.update(delta=5.0, expira_em=time.time() + 1)
+        cache.set("chave", envelope, 60)
+        with mock.patch.object(cache_utils.random, "random", return_value=0.5):
+            self.assertEqual(obter_ou_calcular("chave", lambda: "v2", 60), "v2")
+
+    def test_valor_atual_enquanto_outro_recalcula(self):
+        obter_ou_calcular("chave", lambda: "v1", 60)
+        cache.add("chave:lock", "outro-worker", 30)
+        with mock.patch.object(cache_utils, "_deve_renovar", return_value=True):
+            self.assertEqual(obter_ou_calcular("chave", lambda: "v2", 60), "v1")
+
+
+class MemoizarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.militar = Militar.objects.create(nome="SD 1", graduacao="SD", subunidade="Geral")
+        self.outro = Militar.objects.create(nome="SD 2", graduacao="SD", subunidade="Geral")
+
+    def test_invalidacao_precisa_por_tag(self):
+        Servico.objects.create(militar=self.militar, data=date(2026, 1, 5))
+        self.assertEqual(get_estatisticas_historico(self.militar, 2026, 1)["total_servicos"], 1)
+
+        with self.assertNumQueries(0):
+            get_estatisticas_historico(self.militar, 2026, 1)
+
+        # Serviço de outro militar não invalida o histórico deste
+        Servico.objects.create(militar=self.outro, data=date(2026, 1, 6))
+        with self.assertNumQueries(0):
+            get_estatisticas_historico(self.militar, 2026, 1)
+
+        Servico.objects.create(militar=self.militar, data=date(2026, 1, 8))
+        self.assertEqual(get_estatisticas_historico(self.militar, 2026, 1)["total_servicos"], 2)
+
+    def test_metricas_de_acerto(self):
+        nome = "core.services.listar_subunidades"
+        antes = metricas_cache().get(nome, {"hits": 0, "misses": 0})
+        listar_subunidades()
+        listar_subunidades()
+        depois = metricas_cache()[nome]
+        self.assertEqual(depois["misses"] - antes["misses"], 1)
+        self.assertEqual(depois["hits"] - antes["hits"], 1)
+
+        invalidar_tags("militar")
+        listar_subunidades()
+        self.assertEqual(metricas_cache()[nome]["misses"] - antes["misses"], 2)
@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from core.carga_services import extrair_opcoes_registro, percentil, resumir_medicoes
+
+
+class CargaServicesTests(SimpleTestCase):
+    def test_extrai_apenas_tipos_livres_de_militares_aptos(self):
+        html = '''
+            <input type="checkbox" name="militares" value="7" class="form-check-input">
+            <select class="form-select" name="tipo_7">
+                <option  value="GUARDA" >Guarda</option>
+                <option  value="CABO_DIA" disabled>Cabo de Dia</option>
+            </select>
+            <select class="form-select" name="tipo_9">
+                <option  value="GUARDA" >Guarda</option>
+            </select>
+        '''
+        self.assertEqual(extrair_opcoes_registro(html), {7: ["GUARDA"]})
+
+    def test_resumo_por_endpoint(self):
+        self.assertEqual(percentil(list(range(1, 101)), 95), 95)
+        self.assertIsNone(percentil([], 50))
+
+        amostras = {
+            "registrar_servico": [(10.0, "ok"), (20.0, "ok"), (30.0, "bloqueio"), (40.0, "erro")],
+            "ver_efetivo": [(5.0, "ok")],
+        }
+        resumo = resumir_medicoes(amostras, duracao_s=2.0)
+        self.assertEqual(resumo["registrar_servico"]["requisicoes"], 4)
+        self.assertEqual(resumo["registrar_servico"]["throughput_rps"], 2.0)
+        self.assertEqual(resumo["registrar_servico"]["p50_ms"], 20.0)
+        self.assertEqual(resumo["registrar_servico"]["taxa_bloqueio"], 0.25)
+        self.assertEqual(resumo["registrar_servico"]["taxa_erro"], 0.25)
+        self.assertEqual(resumo["TOTAL"]["requisicoes"], 5)
+
+
+class BancoBloqueadoMiddlewareTests(TestCase):
+    def test_lock_do_banco_vira_503(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        with mock.patch("core.views.calcular_efetivo_por_data",
+                        side_effect=OperationalError("database is locked")):
+            resposta = self.client.get(reverse("registrar_servico"))
+        self.assertEqual(resposta.status_code, 503)
+        self.assertEqual(resposta["Retry-After"], "1")
+        self.assertEqual(resposta["X-Banco-Bloqueado"], "1")
@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.conflitos_services import aplicar_substituicoes, detectar_conflitos, propor_substituicoes
+from core.models import Afastamento, Militar, Servico
+
+
+class ConflitosAfastamentoTests(TestCase):
+    def setUp(self):
+        self.dia = date.today() + timedelta(days=10)
+        criar = lambda nome, grad="SD": Militar.objects.create(nome=nome, graduacao=grad, subunidade="1ª Cia")
+        self.doente = criar("Doente", "CB")
+        self.guarda = Servico.objects.create(militar=self.doente, data=self.dia, tipo="GUARDA")
+        self.cabo_dia = Servico.objects.create(militar=self.doente, data=self.dia + timedelta(days=2), tipo="CABO_DIA")
+        Servico.objects.create(militar=self.doente, data=self.dia + timedelta(days=30), tipo="GUARDA")
+
+        self.outro = criar("Outro")
+        self.servico_outro = Servico.objects.create(militar=self.outro, data=self.dia, tipo="GUARDA")
+
+        self.soldado = criar("Soldado")
+        self.cabo = criar("Cabo", "CB")
+
+    def afastar(self, militar, inicio, fim):
+        return Afastamento.objects.create(militar=militar, tipo="MEDICA", data_inicio=inicio, data_fim=fim)
+
+    def test_deteccao_em_uma_consulta(self):
+        afastamento = self.afastar(self.doente, self.dia, self.dia + timedelta(days=5))
+        self.afastar(self.outro, self.dia, self.dia)
+        with self.assertNumQueries(1):
+            conflitos = detectar_conflitos()
+        self.assertEqual(
+            [s.id for s in conflitos], sorted([self.guarda.id, self.servico_outro.id]) + [self.cabo_dia.id]
+        )
+        self.assertEqual(
+            [s.id for s in detectar_conflitos([afastamento.id])], [self.guarda.id, self.cabo_dia.id]
+        )
+        self.assertEqual(detectar_conflitos(inicio=self.dia + timedelta(days=1)), [self.cabo_dia])
+
+    def test_substituicoes_em_lote(self):
+        self.afastar(self.doente, self.dia, self.dia + timedelta(days=5))
+        self.afastar(self.outro, self.dia, self.dia)
+        propostas = propor_substituicoes(detectar_conflitos())
+
+        # Dois conflitos no mesmo dia não recebem o mesmo substituto
+        substitutos = {p['servico'].id: p['substituto'] for p in propostas}
+        self.assertEqual(
+            {substitutos[self.guarda.id].nome, substitutos[self.servico_outro.id].nome}, {"Soldado", "Cabo"}
+        )
+        self.assertEqual(substitutos[self.cabo_dia.id], self.cabo)
+
+        resultado = aplicar_substituicoes(propostas)
+        self.assertEqual(resultado['erros'], [])
+        self.assertEqual(detectar_conflitos(), [])
+        self.assertEqual(Servico.objects.get(id=self.cabo_dia.id).militar, self.cabo)
+
+    def test_falha_desfaz_todas_as_substituicoes(self):
+        self.afastar(self.doente, self.dia, self.dia + timedelta(days=5))
+        propostas = propor_substituicoes(detectar_conflitos())
+        # O substituto do segundo dia é afastado depois da proposta
+        self.afastar(self.cabo, self.dia + timedelta(days=2), self.dia + timedelta(days=2))
+
+        resultado = aplicar_substituicoes(propostas)
+        self.assertTrue(resultado['erros'])
+        self.assertEqual(resultado['substituidos'], [])
+        self.assertEqual(Servico.objects.get(id=self.guarda.id).militar, self.doente)
+
+    def test_api_e_comando(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        dados = {
+            "militar": self.doente.id, "tipo": "MEDICA",
+            "data_inicio": self.dia.isoformat(), "data_fim": (self.dia + timedelta(days=1)).isoformat(),
+        }
+        resposta = self.client.post(reverse("afastamento-list"), dados, content_type="application/json")
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual([c["servico"] for c in resposta.json()["conflitos"]], [self.guarda.id])
+        self.assertNotIn("substituicoes", resposta.json())
+
+        afastamento_id = resposta.json()["id"]
+        dados["data_fim"] = (self.dia + timedelta(days=3)).isoformat()
+        resposta = self.client.put(
+            reverse("afastamento-detail", args=[afastamento_id]) + "?resolver=1", dados,
+            content_type="application/json",
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(len(resposta.json()["substituicoes"]["substituidos"]), 2)
+
+        self.afastar(self.outro, self.dia, self.dia)
+        saida = StringIO()
+        call_command("resolver_conflitos_afastamento", stdout=saida)
+        self.assertIn("1 conflitos", saida.getvalue())
+        call_command("resolver_conflitos_afastamento", "--aplicar", stdout=saida)
+        self.assertEqual(detectar_conflitos(), [])
+
+
+class SubstituicoesEmDiasSeguidosTests(TestCase):
+    def setUp(self):
+        self.dia = date(2031, 3, 10)
+        criar = lambda nome, grad="SD": Militar.objects.create(nome=nome, graduacao=grad, subunidade="1ª Cia")
+        self.ferido = criar("Ferido")
+        for i in range(3):
+            Servico.objects.create(militar=self.ferido, data=self.dia + timedelta(days=i), tipo="GUARDA")
+        self.alfa = criar("Alfa")
+        self.bravo = criar("Bravo")
+        Afastamento.objects.create(
+            militar=self.ferido, tipo="MEDICA", data_inicio=self.dia, data_fim=self.dia + timedelta(days=2)
+        )
+
+    def test_substituto_nao_repete_em_dias_seguidos(self):
+        propostas = propor_substituicoes(detectar_conflitos())
+        # Alfa assume o primeiro dia; no segundo, véspera proposta, vai Bravo
+        self.assertEqual([p["substituto"] for p in propostas], [self.alfa, self.bravo, self.alfa])
+
+        resultado = aplicar_substituicoes(propostas)
+        self.assertEqual(resultado["erros"], [])
+        self.assertEqual(detectar_conflitos(), [])
+
+    def test_servico_real_no_dia_seguinte(self):
+        Servico.objects.create(militar=self.alfa, data=self.dia + timedelta(days=1), tipo="PLANTAO")
+        propostas = propor_substituicoes(detectar_conflitos())
+        self.assertEqual([p["substituto"] for p in propostas], [self.bravo, None, self.bravo])
+
+    @override_settings(REGRAS_EFETIVO=[
+        "core.regras_efetivo.RegraAfastamento",
+        "core.regras_efetivo.RegraServicoOntem",
+        "core.regras_efetivo.RegraJaEscalado",
+        ["core.regras_efetivo.RegraMaximoServicosMes", {"maximo": 1}],
+    ])
+    def test_regras_reavaliadas_com_as_propostas(self):
+        propostas = propor_substituicoes(detectar_conflitos())
+        # No terceiro dia Alfa já teria um serviço (proposto) no mês
+        self.assertEqual([p["substituto"] for p in propostas], [self.alfa, self.bravo, None])
@@ -0,0 +1,90 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from core.consistencia_services import varrer_cargos_especiais, verificar_consistencia
+from core.models import Afastamento, Militar, Servico
+from core.sinteticos_services import gerar_dados_sinteticos
+
+
+def resumo(violacoes):
+    return sorted((v["regra"], v["militar_id"], v["data"]) for v in violacoes)
+
+
+class VarredurasTests(SimpleTestCase):
+    def test_cargos_especiais_repetidos(self):
+        linhas = [
+            (1, 10, date(2026, 1, 1), "ADJUNTO"),
+            (2, 11, date(2026, 1, 1), "ADJUNTO"),
+            (3, 12, date(2026, 1, 1), "CABO_DIA"),
+            (4, 13, date(2026, 1, 2), "ADJUNTO"),
+        ]
+        violacoes = list(varrer_cargos_especiais(linhas))
+        self.assertEqual([(v["servico_id"], v["militar_id"]) for v in violacoes], [(2, 11)])
+        self.assertIn("serviço 1", violacoes[0]["detalhe"])
+
+
+class ConsistenciaTests(TestCase):
+    def setUp(self):
+        self.sd = Militar.objects.create(nome="Soldado", graduacao="SD", subunidade="1ª Cia")
+        self.cb = Militar.objects.create(nome="Cabo", graduacao="CB", subunidade="1ª Cia")
+        self.so_afastado = Militar.objects.create(nome="Afastado", graduacao="SD", subunidade="2ª Cia")
+        # Dados "históricos", gravados sem as validações atuais (os serviços
+        # antes dos afastamentos, que o gatilho do banco impediria)
+        Servico.objects.bulk_create([
+            Servico(militar=self.sd, data=date(2020, 2, 27), tipo="GUARDA"),
+            Servico(militar=self.sd, data=date(2020, 2, 28), tipo="CABO_DIA"),
+            Servico(militar=self.sd, data=date(2020, 3, 15), tipo="GUARDA"),
+            Servico(militar=self.sd, data=date(2020, 3, 21), tipo="GUARDA"),
+            Servico(militar=self.cb, data=date(2020, 3, 15), tipo="CABO_DIA"),
+            Servico(militar=self.cb, data=date(2020, 3, 17), tipo="GUARDA"),
+        ])
+        Afastamento.objects.bulk_create([
+            Afastamento(militar=self.sd, tipo="FERIAS", data_inicio=date(2020, 3, 1), data_fim=date(2020, 3, 20)),
+            Afastamento(militar=self.sd, tipo="DISPENSA", data_inicio=date(2020, 3, 10), data_fim=date(2020, 3, 12)),
+            Afastamento(militar=self.so_afastado, tipo="LICENCA", data_inicio=date(2020, 1, 1), data_fim=date(2020, 1, 9)),
+            Afastamento(militar=self.so_afastado, tipo="LICENCA", data_inicio=date(2020, 1, 5), data_fim=date(2020, 1, 6)),
+        ])
+
+    def test_todas_as_regras_em_quatro_consultas(self):
+        with self.assertNumQueries(4):
+            violacoes = list(verificar_consistencia())
+        self.assertEqual(resumo(violacoes), sorted([
+            ("afastamentos_sobrepostos", self.sd.id, date(2020, 3, 10)),
+            ("afastamentos_sobrepostos", self.so_afastado.id, date(2020, 1, 5)),
+            ("dias_seguidos", self.sd.id, date(2020, 2, 28)),
+            ("graduacao_nao_permitida", self.sd.id, date(2020, 2, 28)),
+            ("servico_em_afastamento", self.sd.id, date(2020, 3, 15)),
+        ]))
+        self.assertEqual({v["militar"] for v in violacoes}, {"Soldado", "Afastado"})
+
+        self.assertEqual(
+            resumo(verificar_consistencia(inicio=date(2020, 3, 1), regras=["servico_em_afastamento", "dias_seguidos"])),
+            [("servico_em_afastamento", self.sd.id, date(2020, 3, 15))],
+        )
+
+    def test_dados_sinteticos_sem_violacoes(self):
+        Servico.objects.all().delete()
+        Afastamento.objects.all().delete()
+        gerar_dados_sinteticos(militares=40, anos=1, fim=date(2026, 6, 30), semente=3)
+        self.assertEqual(list(verificar_consistencia()), [])
+
+    def test_comando_csv_e_json(self):
+        saida = StringIO()
+        call_command("verificar_consistencia", "--regra", "dias_seguidos", stdout=saida, stderr=StringIO())
+        linhas = list(csv.DictReader(StringIO(saida.getvalue())))
+        self.assertEqual([(l["regra"], l["data"], l["militar"]) for l in linhas], [("dias_seguidos", "2020-02-28", "Soldado")])
+
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, "violacoes.json")
+            resumo_saida = StringIO()
+            call_command("verificar_consistencia", "--formato", "json", "--saida", arquivo, stdout=resumo_saida)
+            with open(arquivo, encoding="utf-8") as f:
+                self.assertEqual(len(json.load(f)), 5)
+        self.assertIn("5 violações", resumo_saida.getvalue())
@@ -0,0 +1,225 @@
+"""
+Testes de regressão do número de consultas SQL.
+
+Cada cenário (função da camada de serviços ou view) é executado sobre dois
+efetivos sintéticos de tamanhos diferentes. O número de consultas deve ser
+o mesmo nas duas escalas (sem N+1) e não pode passar do limite registrado
+em ``LIMITES``. Em caso de falha, a mensagem traz o SQL executado.
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Militar, Servico
+from core.pdf_services import gerar_aditamento_pdf, gerar_relatorio_mensal_pdf
+from core.resumo_services import obter_resumo_diario
+from core.services import (
+    _calcular_efetivo,
+    aplicar_escala_em_lote,
+    calcular_estatisticas_servico,
+    gerar_eventos_calendario,
+    get_estatisticas_historico,
+    get_tipos_ocupados_por_data,
+    registrar_servicos,
+)
+from core.sinteticos_services import gerar_dados_sinteticos
+from core.utils.permissoes import ADMIN_GROUP, MILITAR_GROUP, SARGENTEANTE_GROUP
+
+
+ESCALAS = (15, 60)
+
+# No futuro: a edição da escala só é permitida a partir de hoje
+DATA_REF = date.today() + timedelta(days=7)
+
+# Limite de consultas por cenário (atualize conscientemente ao alterar um cenário)
+LIMITES = {
+    'services.calcular_efetivo': 4,
+    'services.calcular_estatisticas_servico': 2,
+    'services.gerar_eventos_calendario': 2,
+    'services.get_estatisticas_historico': 1,
+    'services.get_tipos_ocupados_por_data': 1,
+    'services.registrar_servicos': 10,
+    'services.aplicar_escala_em_lote': 18,
+    'pdf.aditamento': 1,
+    'pdf.relatorio_mensal': 1,
+    'view.ver_efetivo': 7,
+    'view.efetivo_json': 6,
+    'view.registrar_servico_get': 11,
+    'view.registrar_servico_post': 16,
+    'view.editar_servico_get': 7,
+    'view.editar_servico_post': 17,
+    'view.estatisticas_servico': 7,
+    'view.calendario_events': 4,
+    'view.historico_militar': 5,
+    'view.aditamento_pdf': 3,
+    'view.relatorio_mensal_pdf': 4,
+    'view.admin_user_management': 9,
+    'view.dashboard': 4,
+    'view.api_militares': 3,
+    'view.api_afastamentos': 3,
+    'view.api_servicos': 3,
+}
+
+
+def _preparar_escala(militares: int) -> dict:
+    """Gera o efetivo sintético e alguns usuários; retorna o contexto dos cenários."""
+    gerar_dados_sinteticos(militares=militares, anos=1, fim=DATA_REF, semente=7)
+    # Resumo diário já calculado (estado normal: as gravações o mantêm)
+    for dia in (date.today(), DATA_REF, DATA_REF + timedelta(days=1)):
+        obter_resumo_diario(dia)
+
+    grupos = [Group.objects.get_or_create(name=nome)[0] for nome in (ADMIN_GROUP, SARGENTEANTE_GROUP, MILITAR_GROUP)]
+    for i in range(militares // 5):
+        usuario = User.objects.create_user(username=f'usuario{i}', password='x')
+        usuario.groups.add(grupos[i % len(grupos)])
+
+    admin = User.objects.create_superuser(username='admin_consultas', password='x')
+    militar = (
+        Militar.objects.filter(ativo=True, servicos__data__month=DATA_REF.month, servicos__data__year=DATA_REF.year)
+        .order_by('id').first()
+    )
+    return {'admin': admin, 'militar': militar}
+
+
+class ContagemConsultasMixin:
+    """Executa cada cenário nas duas escalas, isolado em um savepoint."""
+
+    def medir_cenarios(self, cenarios):
+        medicoes = {}
+        for escala in ESCALAS:
+            sid_escala = transaction.savepoint()
+            try:
+                contexto = _preparar_escala(escala)
+                for nome, cenario in cenarios(contexto):
+                    sid = transaction.savepoint()
+                    try:
+                        cache.clear()
+                        with CaptureQueriesContext(connection) as capturadas:
+                            cenario()
+                    finally:
+                        transaction.savepoint_rollback(sid)
+                    medicoes.setdefault(nome, {})[escala] = [q['sql'] for q in capturadas.captured_queries]
+            finally:
+                transaction.savepoint_rollback(sid_escala)
+        return medicoes
+
+    def verificar(self, medicoes):
+        menor, maior = ESCALAS
+        for nome, por_escala in medicoes.items():
+            with self.subTest(cenario=nome):
+                sql = '\n'.join(por_escala[maior])
+                self.assertEqual(
+                    len(por_escala[menor]), len(por_escala[maior]),
+                    f'{nome}: consultas variam com o efetivo ({menor} -> {maior}):\n{sql}'
+                )
+                self.assertLessEqual(
+                    len(por_escala[maior]), LIMITES[nome],
+                    f'{nome}: {len(por_escala[maior])} consultas (limite {LIMITES[nome]}):\n{sql}'
+                )
+
+
+class ConsultasServicosTests(ContagemConsultasMixin, TestCase):
+    def test_numero_de_consultas_constante(self):
+        def cenarios(contexto):
+            militar = contexto['militar']
+            dia = DATA_REF + timedelta(days=1)
+            # Três militares aptos a GUARDA, independentemente da escala
+            soldados = list(Militar.objects.filter(ativo=True, graduacao='SD').order_by('id')[:3])
+            servicos_dia = list(Servico.objects.filter(data=DATA_REF).order_by('id')[:2])
+
+            def pdf_aditamento():
+                gerar_aditamento_pdf(DATA_REF, Servico.objects.filter(data=DATA_REF).select_related('militar'))
+
+            def pdf_relatorio_mensal():
+                servicos = Servico.objects.filter(
+                    militar=militar, data__year=DATA_REF.year, data__month=DATA_REF.month
+                ).order_by('data')
+                gerar_relatorio_mensal_pdf(militar, servicos, DATA_REF.month, DATA_REF.year)
+
+            return [
+                ('services.calcular_efetivo', lambda: _calcular_efetivo(DATA_REF)),
+                ('services.calcular_estatisticas_servico',
+                 lambda: calcular_estatisticas_servico.sem_cache(DATA_REF.replace(day=1), DATA_REF)),
+                ('services.gerar_eventos_calendario',
+                 lambda: gerar_eventos_calendario.sem_cache(DATA_REF - timedelta(days=30), DATA_REF)),
+                ('services.get_estatisticas_historico',
+                 lambda: get_estatisticas_historico.sem_cache(militar, DATA_REF.year, DATA_REF.month)),
+                ('services.get_tipos_ocupados_por_data', lambda: get_tipos_ocupados_por_data(DATA_REF)),
+                ('services.registrar_servicos',
+                 lambda: registrar_servicos(soldados, {m.id: 'GUARDA' for m in soldados}, dia, contexto['admin'])),
+                ('services.aplicar_escala_em_lote',
+                 lambda: aplicar_escala_em_lote(
+                     DATA_REF,
+                     atualizar=[{'id': servicos_dia[0].id, 'tipo': servicos_dia[0].tipo}],
+                     excluir=[servicos_dia[1].id],
+                     registrado_por=contexto['admin'],
+                 )),
+                ('pdf.aditamento', pdf_aditamento),
+                ('pdf.relatorio_mensal', pdf_relatorio_mensal),
+            ]
+
+        self.verificar(self.medir_cenarios(cenarios))
+
+
+class ConsultasViewsTests(ContagemConsultasMixin, TestCase):
+    def test_numero_de_consultas_constante(self):
+        def cenarios(contexto):
+            cliente = self.client
+            cliente.force_login(contexto['admin'])
+            militar = contexto['militar']
+            data_iso = DATA_REF.isoformat()
+            soldados = list(Militar.objects.filter(ativo=True, graduacao='SD').order_by('id')[:3])
+            servicos_dia = list(Servico.objects.filter(data=DATA_REF).order_by('id')[:2])
+
+            def get(url):
+                def executar():
+                    resposta = cliente.get(url)
+                    self.assertEqual(resposta.status_code, 200, url)
+                    if resposta.streaming:
+                        b''.join(resposta.streaming_content)
+                return executar
+
+            def post(url, dados):
+                def executar():
+                    resposta = cliente.post(url, dados)
+                    self.assertEqual(resposta.status_code, 302, url)
+                return executar
+
+            dia_seguinte = (DATA_REF + timedelta(days=1)).isoformat()
+            dados_registro = {'data': dia_seguinte, 'militares': [str(m.id) for m in soldados]}
+            dados_registro.update({f'tipo_{m.id}': 'GUARDA' for m in soldados})
+
+            dados_edicao = {'data': data_iso, f'delete_{servicos_dia[1].id}': 'on'}
+            for s in servicos_dia:
+                dados_edicao.update({f'tipo_{s.id}': s.tipo, f'militar_{s.id}': str(s.militar_id)})
+
+            return [
+                ('view.ver_efetivo', get(f"{reverse('ver_efetivo')}?data={data_iso}")),
+                ('view.efetivo_json', get(f"{reverse('efetivo_do_dia')}?data={data_iso}")),
+                ('view.registrar_servico_get', get(f"{reverse('registrar_servico')}?data={data_iso}")),
+                ('view.registrar_servico_post', post(reverse('registrar_servico'), dados_registro)),
+                ('view.editar_servico_get', get(f"{reverse('editar_servico')}?data={data_iso}")),
+                ('view.editar_servico_post', post(reverse('editar_servico'), dados_edicao)),
+                ('view.estatisticas_servico',
+                 get(f"{reverse('estatisticas_servico')}?inicio={DATA_REF.replace(day=1).isoformat()}&fim={data_iso}")),
+                ('view.calendario_events',
+                 get(f"{reverse('calendario_events')}?start={(DATA_REF - timedelta(days=30)).isoformat()}"
+                     f"&end={data_iso}")),
+                ('view.historico_militar', get(reverse('historico_militar', args=[militar.id]))),
+                ('view.aditamento_pdf',
+                 get(reverse('aditamento_pdf_por_data', args=[DATA_REF.year, DATA_REF.month, DATA_REF.day]))),
+                ('view.relatorio_mensal_pdf',
+                 get(reverse('relatorio_mensal_militar_pdf', args=[militar.id, DATA_REF.year, DATA_REF.month]))),
+                ('view.admin_user_management', get(reverse('admin_user_management'))),
+                ('view.dashboard', get(reverse('dashboard'))),
+                ('view.api_militares', get(reverse('militar-list'))),
+                ('view.api_afastamentos', get(reverse('afastamento-list'))),
+                ('view.api_servicos', get(reverse('servico-list'))),
+            ]
+
+        self.verificar(self.medir_cenarios(cenarios))
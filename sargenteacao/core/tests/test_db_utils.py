@@ -0,0 +1,34 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import SimpleTestCase
+
+from core.utils.db import repetir_em_bloqueio
+
+
+class RepetirEmBloqueioTests(SimpleTestCase):
+    def test_repete_quando_banco_bloqueado(self):
+        chamadas = []
+
+        @repetir_em_bloqueio(tentativas=3, espera_inicial=0)
+        def gravar():
+            chamadas.append(1)
+            if len(chamadas) < 3:
+                raise OperationalError("database is locked")
+            return "ok"
+
+        with mock.patch("core.utils.db.time.sleep"):
+            self.assertEqual(gravar(), "ok")
+        self.assertEqual(len(chamadas), 3)
+
+    def test_nao_repete_outros_erros(self):
+        chamadas = []
+
+        @repetir_em_bloqueio(tentativas=3, espera_inicial=0)
+        def gravar():
+            chamadas.append(1)
+            raise OperationalError("no such table: core_militar")
+
+        with self.assertRaises(OperationalError):
+            gravar()
+        self.assertEqual(len(chamadas), 1)
@@ -0,0 +1,57 @@
+import json
+import tempfile
+from datetime import date
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import elegibilidade
+from core.elegibilidade import GRADUACOES, TIPOS, RegrasCompiladas, pode_exercer
+from core.models import Militar
+from core.services import aplicar_escala_em_lote, graduacoes_permitidas_por_tipo, tipos_permitidos_por_graduacao
+
+
+class RegrasElegibilidadeTests(SimpleTestCase):
+    def test_tabelas_direta_e_inversa_concordam(self):
+        for graduacao in GRADUACOES:
+            for tipo in TIPOS:
+                with self.subTest(graduacao=graduacao, tipo=tipo):
+                    permitido = pode_exercer(graduacao, tipo)
+                    self.assertEqual(tipo in tipos_permitidos_por_graduacao(graduacao), permitido)
+                    self.assertEqual(graduacao in graduacoes_permitidas_por_tipo(tipo), permitido)
+        # GUARDA: somente SD e CB (antes a função inversa também aceitava sargentos e tenentes)
+        self.assertEqual(graduacoes_permitidas_por_tipo("GUARDA"), ("SD", "CB"))
+        self.assertEqual(
+            tipos_permitidos_por_graduacao("CB"),
+            ("GUARDA", "PLANTAO", "PERMANENCIA", "CABO_GUARDA", "CABO_DIA"),
+        )
+        self.assertIs(tipos_permitidos_por_graduacao("CB"), tipos_permitidos_por_graduacao("CB"))
+
+    def test_tabela_invalida(self):
+        with self.assertRaises(ImproperlyConfigured):
+            RegrasCompiladas({"GUARDA": ["XYZ"]})
+        with self.assertRaises(ImproperlyConfigured):
+            RegrasCompiladas({"FAXINA": ["SD"]})
+
+    def test_regras_da_configuracao(self):
+        with override_settings(ELEGIBILIDADE_SERVICO={"GUARDA": ["SD", "3SG"]}):
+            self.assertTrue(pode_exercer("3SG", "GUARDA"))
+            self.assertFalse(pode_exercer("CB", "GUARDA"))
+
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as arquivo:
+            json.dump({"PLANTAO": ["CB"]}, arquivo)
+            arquivo.flush()
+            with override_settings(ELEGIBILIDADE_SERVICO_ARQUIVO=arquivo.name):
+                self.assertEqual(elegibilidade.tipos_da_graduacao("CB"), ("PLANTAO",))
+
+        # Ao sair do override as regras padrão são recompiladas
+        self.assertTrue(pode_exercer("CB", "GUARDA"))
+
+
+class RegrasNaEscalaTests(TestCase):
+    @override_settings(ELEGIBILIDADE_SERVICO={**elegibilidade.REGRAS_PADRAO, "GUARDA": ["SD", "CB", "3SG"]})
+    def test_unidade_altera_regra_sem_codigo(self):
+        sargento = Militar.objects.create(nome="Sgt", graduacao="3SG", subunidade="Geral")
+        resultado = aplicar_escala_em_lote(date(2026, 6, 1), criar=[{"militar": sargento.id, "tipo": "GUARDA"}])
+        self.assertEqual(resultado["erros"], [])
+        self.assertEqual(len(resultado["criados"]), 1)
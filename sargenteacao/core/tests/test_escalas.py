@@ -0,0 +1,89 @@
+from datetime import date
+
+from django.test import TestCase, override_settings
+
+from core.calendario import (
+    ESCALA_PRETA, ESCALA_VERMELHA, escala_da_data, recalcular_ultimos_servicos, ultimos_servicos,
+)
+from core.models import Feriado, Militar, Servico, UltimoServico
+from core.services import _calcular_efetivo, registrar_servicos
+
+
+QUARTA = date(2026, 5, 6)
+SABADO_ANTERIOR = date(2026, 5, 2)
+SABADO = date(2026, 5, 9)
+
+
+def ultimo(militar):
+    registro = UltimoServico.objects.get(militar=militar)
+    return registro.data_preta, registro.data_vermelha
+
+
+class EscalaPretaVermelhaTests(TestCase):
+    def setUp(self):
+        self.a = Militar.objects.create(nome="Alfa", graduacao="SD", subunidade="1ª Cia")
+        self.b = Militar.objects.create(nome="Bravo", graduacao="SD", subunidade="1ª Cia")
+        # Alfa: fim de semana anterior e quarta; Bravo: somente segunda
+        Servico.objects.create(militar=self.a, data=SABADO_ANTERIOR, tipo="GUARDA")
+        Servico.objects.create(militar=self.a, data=QUARTA, tipo="GUARDA")
+        Servico.objects.create(militar=self.b, data=date(2026, 5, 4), tipo="GUARDA")
+
+    def test_ultimo_servico_por_escala_mantido_nas_gravacoes(self):
+        self.assertEqual(ultimo(self.a), (QUARTA, SABADO_ANTERIOR))
+        self.assertEqual(ultimo(self.b), (date(2026, 5, 4), None))
+
+        # Feriado na quarta: o serviço passa para a escala vermelha
+        feriado = Feriado.objects.create(data=QUARTA, descricao="Feriado municipal")
+        self.assertEqual(escala_da_data(QUARTA), ESCALA_VERMELHA)
+        self.assertEqual(ultimo(self.a), (None, QUARTA))
+        feriado.delete()
+        self.assertEqual(escala_da_data(QUARTA), ESCALA_PRETA)
+        self.assertEqual(ultimo(self.a), (QUARTA, SABADO_ANTERIOR))
+
+        # Caminho em lote (sem sinais) e exclusão
+        registrar_servicos([self.b], {self.b.id: "PLANTAO"}, SABADO, None)
+        self.assertEqual(ultimo(self.b), (date(2026, 5, 4), SABADO))
+        Servico.objects.filter(militar=self.b, data=SABADO).delete()
+        self.assertEqual(ultimo(self.b), (date(2026, 5, 4), None))
+
+    def test_ordenacao_usa_a_escala_da_data(self):
+        # Escala única: Bravo (5 dias) à frente de Alfa (3 dias)
+        efetivo = _calcular_efetivo(SABADO)
+        self.assertEqual([e["militar"].nome for e in efetivo], ["Bravo", "Alfa"])
+        self.assertIsNone(efetivo[0]["escala"])
+
+        with override_settings(ESCALA_PRETA_VERMELHA=True):
+            with self.assertNumQueries(4):
+                efetivo = _calcular_efetivo(SABADO)
+            # Vermelha: Bravo nunca tirou (primeiro serviço, à frente), Alfa há 7 dias
+            self.assertEqual(
+                [(e["militar"].nome, e["dias_folga"]) for e in efetivo],
+                [("Bravo", None), ("Alfa", 7)],
+            )
+            self.assertEqual(efetivo[0]["status"], "PRIMEIRO SERVIÇO")
+            self.assertEqual(efetivo[0]["escala"], ESCALA_VERMELHA)
+            # Preta (segunda seguinte): conta só os dias úteis
+            efetivo = _calcular_efetivo(date(2026, 5, 11))
+            self.assertEqual([(e["militar"].nome, e["dias_folga"]) for e in efetivo], [("Bravo", 7), ("Alfa", 5)])
+
+
+class RecalcularUltimosServicosTests(TestCase):
+    def test_uma_consulta_e_um_upsert(self):
+        m1, m2, m3 = (
+            Militar.objects.create(nome=f"SD {i}", graduacao="SD", subunidade="Geral") for i in (1, 2, 3)
+        )
+        # bulk_create não dispara os sinais: as datas só existem após o recálculo
+        Servico.objects.bulk_create(
+            [Servico(militar=m1, data=date(2026, 1, dia)) for dia in (1, 5, 3)]
+            + [Servico(militar=m2, data=date(2026, 1, 2))]
+        )
+        UltimoServico.objects.all().delete()
+
+        with self.assertNumQueries(2):
+            self.assertEqual(recalcular_ultimos_servicos([m1.id, m2.id, m3.id]), 3)
+        # 05/01 (segunda) é a última preta de SD 1; 03/01 (sábado), a última vermelha
+        self.assertEqual(ultimos_servicos([m1.id, m2.id, m3.id]), {
+            m1.id: (date(2026, 1, 5), date(2026, 1, 3)),
+            m2.id: (date(2026, 1, 2), None),
+            m3.id: (None, None),
+        })
@@ -0,0 +1,64 @@
+import asyncio
+import json
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from core import eventos
+from core.eventos import Barramento, evento_servico
+from core.models import Militar, Servico
+
+
+class BarramentoEventosTests(TestCase):
+    def test_filtra_por_data_e_subunidade(self):
+        async def cenario():
+            barramento = Barramento()
+            assinatura = barramento.assinar({date(2026, 5, 5)}, "1ª Cia")
+            # Serviço no dia anterior afeta o efetivo do dia filtrado
+            barramento.publicar(evento_servico('criado', 1, date(2026, 5, 4), 10, "1ª Cia", 'GUARDA'))
+            barramento.publicar(evento_servico('criado', 2, date(2026, 5, 4), 11, "2ª Cia", 'GUARDA'))
+            barramento.publicar(evento_servico('criado', 3, date(2026, 5, 9), 12, "1ª Cia", 'GUARDA'))
+            evento = await asyncio.wait_for(assinatura.fila.get(), 1)
+            await asyncio.sleep(0)
+            restantes = assinatura.fila.qsize()
+            barramento.cancelar(assinatura)
+            return evento, restantes, barramento.total_assinantes
+
+        evento, restantes, total = asyncio.run(cenario())
+        self.assertEqual((evento['id'], restantes, total), (1, 0, 0))
+
+    def test_stream_exige_autenticacao(self):
+        async def cenario():
+            return await self.async_client.get("/eventos/stream/")
+
+        self.assertEqual(asyncio.run(cenario()).status_code, 401)
+
+
+@override_settings(EVENTOS_REDIS_URL="redis://redis:6379/1")
+class EventosEntreWorkersTests(TestCase):
+    def test_gravacao_publica_no_canal_do_redis(self):
+        # Sem assinantes neste processo: o evento ainda vai para os demais workers
+        cliente = mock.Mock()
+        militar = Militar.objects.create(nome="Alfa", graduacao="SD", subunidade="1ª Cia")
+        with mock.patch.object(eventos, "cliente_redis", return_value=cliente):
+            with self.captureOnCommitCallbacks(execute=True):
+                Servico.objects.create(militar=militar, data=date(2026, 5, 4), tipo="GUARDA")
+        canal, dados = cliente.publish.call_args.args
+        self.assertEqual(canal, eventos.CANAL_EVENTOS)
+        self.assertEqual(json.loads(dados)["militar"], militar.id)
+
+    def test_mensagem_do_redis_chega_aos_assinantes_locais(self):
+        async def cenario():
+            barramento = Barramento()
+            with mock.patch.object(eventos, "barramento", barramento), \
+                    mock.patch.object(eventos, "_iniciar_ouvinte_redis") as iniciar:
+                assinatura = barramento.assinar()
+                eventos.receber_mensagem(json.dumps(evento_servico("criado", 7, date(2026, 5, 4), 10, "1ª Cia", "GUARDA")))
+                evento = await asyncio.wait_for(assinatura.fila.get(), 1)
+                barramento.cancelar(assinatura)
+            return evento, iniciar.called
+
+        evento, ouvinte_iniciado = asyncio.run(cenario())
+        self.assertEqual(evento["id"], 7)
+        self.assertTrue(ouvinte_iniciado)
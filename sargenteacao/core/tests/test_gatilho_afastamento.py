@@ -0,0 +1,135 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.calendario import ultimos_servicos
+from core.models import MENSAGEM_SERVICO_AFASTADO, Afastamento, Militar, ResumoDiario, Servico, UltimoServico
+from core.resumo_services import obter_resumo_diario
+from core.services import calcular_efetivo_por_data
+
+
+def consultas_afastamento(contexto):
+    return [q["sql"] for q in contexto.captured_queries if "core_afastamento" in q["sql"]]
+
+
+class GatilhoServicoAfastamentoTests(TestCase):
+    def setUp(self):
+        self.dia = date(2026, 5, 10)
+        self.afastado = Militar.objects.create(nome="Afastado", graduacao="SD", subunidade="1ª Cia")
+        self.livre = Militar.objects.create(nome="Livre", graduacao="SD", subunidade="1ª Cia")
+        Afastamento.objects.create(
+            militar=self.afastado, tipo="FERIAS", data_inicio=self.dia, data_fim=date(2026, 5, 20)
+        )
+
+    def test_banco_impede_insercao_em_lote(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Servico.objects.bulk_create([Servico(militar=self.afastado, data=self.dia, tipo="GUARDA")])
+        self.assertFalse(Servico.objects.exists())
+
+    def test_save_sem_validacao_usa_o_gatilho(self):
+        with self.assertRaisesMessage(ValidationError, MENSAGEM_SERVICO_AFASTADO), transaction.atomic():
+            Servico(militar=self.afastado, data=self.dia, tipo="GUARDA").save(validar=False)
+
+        # Uma única instrução: a manutenção das tabelas derivadas fica para o commit
+        with self.assertNumQueries(1), CaptureQueriesContext(connection) as contexto:
+            Servico(militar=self.livre, data=self.dia, tipo="GUARDA").save(validar=False)
+        self.assertEqual(consultas_afastamento(contexto), [])
+
+        with CaptureQueriesContext(connection) as contexto:
+            Servico(militar=self.livre, data=date(2026, 5, 12), tipo="GUARDA").save()
+        self.assertEqual(len(consultas_afastamento(contexto)), 1)
+
+    def test_atualizacao_so_bloqueia_troca_de_militar_ou_data(self):
+        servico = Servico.objects.create(militar=self.livre, data=self.dia, tipo="GUARDA")
+        with self.assertRaises(ValidationError), transaction.atomic():
+            servico.militar = self.afastado
+            servico.save(validar=False)
+
+        # Serviço antigo dentro de um afastamento incluído depois: pode ser editado
+        legado = Servico.objects.create(militar=self.livre, data=date(2026, 6, 1), tipo="GUARDA")
+        Afastamento.objects.create(
+            militar=self.livre, tipo="DISPENSA", data_inicio=date(2026, 6, 1), data_fim=date(2026, 6, 1)
+        )
+        # bulk_update reescreve militar_id (como na escala em lote), sem trocá-lo
+        legado.tipo = "PLANTAO"
+        Servico.objects.bulk_update([legado], ["militar", "tipo"])
+        legado.refresh_from_db()
+        self.assertEqual(legado.tipo, "PLANTAO")
+
+    def test_api_nao_repete_a_validacao_do_modelo(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.post(
+                reverse("servico-list"),
+                {"militar": self.livre.id, "data": self.dia.isoformat(), "tipo": "GUARDA"},
+                content_type="application/json",
+            )
+        self.assertEqual(resposta.status_code, 201)
+        # Apenas a verificação do serializer
+        self.assertEqual(len(consultas_afastamento(contexto)), 1)
+
+        resposta = self.client.post(
+            reverse("servico-list"),
+            {"militar": self.afastado.id, "data": self.dia.isoformat(), "tipo": "GUARDA"},
+            content_type="application/json",
+        )
+        self.assertEqual(resposta.status_code, 400)
+
+
+class ManutencaoNoCommitTests(TestCase):
+    def setUp(self):
+        self.alfa = Militar.objects.create(nome="Alfa", graduacao="SD", subunidade="1ª Cia")
+        self.bravo = Militar.objects.create(nome="Bravo", graduacao="SD", subunidade="1ª Cia")
+        self.dia = date(2026, 5, 11)
+        obter_resumo_diario(self.dia)
+
+    def test_tabelas_derivadas_uma_vez_por_transacao(self):
+        with self.captureOnCommitCallbacks() as callbacks, transaction.atomic():
+            with self.assertNumQueries(3):
+                Servico(militar=self.alfa, data=self.dia, tipo="GUARDA").save(validar=False)
+                Servico(militar=self.bravo, data=self.dia, tipo="PLANTAO").save(validar=False)
+                Servico(militar=self.alfa, data=date(2026, 5, 13), tipo="GUARDA").save(validar=False)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(UltimoServico.objects.filter(militar=self.alfa).exists())
+        # Efetivo calculado antes do commit (com o último serviço antigo) fica em cache
+        aptos = lambda: {e["militar"].id for e in calcular_efetivo_por_data(date(2026, 5, 14)) if e["apto"]}
+        self.assertIn(self.alfa.id, aptos())
+
+        # Resumo: datas com resumo, contagem e atualização; último serviço: consulta e upsert
+        with self.assertNumQueries(5):
+            callbacks[0]()
+        self.assertEqual(ResumoDiario.objects.get(data=self.dia).escalados, 2)
+        self.assertEqual(
+            ultimos_servicos([self.alfa.id, self.bravo.id]),
+            {self.alfa.id: (date(2026, 5, 13), None), self.bravo.id: (self.dia, None)},
+        )
+        self.assertNotIn(self.alfa.id, aptos())
+
+        # Executado o callback, a gravação seguinte registra um novo
+        with self.captureOnCommitCallbacks() as novos:
+            Servico(militar=self.bravo, data=date(2026, 5, 20), tipo="GUARDA").save(validar=False)
+        self.assertEqual([c.militares for c in novos], [{self.bravo.id}])
+
+    def test_transacao_desfeita_descarta_a_manutencao(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Servico(militar=self.alfa, data=self.dia, tipo="GUARDA").save(validar=False)
+                raise RuntimeError
+            Servico(militar=self.bravo, data=self.dia, tipo="GUARDA").save(validar=False)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(callbacks[0].militares, {self.bravo.id})
+
+
+class GravacaoComSinaisTests(TransactionTestCase):
+    def test_falha_nos_sinais_desfaz_a_gravacao(self):
+        militar = Militar.objects.create(nome="Livre", graduacao="SD", subunidade="1ª Cia")
+        with mock.patch("core.signals.recalcular_ultimos_servicos", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                Servico(militar=militar, data=date(2026, 5, 10), tipo="GUARDA").save()
+        self.assertFalse(Servico.objects.exists())
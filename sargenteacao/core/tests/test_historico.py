@@ -1,8 +1,11 @@
-from datetime import date
+from datetime import date, timedelta
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from core.models import Militar, Servico
+from core.services import (
+    HISTORICO_POR_PAGINA, get_estatisticas_historico, paginar_historico_servicos, periodo_historico,
+)
 
 
 class HistoricoMilitarTests(TestCase):
@@ -21,6 +24,19 @@ class HistoricoMilitarTests(TestCase):
         prev_year = hoje.year if hoje.month > 1 else hoje.year - 1
         Servico.objects.create(militar=self.militar, data=date(prev_year, prev_month, 28))
 
+    def test_ano_ou_mes_fora_do_intervalo(self):
+        self.assertEqual(periodo_historico(0, 1), (None, None))
+        self.assertEqual(periodo_historico(99999), (None, None))
+        self.assertEqual(periodo_historico(2026, 13), (None, None))
+        self.assertEqual(get_estatisticas_historico.sem_cache(self.militar, 99999, 1)["total_mes"], 0)
+
+        url = reverse("historico_militar", args=[self.militar.id])
+        for ano in (0, 99999):
+            resposta = self.client.get(url, {"ano": ano, "mes": 1})
+            self.assertEqual(resposta.status_code, 200)
+            # Volta ao período padrão (mês atual)
+            self.assertEqual(resposta.context["total_mes"], 2)
+
     def test_historico_context_and_pdf(self):
         hoje = date.today()
         url_hist = reverse("historico_militar", args=[self.militar.id])
@@ -33,3 +49,54 @@ class HistoricoMilitarTests(TestCase):
         self.assertEqual(resp_pdf.status_code, 200)
         self.assertEqual(resp_pdf["Content-Type"], "application/pdf")
         self.assertTrue(resp_pdf.content.startswith(b"%PDF"))
+
+
+class PaginacaoHistoricoTests(TestCase):
+    def setUp(self):
+        self.militar = Militar.objects.create(nome="Antigo", graduacao="SD", subunidade="Geral")
+        Servico.objects.bulk_create([
+            Servico(militar=self.militar, data=date(2025, 12, 1) + timedelta(days=i)) for i in range(70)
+        ])
+
+    def test_paginas_por_cursor_sem_repeticao(self):
+        vistos = []
+        cursor = None
+        while True:
+            with self.assertNumQueries(1):
+                pagina = paginar_historico_servicos(self.militar, cursor=cursor, limite=30)
+            vistos += [s.data for s in pagina["servicos"]]
+            cursor = pagina["proximo_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(len(vistos), 70)
+        self.assertEqual(vistos, sorted(vistos, reverse=True))
+
+        # Cursor inválido volta à primeira página
+        pagina = paginar_historico_servicos(self.militar, cursor="lixo", limite=30)
+        self.assertEqual(pagina["servicos"][0].data, vistos[0])
+
+    def test_filtro_de_mes_e_estatisticas_em_uma_consulta(self):
+        pagina = paginar_historico_servicos(self.militar, ano=2026, mes=1)
+        self.assertEqual(len(pagina["servicos"]), 31)
+        self.assertTrue(all(s.data.month == 1 for s in pagina["servicos"]))
+
+        with self.assertNumQueries(1):
+            estatisticas = get_estatisticas_historico.sem_cache(self.militar, 2026, 1)
+        self.assertEqual(estatisticas, {
+            "total_servicos": 70, "ultimo_servico": date(2026, 2, 8), "total_mes": 31,
+        })
+
+    def test_view_aplica_filtro_e_link_da_proxima_pagina(self):
+        usuario = get_user_model().objects.create_superuser("chefe", password="x")
+        self.client.force_login(usuario)
+        url = reverse("historico_militar", args=[self.militar.id])
+
+        resposta = self.client.get(url, {"mes": 12, "ano": 2025})
+        self.assertEqual(len(resposta.context["servicos"]), 31)
+        self.assertIsNone(resposta.context["proxima_url"])
+
+        resposta = self.client.get(url)
+        self.assertEqual(len(resposta.context["servicos"]), HISTORICO_POR_PAGINA)
+        resposta = self.client.get(url + resposta.context["proxima_url"])
+        self.assertEqual(len(resposta.context["servicos"]), 70 - HISTORICO_POR_PAGINA)
+        self.assertEqual(resposta.context["primeira_url"], "?")
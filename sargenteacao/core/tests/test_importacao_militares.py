@@ -0,0 +1,150 @@
+import io
+import os
+import tempfile
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from core.models import Militar
+from core.importacao_services import importar_militares_csv
+
+
+CSV_BASE = (
+    "nome;graduação;subunidade;ativo\n"
+    "Silva;SD;1ª Cia;sim\n"
+    "Souza;3º Sargento;1ª Cia;sim\n"
+    "Pereira;XYZ;2ª Cia;sim\n"
+)
+
+
+class ImportacaoMilitaresTests(TestCase):
+    def setUp(self):
+        Militar.objects.create(nome="Souza", graduacao="CB", subunidade="1ª Cia", ativo=True)
+        Militar.objects.create(nome="Lima", graduacao="SD", subunidade="2ª Cia", ativo=True)
+
+    def test_upsert_com_diferencas_e_erros(self):
+        relatorio = importar_militares_csv(io.StringIO(CSV_BASE))
+        self.assertEqual(relatorio['criados'], 1)
+        self.assertEqual(relatorio['atualizados'], 1)
+        self.assertEqual(relatorio['erros'][0]['linha'], 4)
+        self.assertEqual(Militar.objects.get(nome="Souza").graduacao, "3SG")
+        self.assertTrue(Militar.objects.filter(nome="Silva", graduacao="SD").exists())
+        self.assertFalse(Militar.objects.filter(nome="Pereira").exists())
+        diff_souza = next(d for d in relatorio['diferencas'] if d['nome'] == "Souza")
+        self.assertEqual(diff_souza['alteracoes'], {'graduacao': ['CB', '3SG']})
+
+        # Reimportar o mesmo arquivo não altera nada
+        relatorio = importar_militares_csv(io.StringIO(CSV_BASE))
+        self.assertEqual((relatorio['criados'], relatorio['atualizados'], relatorio['inalterados']), (0, 0, 2))
+
+    def test_dry_run_nao_grava(self):
+        relatorio = importar_militares_csv(io.StringIO(CSV_BASE), dry_run=True)
+        self.assertEqual(relatorio['criados'], 1)
+        self.assertFalse(Militar.objects.filter(nome="Silva").exists())
+        self.assertEqual(Militar.objects.get(nome="Souza").graduacao, "CB")
+
+    def test_repetido_em_outro_lote_conta_uma_vez(self):
+        csv_repetido = (
+            "nome;graduacao;subunidade;ativo\n"
+            "Silva;SD;1ª Cia;sim\n"
+            "Souza;CB;1ª Cia;sim\n"
+            "Silva;CB;1ª Cia;sim\n"
+        )
+        relatorio = importar_militares_csv(io.StringIO(csv_repetido), chunk_size=1, dry_run=True)
+        self.assertEqual((relatorio['criados'], relatorio['inalterados']), (1, 1))
+        self.assertEqual([d['nome'] for d in relatorio['diferencas']], ["Silva"])
+
+        relatorio = importar_militares_csv(io.StringIO(csv_repetido), chunk_size=1)
+        self.assertEqual((relatorio['criados'], relatorio['atualizados'], relatorio['inalterados']), (1, 0, 1))
+        self.assertEqual(Militar.objects.get(nome="Silva").graduacao, "CB")
+
+    def test_consultas_constantes_por_lote(self):
+        linhas = ["nome,graduacao,subunidade,ativo"]
+        linhas += [f"Recruta {i},SD,3ª Cia,1" for i in range(300)]
+        # 2 lotes x (1 leitura + 1 upsert) + SAVEPOINT/RELEASE da transação
+        # + total de militares do resumo diário (contagem + atualização)
+        with self.assertNumQueries(8):
+            relatorio = importar_militares_csv(iter(linhas), chunk_size=150)
+        self.assertEqual(relatorio['criados'], 300)
+
+    def test_endpoint_importar(self):
+        User = get_user_model()
+        admin = User.objects.create_superuser(username="admin", password="x")
+        self.client.force_login(admin)
+        arquivo = SimpleUploadedFile("militares.csv", CSV_BASE.encode('utf-8'), content_type="text/csv")
+        resp = self.client.post(reverse("militar-importar"), {'arquivo': arquivo})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['criados'], 1)
+
+    def test_csv_fora_de_utf8(self):
+        User = get_user_model()
+        self.client.force_login(User.objects.create_superuser(username="admin", password="x"))
+        arquivo = SimpleUploadedFile("militares.csv", CSV_BASE.encode('latin-1'), content_type="text/csv")
+        resp = self.client.post(reverse("militar-importar"), {'arquivo': arquivo})
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Militar.objects.filter(nome="Silva").exists())
+
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, "militares.csv")
+            with open(caminho, "wb") as f:
+                f.write(CSV_BASE.encode('latin-1'))
+            with self.assertRaisesMessage(CommandError, "--encoding"):
+                call_command("importar_militares", caminho, stdout=io.StringIO())
+            call_command("importar_militares", caminho, "--encoding", "latin-1", stdout=io.StringIO())
+        self.assertTrue(Militar.objects.filter(nome="Silva").exists())
+
+
+class ImportacaoRepetidaTests(TransactionTestCase):
+    def test_banco_bloqueado_repete_com_as_mesmas_linhas(self):
+        from core import importacao_services
+        original = importacao_services._sincronizar_lote
+        chamadas = []
+
+        def sincronizar(*args, **kwargs):
+            chamadas.append(1)
+            if len(chamadas) == 1:
+                raise OperationalError("database is locked")
+            return original(*args, **kwargs)
+
+        # Iterador de uma passada só, como um arquivo
+        linhas = iter(CSV_BASE.splitlines())
+        with mock.patch.object(importacao_services, "_sincronizar_lote", side_effect=sincronizar), \
+                mock.patch("core.utils.db.time.sleep"):
+            relatorio = importar_militares_csv(linhas)
+        self.assertEqual(len(chamadas), 2)
+        self.assertEqual((relatorio['criados'], len(relatorio['erros'])), (2, 1))
+        self.assertEqual(Militar.objects.count(), 2)
+
+
+class MigracaoChaveNaturalTests(TransactionTestCase):
+    anterior = [("core", "0006_add_performance_indexes")]
+    restricao = [("core", "0007_militar_unique_nome_subunidade")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_repetidos_interrompem_sem_alterar_nomes(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.anterior)
+        apps = executor.loader.project_state(self.anterior).apps
+        MilitarAntigo = apps.get_model("core", "Militar")
+        for _ in range(2):
+            MilitarAntigo.objects.create(nome="Silva", graduacao="SD", subunidade="1ª Cia")
+
+        executor.loader.build_graph()
+        with self.assertRaisesMessage(RuntimeError, "Silva (1ª Cia): IDs"):
+            executor.migrate(self.restricao)
+        self.assertEqual(
+            list(MilitarAntigo.objects.values_list("nome", flat=True)), ["Silva", "Silva"]
+        )
+
+        # Corrigidos pelo operador, a migração segue
+        MilitarAntigo.objects.filter(nome="Silva").last().delete()
+        executor.loader.build_graph()
+        executor.migrate(self.restricao)
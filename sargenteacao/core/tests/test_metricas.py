@@ -0,0 +1,63 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from core.models import Militar, Servico
+from core.pdf_services import gerar_aditamento_pdf
+from core.services import calcular_efetivo_por_data
+
+
+def _valor(nome, **rotulos):
+    return REGISTRY.get_sample_value(nome, rotulos) or 0.0
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_requisicao_registra_latencia_e_consultas(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        rotulos = {"view": "estatisticas_servico", "metodo": "GET", "status": "200"}
+        antes = _valor("sargenteacao_requisicao_segundos_count", **rotulos)
+        consultas_antes = _valor("sargenteacao_db_consultas_por_requisicao_sum", view="estatisticas_servico")
+
+        self.client.get(reverse("estatisticas_servico"))
+
+        self.assertEqual(_valor("sargenteacao_requisicao_segundos_count", **rotulos), antes + 1)
+        self.assertGreater(
+            _valor("sargenteacao_db_consultas_por_requisicao_sum", view="estatisticas_servico"), consultas_antes
+        )
+
+        resposta = self.client.get("/metrics")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn(
+            b'sargenteacao_requisicao_segundos_count{metodo="GET",status="200",view="estatisticas_servico"}',
+            resposta.content,
+        )
+
+    def test_cache_do_efetivo_e_pdf(self):
+        funcao = "core.services.calcular_efetivo_por_data"
+        erros = _valor("sargenteacao_cache_consultas_total", funcao=funcao, resultado="erro")
+        acertos = _valor("sargenteacao_cache_consultas_total", funcao=funcao, resultado="acerto")
+        calcular_efetivo_por_data(date(2026, 6, 1))
+        calcular_efetivo_por_data(date(2026, 6, 1))
+        self.assertEqual(_valor("sargenteacao_cache_consultas_total", funcao=funcao, resultado="erro"), erros + 1)
+        self.assertEqual(_valor("sargenteacao_cache_consultas_total", funcao=funcao, resultado="acerto"), acertos + 1)
+
+        militar = Militar.objects.create(nome="Silva", graduacao="SD", subunidade="1ª Cia")
+        Servico.objects.create(militar=militar, data=date(2026, 6, 1), tipo="GUARDA")
+        pdfs = _valor("sargenteacao_pdf_bytes_count", documento="aditamento")
+        gerar_aditamento_pdf(date(2026, 6, 1), Servico.objects.filter(data=date(2026, 6, 1)).select_related("militar"))
+        self.assertEqual(_valor("sargenteacao_pdf_bytes_count", documento="aditamento"), pdfs + 1)
+        self.assertGreater(_valor("sargenteacao_pdf_bytes_sum", documento="aditamento"), 0)
+
+    def test_acesso_restrito(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.0.0.5").status_code, 403)
+        with override_settings(METRICAS_TOKEN="segredo"):
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+            resposta = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer segredo", REMOTE_ADDR="10.0.0.5")
+            self.assertEqual(resposta.status_code, 200)
@@ -0,0 +1,61 @@
+import json
+import pstats
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.utils.permissoes import SARGENTEANTE_GROUP, assign_user_to_group
+
+
+class PerfilamentoTests(TestCase):
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.diretorio, ignore_errors=True)
+        self.admin = User.objects.create_superuser("admin", password="x")
+        self.url = reverse("estatisticas_servico")
+
+    def _baixar(self, resposta, arquivo):
+        url = reverse("perfil_download", args=[resposta["X-Perfil-Id"], arquivo])
+        download = self.client.get(url)
+        self.assertEqual(download.status_code, 200)
+        return b"".join(download.streaming_content)
+
+    def test_amostragem_grava_folded_e_sql(self):
+        with override_settings(PERFILAMENTO_HABILITADO=True, PERFILAMENTO_DIR=self.diretorio):
+            self.client.force_login(self.admin)
+            resposta = self.client.get(self.url, {"_perfil": "1"})
+            self.assertEqual(resposta.status_code, 200)
+            self.assertTrue(resposta["X-Perfil-Download"].endswith("/folded/"))
+
+            self._baixar(resposta, "folded")
+            consultas = json.loads(self._baixar(resposta, "sql"))
+            self.assertTrue(any("core_servico" in c["sql"] for c in consultas))
+
+            perfis = self.client.get(reverse("perfis_lista")).json()["perfis"]
+            self.assertEqual(perfis[0]["id"], resposta["X-Perfil-Id"])
+            self.assertEqual(perfis[0]["consultas"], len(consultas))
+
+    def test_cprofile_grava_pstats(self):
+        with override_settings(PERFILAMENTO_HABILITADO=True, PERFILAMENTO_DIR=self.diretorio):
+            self.client.force_login(self.admin)
+            resposta = self.client.get(self.url, HTTP_X_PERFILAR="cprofile")
+            caminho = f"{self.diretorio}/{resposta['X-Perfil-Id']}/perfil.prof"
+            estatisticas = pstats.Stats(caminho)
+            self.assertTrue(any(nome == "estatisticas_servico" for _arq, _linha, nome in estatisticas.stats))
+
+    def test_somente_admin_e_somente_habilitado(self):
+        sargenteante = User.objects.create_user("sgt", password="x")
+        assign_user_to_group(sargenteante, SARGENTEANTE_GROUP)
+
+        with override_settings(PERFILAMENTO_HABILITADO=True, PERFILAMENTO_DIR=self.diretorio):
+            self.client.force_login(sargenteante)
+            self.assertNotIn("X-Perfil-Id", self.client.get(self.url, {"_perfil": "1"}))
+            self.assertEqual(self.client.get(reverse("perfis_lista")).status_code, 403)
+
+        # Desabilitado: o middleware nem entra na cadeia (novo cliente = nova cadeia)
+        cliente = self.client_class()
+        cliente.force_login(self.admin)
+        self.assertNotIn("X-Perfil-Id", cliente.get(self.url, {"_perfil": "1"}))
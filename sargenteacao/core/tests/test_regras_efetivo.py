@@ -0,0 +1,121 @@
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import regras_efetivo
+from core.models import Afastamento, Militar, Servico
+from core.regras_efetivo import EstadoEfetivo
+from core.services import _calcular_efetivo, calcular_efetivo_por_data, filtrar_militares_aptos
+
+
+SABADO = date(2026, 5, 9)
+
+TODAS_AS_REGRAS = [
+    "core.regras_efetivo.RegraAfastamento",
+    "core.regras_efetivo.RegraServicoOntem",
+    "core.regras_efetivo.RegraJaEscalado",
+    ["core.regras_efetivo.RegraDescansoAposTipo", {"tipo": "GUARDA", "horas": 48}],
+    ["core.regras_efetivo.RegraMaximoServicosMes", {"maximo": 3}],
+    "core.regras_efetivo.RegraCargoEspecialFinsDeSemana",
+]
+
+
+def por_nome(efetivo):
+    return {e["militar"].nome: e for e in efetivo}
+
+
+class PipelineEmMemoriaTests(SimpleTestCase):
+    def test_configuracao_invalida(self):
+        with self.assertRaises(ImproperlyConfigured):
+            with override_settings(REGRAS_EFETIVO=["core.regras_efetivo.RegraInexistente"]):
+                pass
+        with self.assertRaises(ImproperlyConfigured):
+            with override_settings(REGRAS_EFETIVO=[["core.regras_efetivo.RegraMaximoServicosMes", {"x": 1}]]):
+                pass
+        self.assertEqual(len(regras_efetivo.pipeline().regras), 3)
+
+    @override_settings(REGRAS_EFETIVO=TODAS_AS_REGRAS)
+    def test_mil_militares_em_menos_de_100ms(self):
+        militares = [SimpleNamespace(id=i, graduacao="CB" if i % 2 else "SD") for i in range(1000)]
+        servicos = {
+            i: [(SABADO - timedelta(days=d), "GUARDA" if d % 3 else "CABO_DIA") for d in range(2, 9, 2)]
+            for i in range(1000)
+        }
+        ultimas = {i: SABADO - timedelta(days=2 + i % 5) for i in range(1000)}
+        afastados = {i: "Férias" for i in range(0, 1000, 10)}
+
+        pipeline = regras_efetivo.pipeline()
+        inicio = time.perf_counter()
+        estado = pipeline.avaliar(EstadoEfetivo(SABADO, militares, afastados, range(0, 1000, 7), ultimas, servicos))
+        decorrido = time.perf_counter() - inicio
+
+        self.assertLess(decorrido, 0.1)
+        self.assertEqual(estado.bloqueios[10].status, "INAPTO")
+        self.assertTrue(estado.bloqueios[1].motivo.startswith("Descanso de 48h"))
+
+
+class RegrasEfetivoTests(TestCase):
+    def setUp(self):
+        self.criar = lambda nome, grad="CB": Militar.objects.create(nome=nome, graduacao=grad, subunidade="1ª Cia")
+        self.guarda = self.criar("Guarda Anteontem")
+        Servico.objects.create(militar=self.guarda, data=SABADO - timedelta(days=2), tipo="GUARDA")
+
+        self.cansado = self.criar("Muitos Servicos")
+        for dia in (1, 3, 5):
+            Servico.objects.create(militar=self.cansado, data=date(2026, 5, dia), tipo="PLANTAO")
+
+        self.cabo_dia = self.criar("Cabo Fim de Semana")
+        Servico.objects.create(militar=self.cabo_dia, data=SABADO - timedelta(days=6), tipo="CABO_DIA")
+
+        self.ontem = self.criar("Servico Ontem")
+        Servico.objects.create(militar=self.ontem, data=SABADO - timedelta(days=1), tipo="PLANTAO")
+        self.escalado = self.criar("Ja Escalado")
+        Servico.objects.create(militar=self.escalado, data=SABADO, tipo="PLANTAO")
+        afastado = self.criar("Afastado")
+        Afastamento.objects.create(
+            militar=afastado, tipo="FERIAS", data_inicio=SABADO, data_fim=SABADO + timedelta(days=5)
+        )
+        self.criar("Novato", "SD")
+
+    def test_regras_padrao_mantem_o_efetivo(self):
+        efetivo = por_nome(_calcular_efetivo(SABADO))
+        self.assertEqual(efetivo["Afastado"]["status"], "INAPTO")
+        self.assertIsNone(efetivo["Afastado"]["dias_folga"])
+        self.assertEqual((efetivo["Servico Ontem"]["motivo"], efetivo["Servico Ontem"]["dias_folga"]), ("Serviço ontem", 0))
+        self.assertTrue(efetivo["Ja Escalado"]["ja_escalado"])
+        self.assertEqual(efetivo["Novato"]["status"], "PRIMEIRO SERVIÇO")
+        self.assertEqual(efetivo["Guarda Anteontem"]["status"], "NORMAL")
+        self.assertTrue(efetivo["Muitos Servicos"]["apto"])
+
+    @override_settings(REGRAS_EFETIVO=TODAS_AS_REGRAS)
+    def test_regras_configuradas_sem_consultas_extras(self):
+        with self.assertNumQueries(4):
+            efetivo = _calcular_efetivo(SABADO)
+        efetivo = por_nome(efetivo)
+
+        self.assertFalse(efetivo["Guarda Anteontem"]["apto"])
+        self.assertEqual(efetivo["Guarda Anteontem"]["motivo"], "Descanso de 48h após Guarda")
+        self.assertFalse(efetivo["Muitos Servicos"]["apto"])
+        self.assertEqual(efetivo["Muitos Servicos"]["motivo"], "Limite de 3 serviços no mês")
+        # Regras padrão continuam valendo, na mesma ordem
+        self.assertEqual(efetivo["Servico Ontem"]["motivo"], "Serviço ontem")
+        self.assertEqual(efetivo["Afastado"]["status"], "INAPTO")
+
+        # Cargo especial no fim de semana anterior: apto, mas sem cargos especiais
+        cabo = efetivo["Cabo Fim de Semana"]
+        self.assertTrue(cabo["apto"])
+        opcoes = [t for t, _ in filtrar_militares_aptos([cabo])[0]["opcoes_tipo"]]
+        self.assertEqual(opcoes, ["GUARDA", "PLANTAO", "PERMANENCIA"])
+        # Em dia útil o veto não se aplica
+        segunda = por_nome(_calcular_efetivo(SABADO + timedelta(days=2)))["Cabo Fim de Semana"]
+        self.assertEqual(segunda["tipos_vetados"], ())
+
+    @override_settings(REGRAS_EFETIVO=TODAS_AS_REGRAS)
+    def test_servico_invalida_o_efetivo_dentro_da_janela_das_regras(self):
+        novato = Militar.objects.get(nome="Novato")
+        self.assertTrue(por_nome(calcular_efetivo_por_data(SABADO))["Novato"]["apto"])
+        Servico.objects.create(militar=novato, data=SABADO - timedelta(days=2), tipo="GUARDA")
+        self.assertFalse(por_nome(calcular_efetivo_por_data(SABADO))["Novato"]["apto"])
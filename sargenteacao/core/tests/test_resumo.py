@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Afastamento, Militar, ResumoDiario, Servico
+from core.resumo_services import construir_resumos, obter_resumo_diario
+from core.services import aplicar_escala_em_lote, registrar_servicos
+
+
+DIA = date(2026, 3, 10)
+
+
+class ResumoDiarioTests(TestCase):
+    def setUp(self):
+        self.sd = Militar.objects.create(nome="SD 1", graduacao="SD", subunidade="1ª Cia")
+        self.cb = Militar.objects.create(nome="CB 1", graduacao="CB", subunidade="2ª Cia")
+        self.sgt = Militar.objects.create(nome="SGT 1", graduacao="3SG", subunidade="2ª Cia")
+
+    def assertResumoCoerente(self, data=DIA):
+        """O resumo mantido é igual ao recalculado do zero."""
+        mantido = ResumoDiario.objects.get(data=data)
+        recalculado = construir_resumos(data, data)[0]
+        for campo in ('total_militares', 'afastados', 'escalados',
+                      'escalados_por_tipo', 'escalados_por_subunidade'):
+            self.assertEqual(getattr(mantido, campo), getattr(recalculado, campo), campo)
+        return mantido
+
+    def test_criado_na_primeira_leitura_e_depois_lido_em_uma_consulta(self):
+        Servico.objects.create(militar=self.sd, data=DIA, tipo="GUARDA")
+        resumo = obter_resumo_diario(DIA)
+        self.assertEqual(resumo.escalados_por_tipo, {"GUARDA": 1})
+        with self.assertNumQueries(1):
+            self.assertEqual(obter_resumo_diario(DIA).escalados, 1)
+
+    def test_mantido_pelas_gravacoes(self):
+        obter_resumo_diario(DIA)
+
+        servico = Servico.objects.create(militar=self.sd, data=DIA, tipo="GUARDA")
+        registrar_servicos([self.cb], {self.cb.id: "CABO_DIA"}, DIA, None)
+        resumo = self.assertResumoCoerente()
+        self.assertEqual(resumo.escalados_por_subunidade, {"1ª Cia": 1, "2ª Cia": 1})
+
+        # Edição em lote e mudança de data de um serviço
+        aplicar_escala_em_lote(DIA, atualizar=[{"id": servico.id, "tipo": "PLANTAO"}])
+        self.assertResumoCoerente()
+        servico.refresh_from_db()
+        servico.data = DIA + timedelta(days=1)
+        servico.save()
+        self.assertEqual(self.assertResumoCoerente().escalados, 1)
+
+        # Afastamento: inclusão, mudança de período e exclusão
+        afastamento = Afastamento.objects.create(
+            militar=self.sgt, tipo="FERIAS", data_inicio=DIA - timedelta(days=2), data_fim=DIA
+        )
+        self.assertEqual(self.assertResumoCoerente().afastados, 1)
+        afastamento.data_fim = DIA - timedelta(days=1)
+        afastamento.save()
+        self.assertEqual(self.assertResumoCoerente().afastados, 0)
+        afastamento.data_fim = DIA + timedelta(days=5)
+        afastamento.save()
+        self.assertEqual(self.assertResumoCoerente().afastados, 1)
+        afastamento.delete()
+        self.assertEqual(self.assertResumoCoerente().afastados, 0)
+
+        # Militares: inclusão, troca de subunidade e exclusão (com cascata)
+        Militar.objects.create(nome="SD 2", graduacao="SD", subunidade="1ª Cia")
+        self.assertEqual(self.assertResumoCoerente().total_militares, 4)
+        self.cb.subunidade = "3ª Cia"
+        self.cb.save()
+        self.assertEqual(self.assertResumoCoerente().escalados_por_subunidade, {"3ª Cia": 1})
+        self.cb.delete()
+        resumo = self.assertResumoCoerente()
+        self.assertEqual((resumo.total_militares, resumo.escalados), (3, 0))
+
+    def test_comando_reconstroi_resumo_divergente(self):
+        Servico.objects.create(militar=self.sd, data=DIA, tipo="GUARDA")
+        obter_resumo_diario(DIA)
+        ResumoDiario.objects.filter(data=DIA).update(escalados=99, afastados=7)
+
+        saida = StringIO()
+        call_command("reconstruir_resumo_diario", "--inicio", "2026-03-09", "--fim", "2026-03-11", stdout=saida)
+        self.assertIn("3 datas", saida.getvalue())
+        self.assertEqual(ResumoDiario.objects.filter(data__range=(DIA - timedelta(days=1), DIA + timedelta(days=1))).count(), 3)
+        resumo = self.assertResumoCoerente()
+        self.assertEqual((resumo.escalados, resumo.afastados), (1, 0))
+
+    def test_dashboard_e_widget(self):
+        hoje = date.today()
+        Servico.objects.create(militar=self.sd, data=hoje, tipo="GUARDA")
+        self.client.force_login(User.objects.create_user("usuario", password="x"))
+
+        resposta = self.client.get(reverse("dashboard"))
+        self.assertEqual(resposta.context["total_servicos_hoje"], 1)
+        self.assertEqual(resposta.context["total_militares"], 3)
+
+        resposta = self.client.get(reverse("resumo_diario"), {"data": hoje.isoformat()})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()["escalados_por_subunidade"], {"1ª Cia": 1})
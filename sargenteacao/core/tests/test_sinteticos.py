@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+
+from core.benchmark_services import comparar_resultados, executar_benchmark
+from core.models import Afastamento, Servico
+from core.services import CARGOS_ESPECIAIS, tipos_permitidos_por_graduacao
+from core.sinteticos_services import gerar_dados_sinteticos
+
+
+class DadosSinteticosTests(TestCase):
+    def test_dados_respeitam_regras_da_escala(self):
+        resultado = gerar_dados_sinteticos(militares=60, anos=1, fim=date(2026, 6, 30), semente=1)
+        self.assertEqual(resultado["servicos"], Servico.objects.count())
+        self.assertGreater(resultado["servicos"], 0)
+
+        datas_por_militar = {}
+        for s in Servico.objects.select_related("militar"):
+            self.assertIn(s.tipo, tipos_permitidos_por_graduacao(s.militar.graduacao))
+            datas_por_militar.setdefault(s.militar_id, set()).add(s.data)
+        for datas in datas_por_militar.values():
+            self.assertFalse(any(d + timedelta(days=1) in datas for d in datas))
+
+        for a in Afastamento.objects.all():
+            self.assertFalse(Servico.objects.filter(
+                militar_id=a.militar_id, data__gte=a.data_inicio, data__lte=a.data_fim
+            ).exists())
+
+        especiais = Servico.objects.filter(tipo__in=CARGOS_ESPECIAIS)
+        self.assertEqual(especiais.count(), especiais.values("data", "tipo").distinct().count())
+
+    def test_benchmark_gera_medicoes_comparaveis(self):
+        resultado = executar_benchmark(escalas=[20], repeticoes=1, data_ref=date(2026, 6, 30))
+        medicoes = resultado["escalas"]["20"]["medicoes"]
+        self.assertIn("view.ver_efetivo", medicoes)
+        self.assertIsNotNone(medicoes["services.calcular_efetivo_por_data"]["consultas"])
+
+        pior = {"escalas": {"20": {"medicoes": {
+            nome: {**m, "mediana_ms": m["mediana_ms"] * 2 + 1} for nome, m in medicoes.items()
+        }}}}
+        self.assertFalse(any(d["regressao"] for d in comparar_resultados(pior, resultado)))
+        self.assertTrue(all(d["regressao"] for d in comparar_resultados(resultado, pior)))
@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Afastamento, Militar, Servico
+from core.services import buscar_substitutos, substituir_militar_servico
+
+
+DIA = date(2026, 5, 13)
+
+
+class SubstitutosTests(TestCase):
+    def setUp(self):
+        criar = lambda nome, grad="SD": Militar.objects.create(nome=nome, graduacao=grad, subunidade="1ª Cia")
+        self.doente = criar("Doente")
+        self.servico = Servico.objects.create(militar=self.doente, data=DIA, tipo="GUARDA")
+
+        self.novato = criar("Novato")
+        self.folgado = criar("Folgado")
+        Servico.objects.create(militar=self.folgado, data=DIA - timedelta(days=10), tipo="GUARDA")
+        # Mesma folga, mais serviços no mês: fica atrás
+        self.cansado = criar("Cansado")
+        Servico.objects.create(militar=self.cansado, data=DIA - timedelta(days=10), tipo="GUARDA")
+        Servico.objects.create(militar=self.cansado, data=DIA - timedelta(days=12), tipo="GUARDA")
+        self.recente = criar("Recente")
+        Servico.objects.create(militar=self.recente, data=DIA - timedelta(days=3), tipo="GUARDA")
+
+        # Não elegíveis: ontem, afastado, graduação
+        ontem = criar("Ontem")
+        Servico.objects.create(militar=ontem, data=DIA - timedelta(days=1), tipo="GUARDA")
+        afastado = criar("Afastado")
+        Afastamento.objects.create(militar=afastado, tipo="MEDICA", data_inicio=DIA, data_fim=DIA)
+        criar("Sargento", "3SG")
+
+    def test_ranking_dos_substitutos(self):
+        nomes = [s["militar"].nome for s in buscar_substitutos(DIA, "GUARDA", k=10)]
+        self.assertEqual(nomes, ["Novato", "Folgado", "Cansado", "Recente"])
+        self.assertEqual([s["militar"].nome for s in buscar_substitutos(DIA, "GUARDA", k=2)], ["Novato", "Folgado"])
+        self.assertEqual(buscar_substitutos(DIA, "CABO_DIA"), [])
+
+    def test_substituicao_atomica(self):
+        resultado = substituir_militar_servico(self.servico)
+        self.assertEqual(resultado["erros"], [])
+        self.assertEqual(resultado["substituto"], self.novato.id)
+        self.servico.refresh_from_db()
+        self.assertEqual(self.servico.militar, self.novato)
+
+        resultado = substituir_militar_servico(self.servico, self.recente.id)
+        self.assertEqual(resultado["erros"], [])
+
+        # Substituto afastado: nada é gravado
+        resultado = substituir_militar_servico(self.servico, Militar.objects.get(nome="Afastado").id)
+        self.assertTrue(resultado["erros"])
+        self.servico.refresh_from_db()
+        self.assertEqual(self.servico.militar, self.recente)
+
+    def test_api(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="x"))
+        resposta = self.client.get(reverse("servico-substitutos"), {"servico": self.servico.id, "k": 2})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual([s["nome"] for s in resposta.json()["substitutos"]], ["Novato", "Folgado"])
+        self.assertEqual(resposta.json()["substitutos"][1]["servicos_mes"], 1)
+        self.assertEqual(
+            self.client.get(reverse("servico-substitutos"), {"data": "2026-05-13", "tipo": "XYZ"}).status_code, 400
+        )
+        self.assertEqual(self.client.get(reverse("servico-substitutos"), {"servico": "abc"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("servico-substitutos"), {"servico": 999999}).status_code, 404)
+
+        resposta = self.client.post(
+            reverse("servico-substituir", args=[self.servico.id]), {"militar": self.folgado.id},
+            content_type="application/json",
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.servico.refresh_from_db()
+        self.assertEqual(self.servico.militar, self.folgado)
@@ -1,5 +1,7 @@
 from datetime import date
+from django.contrib.messages import get_messages
 from django.test import TestCase
+from django.urls import reverse
 from django.contrib.auth import get_user_model
 from core.models import Militar, Servico
 
@@ -24,3 +26,18 @@ class UnicidadeCargosEspeciaisTests(TestCase):
         Servico.objects.create(militar=self.m2, data=self.hoje, tipo='ADJUNTO', registrado_por=self.user)
         with self.assertRaises(Exception):
             Servico.objects.create(militar=self.m1, data=self.hoje, tipo='ADJUNTO', registrado_por=self.user)
+
+    def test_edicao_do_dia_e_tudo_ou_nada(self):
+        s1 = Servico.objects.create(militar=self.m1, data=self.hoje, tipo='OFICIAL_DIA', registrado_por=self.user)
+        s2 = Servico.objects.create(militar=self.m2, data=self.hoje, tipo='ADJUNTO', registrado_por=self.user)
+        self.client.force_login(self.user)
+        # Exclusão válida de s1, mas s2 recebe um tipo que o militar não pode exercer: nada é gravado
+        resposta = self.client.post(reverse('editar_servico'), {
+            'data': self.hoje.isoformat(),
+            f'delete_{s1.id}': 'on',
+            f'tipo_{s2.id}': 'OFICIAL_DIA', f'militar_{s2.id}': self.m2.id,
+        }, follow=True)
+        mensagens = [str(m) for m in get_messages(resposta.wsgi_request)]
+        self.assertTrue(mensagens[0].startswith('Nenhuma alteração foi gravada'))
+        self.assertIn('Militar 2: Tipo de serviço não permitido para a graduação selecionada.', mensagens)
+        self.assertTrue(Servico.objects.filter(id=s1.id).exists())
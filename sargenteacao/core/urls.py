@@ -2,17 +2,22 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from . import views
-from core.views import MilitarViewSet, AfastamentoViewSet
+from core.views import MilitarViewSet, AfastamentoViewSet, ServicoViewSet
 
 
 router = DefaultRouter()
 router.register(r'militares', MilitarViewSet, basename='militar')
 router.register(r'afastamentos', AfastamentoViewSet, basename='afastamento')
+router.register(r'servicos', ServicoViewSet, basename='servico')
 
 
 urlpatterns = [
+    path('health/', views.health, name='health'),
+
     # Views tradicionais
     path('efetivo/', views.ver_efetivo, name='ver_efetivo'),
+    path('efetivo/json/', views.efetivo_do_dia, name='efetivo_do_dia'),
+    path('eventos/stream/', views.stream_eventos_escala, name='stream_eventos_escala'),
     path('registrar-servico/', views.registrar_servico, name='registrar_servico'),
     path('editar-servicos/', views.editar_servicos, name='editar_servicos'),
     path('editar-servico/', views.editar_servico, name='editar_servico'),
@@ -43,6 +48,7 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
 
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('resumo/', views.resumo_diario, name='resumo_diario'),
     path('estatisticas/', views.estatisticas_servico, name='estatisticas_servico'),
 
     # Administração
@@ -52,6 +58,10 @@ urlpatterns = [
         name='admin_user_management'
     ),
 
+    # Perfilamento sob demanda (PERFILAMENTO_HABILITADO)
+    path('perfis/', views.perfis_lista, name='perfis_lista'),
+    path('perfis/<str:perfil_id>/<str:arquivo>/', views.perfil_download, name='perfil_download'),
+
     # API (DRF)
     path('', include(router.urls)),
 ]
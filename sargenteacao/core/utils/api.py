@@ -0,0 +1,82 @@
+"""
+Utilitários para as views da API REST: leitura de filtros da querystring,
+seleção de campos (?fields=) e listagens a partir de projeções .values().
+"""
+from datetime import datetime
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+def parse_lista(valor):
+    """Converte 'a,b,c' em ['a', 'b', 'c'], ignorando itens vazios."""
+    if not valor:
+        return []
+    return [item.strip() for item in valor.split(',') if item.strip()]
+
+
+def parse_bool(valor, nome):
+    """Converte o valor de um filtro booleano (true/false, 1/0, sim/nao)."""
+    chave = valor.strip().lower()
+    if chave in ('1', 'true', 'sim', 's'):
+        return True
+    if chave in ('0', 'false', 'nao', 'não', 'n'):
+        return False
+    raise ValidationError({nome: f'Valor booleano inválido: "{valor}".'})
+
+
+def parse_data(valor, nome):
+    """Converte uma data no formato AAAA-MM-DD."""
+    try:
+        return datetime.strptime(valor.strip(), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValidationError({nome: f'Data inválida: "{valor}". Use AAAA-MM-DD.'})
+
+
+def get_campos_solicitados(request, campos_permitidos):
+    """
+    Retorna os campos pedidos via ?fields=, validados contra os permitidos.
+
+    Sem o parâmetro, retorna todos os campos permitidos.
+    """
+    campos = parse_lista(request.query_params.get('fields', ''))
+    if not campos:
+        return list(campos_permitidos)
+
+    invalidos = [c for c in campos if c not in campos_permitidos]
+    if invalidos:
+        raise ValidationError({'fields': f'Campos inválidos: {", ".join(invalidos)}.'})
+    return list(dict.fromkeys(campos))
+
+
+class ProjecaoListMixin:
+    """
+    Mixin para ViewSets: a listagem é montada a partir de ``.values()``,
+    sem instanciar modelos nem passar pelo serializer.
+
+    Define ``campos_projecao`` com os campos expostos na listagem (nomes
+    iguais aos do serializer). Funciona com paginação por cursor: os campos
+    de ordenação são incluídos na projeção e removidos da resposta caso não
+    tenham sido pedidos.
+    """
+    campos_projecao = ()
+
+    def list(self, request, *args, **kwargs):
+        campos = get_campos_solicitados(request, self.campos_projecao)
+
+        colunas = list(campos)
+        if self.paginator is not None:
+            for campo in getattr(self.paginator, 'ordering', ()):
+                campo = campo.lstrip('-')
+                if campo not in colunas:
+                    colunas.append(campo)
+
+        queryset = self.filter_queryset(self.get_queryset()).values(*colunas)
+
+        page = self.paginate_queryset(queryset)
+        linhas = page if page is not None else queryset
+        dados = [{campo: linha[campo] for campo in campos} for linha in linhas]
+
+        if page is not None:
+            return self.get_paginated_response(dados)
+        return Response(dados)
@@ -0,0 +1,72 @@
+"""
+Busca de militares por nome, sem acentos e sem diferenciar maiúsculas.
+
+O nome é "dobrado" em uma chave (``Militar.nome_busca``): sem acentos, em
+minúsculas, com pontuação trocada por espaço. A busca divide o texto digitado
+em termos e exige que cada termo seja o início de alguma palavra do nome
+("joao sil" encontra "João da Silva"). A mesma regra vale no banco
+(``filtro_busca_nome``) e em memória, sobre o efetivo em cache
+(``corresponde_busca``), para que todas as caixas de busca se comportem igual.
+"""
+import re
+import unicodedata
+from typing import List
+
+from django.db.models import Q
+
+
+_RE_SEPARADORES = re.compile(r'[^0-9a-z]+')
+
+
+def chave_busca(texto: str) -> str:
+    """
+    Normaliza um texto para busca: sem acentos, minúsculo, palavras separadas por um espaço.
+
+    Args:
+        texto: Nome ou texto digitado
+
+    Returns:
+        Chave normalizada (ex.: ``"Sgt. João  D'Ávila"`` -> ``"sgt joao d avila"``)
+    """
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return _RE_SEPARADORES.sub(' ', sem_acentos.lower()).strip()
+
+
+def termos_busca(texto: str) -> List[str]:
+    """Termos (já normalizados) de um texto de busca."""
+    return chave_busca(texto).split()
+
+
+def filtro_busca_nome(texto: str, campo: str = 'nome_busca') -> Q:
+    """
+    Filtro do ORM equivalente a ``corresponde_busca``.
+
+    Cada termo precisa iniciar a chave (``LIKE 'termo%'``, atendido pelo
+    índice) ou alguma palavra dela (``LIKE '% termo%'``).
+
+    Args:
+        texto: Texto digitado
+        campo: Caminho até a chave (ex.: ``'militar__nome_busca'``)
+
+    Returns:
+        ``Q`` (vazio quando não há termos)
+    """
+    filtro = Q()
+    for termo in termos_busca(texto):
+        filtro &= Q(**{f'{campo}__startswith': termo}) | Q(**{f'{campo}__contains': f' {termo}'})
+    return filtro
+
+
+def corresponde_busca(chave: str, termos: List[str]) -> bool:
+    """
+    Verifica se uma chave já normalizada atende a todos os termos.
+
+    Args:
+        chave: ``Militar.nome_busca``
+        termos: Resultado de ``termos_busca`` (calculado uma vez por requisição)
+    """
+    if not termos:
+        return True
+    palavras = chave.split()
+    return all(any(palavra.startswith(termo) for palavra in palavras) for termo in termos)
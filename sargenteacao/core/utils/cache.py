@@ -0,0 +1,290 @@
+"""
+Utilitários de cache com proteção contra "cache stampede".
+
+Quando uma chave popular expira (ou é invalidada), todos os workers que a
+leem ao mesmo tempo recalculam o mesmo valor. ``obter_ou_calcular`` evita
+isso com duas técnicas:
+
+- Single-flight: apenas o worker que obtém o lock (``cache.add``, atômico no
+  Redis) recalcula; os demais esperam o valor ser gravado.
+- Renovação antecipada probabilística (XFetch): perto do vencimento, cada
+  leitura tem uma chance crescente (proporcional ao custo do cálculo) de
+  renovar o valor antes que ele expire, enquanto as demais continuam
+  recebendo o valor ainda válido.
+
+O decorator ``memoizar`` aplica o mesmo mecanismo a qualquer função: a chave
+é derivada dos argumentos e inclui a versão de cada "tag" de dependência
+(ex.: ``servico:data={data}``). Invalidar uma tag incrementa sua versão, e
+todas as chaves que dependiam dela deixam de ser usadas.
+"""
+import functools
+import hashlib
+import inspect
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import models
+
+from ..metricas import observar_cache
+
+
+# Fator da renovação antecipada (1.0 = padrão do XFetch; maior = mais cedo)
+BETA_RENOVACAO = 1.0
+
+# Validade do lock de recálculo (segundos); deve cobrir o cálculo mais lento
+TIMEOUT_LOCK_CALCULO = 30
+
+# Tempo máximo (segundos) que um worker espera o valor calculado por outro
+ESPERA_MAXIMA_CALCULO = 10.0
+
+# Intervalo entre verificações enquanto espera o valor
+INTERVALO_ESPERA = 0.05
+
+
+def _ler_envelope(chave: str) -> Optional[dict]:
+    envelope = cache.get(chave)
+    if isinstance(envelope, dict) and 'expira_em' in envelope:
+        return envelope
+    return None
+
+
+def _deve_renovar(envelope: dict, beta: float) -> bool:
+    # XFetch: agora - delta * beta * ln(U) >= expira_em, com U em (0, 1]
+    aleatorio = 1.0 - random.random()
+    return time.time() - envelope['delta'] * beta * math.log(aleatorio) >= envelope['expira_em']
+
+
+def _calcular_e_gravar(chave: str, calcular: Callable[[], Any], timeout: int) -> Any:
+    inicio = time.monotonic()
+    valor = calcular()
+    delta = time.monotonic() - inicio
+    cache.set(chave, {
+        'valor': valor,
+        'delta': delta,
+        'expira_em': time.time() + timeout,
+    }, timeout)
+    return valor
+
+
+def _tentar_calcular(chave: str, calcular: Callable[[], Any], timeout: int) -> Tuple[bool, Any]:
+    """Calcula e grava o valor se obtiver o lock da chave; retorna (obteve_lock, valor)."""
+    chave_lock = f'{chave}:lock'
+    token = uuid.uuid4().hex
+    if not cache.add(chave_lock, token, TIMEOUT_LOCK_CALCULO):
+        return False, None
+    try:
+        return True, _calcular_e_gravar(chave, calcular, timeout)
+    finally:
+        if cache.get(chave_lock) == token:
+            cache.delete(chave_lock)
+
+
+def obter_ou_calcular(chave: str, calcular: Callable[[], Any], timeout: int,
+                      beta: float = BETA_RENOVACAO, metrica: Optional[str] = None) -> Any:
+    """
+    Retorna o valor em cache ou o calcula, com single-flight e renovação antecipada.
+
+    Args:
+        chave: Chave do cache
+        calcular: Função sem argumentos que calcula o valor
+        timeout: Validade do valor em segundos
+        beta: Fator da renovação antecipada (0 desliga)
+        metrica: Nome sob o qual acertos/erros e o tempo de recálculo são
+            registrados (``metricas_cache`` e Prometheus)
+
+    Returns:
+        Valor em cache ou recém-calculado
+    """
+    if metrica is None:
+        return _obter_ou_calcular(chave, calcular, timeout, beta)
+
+    tempos = []
+
+    def calcular_medindo():
+        inicio = time.perf_counter()
+        try:
+            return calcular()
+        finally:
+            tempos.append(time.perf_counter() - inicio)
+
+    valor = _obter_ou_calcular(chave, calcular_medindo, timeout, beta)
+    _registrar_metrica(metrica, acerto=not tempos, tempo_calculo=tempos[0] if tempos else None)
+    return valor
+
+
+def _obter_ou_calcular(chave: str, calcular: Callable[[], Any], timeout: int, beta: float) -> Any:
+    envelope = _ler_envelope(chave)
+    if envelope is not None and not (beta and _deve_renovar(envelope, beta)):
+        return envelope['valor']
+
+    calculou, valor = _tentar_calcular(chave, calcular, timeout)
+    if calculou:
+        return valor
+
+    # Outro worker está recalculando: o valor atual ainda é válido
+    if envelope is not None:
+        return envelope['valor']
+
+    # Sem valor algum: espera o cálculo do outro worker
+    limite = time.monotonic() + ESPERA_MAXIMA_CALCULO
+    while time.monotonic() < limite:
+        time.sleep(INTERVALO_ESPERA)
+        envelope = _ler_envelope(chave)
+        if envelope is not None:
+            return envelope['valor']
+        # O lock venceu ou foi liberado sem valor gravado (erro no cálculo)
+        calculou, valor = _tentar_calcular(chave, calcular, timeout)
+        if calculou:
+            return valor
+
+    # Espera esgotada: calcula localmente para não bloquear a requisição
+    return _calcular_e_gravar(chave, calcular, timeout)
+
+
+# ==================== TAGS DE DEPENDÊNCIA (VERSÕES) ====================
+
+PREFIXO_VERSAO_TAG = 'tag_versao:'
+
+
+def _chave_versao_tag(tag: str) -> str:
+    return f'{PREFIXO_VERSAO_TAG}{tag}'
+
+
+def _versao_inicial() -> int:
+    # Baseada no relógio para que uma versão perdida (cache reiniciado)
+    # nunca coincida com uma versão já entregue a um cliente.
+    return time.time_ns() // 1000
+
+
+def versoes_tags(tags: Iterable[str]) -> Dict[str, int]:
+    """
+    Retorna a versão atual de cada tag, criando as que ainda não existem.
+
+    Args:
+        tags: Tags de dependência
+
+    Returns:
+        Dicionário {tag: versão}
+    """
+    tags = list(tags)
+    chaves = {_chave_versao_tag(tag): tag for tag in tags}
+    encontradas = cache.get_many(list(chaves))
+    versoes = {}
+    for chave, tag in chaves.items():
+        if chave not in encontradas:
+            cache.add(chave, _versao_inicial(), None)
+            encontradas[chave] = cache.get(chave)
+        versoes[tag] = encontradas[chave]
+    return versoes
+
+
+def invalidar_tags(*tags: str) -> None:
+    """
+    Invalida todas as entradas de cache que dependem das tags informadas.
+
+    Args:
+        tags: Tags de dependência a invalidar
+    """
+    for tag in dict.fromkeys(tags):
+        chave = _chave_versao_tag(tag)
+        try:
+            cache.incr(chave)
+        except ValueError:
+            cache.set(chave, _versao_inicial(), None)
+
+
+# ==================== MEMOIZAÇÃO ====================
+
+_metricas = {}
+_metricas_lock = threading.Lock()
+
+
+def _registrar_metrica(nome: str, acerto: bool, tempo_calculo: Optional[float] = None) -> None:
+    with _metricas_lock:
+        contagem = _metricas.setdefault(nome, {'hits': 0, 'misses': 0})
+        contagem['hits' if acerto else 'misses'] += 1
+    observar_cache(nome, acerto, tempo_calculo)
+
+
+def metricas_cache() -> Dict[str, Dict[str, Any]]:
+    """
+    Retorna acertos/erros de cache por função (neste processo).
+
+    Returns:
+        Dicionário {função: {'hits', 'misses', 'taxa_acerto'}}
+    """
+    with _metricas_lock:
+        copia = {nome: dict(contagem) for nome, contagem in _metricas.items()}
+    for contagem in copia.values():
+        total = contagem['hits'] + contagem['misses']
+        contagem['taxa_acerto'] = round(contagem['hits'] / total, 4) if total else None
+    return copia
+
+
+def _normalizar_argumento(valor: Any) -> str:
+    if isinstance(valor, models.Model):
+        return f'{valor._meta.label_lower}:{valor.pk}'
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, (set, frozenset)):
+        return '{' + ','.join(sorted(_normalizar_argumento(v) for v in valor)) + '}'
+    if isinstance(valor, (list, tuple)):
+        return '[' + ','.join(_normalizar_argumento(v) for v in valor) + ']'
+    if isinstance(valor, dict):
+        itens = sorted((str(k), _normalizar_argumento(v)) for k, v in valor.items())
+        return '{' + ','.join(f'{k}:{v}' for k, v in itens) + '}'
+    return repr(valor)
+
+
+def memoizar(timeout: int = 300, tags: Iterable[str] = (), beta: float = BETA_RENOVACAO):
+    """
+    Decorator que guarda o resultado da função no cache compartilhado.
+
+    A chave é derivada do nome da função e dos argumentos (instâncias de
+    modelo entram pela chave primária; datas, pelo ISO). Cada tag pode
+    referenciar argumentos da função com a sintaxe de ``str.format``::
+
+        @memoizar(timeout=600, tags=['servico:militar={militar.id}'])
+        def get_estatisticas_historico(militar, ano, mes): ...
+
+    O resultado muda de chave sempre que alguma tag é invalidada com
+    ``invalidar_tags``. A função decorada ganha ``sem_cache`` (chamada
+    direta, sem cache).
+
+    Args:
+        timeout: Validade do resultado em segundos
+        tags: Tags de dependência (fixas ou com campos dos argumentos)
+        beta: Fator da renovação antecipada (0 desliga)
+    """
+    tags = tuple(tags)
+
+    def decorator(func):
+        assinatura = inspect.signature(func)
+        nome = f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            vinculados = assinatura.bind(*args, **kwargs)
+            vinculados.apply_defaults()
+            argumentos = vinculados.arguments
+
+            tags_resolvidas = [tag.format(**argumentos) for tag in tags]
+            versoes = versoes_tags(tags_resolvidas)
+            assinatura_chamada = '|'.join(
+                [f'{k}={_normalizar_argumento(v)}' for k, v in argumentos.items()]
+                + [f'{tag}@{versoes[tag]}' for tag in tags_resolvidas]
+            )
+            resumo = hashlib.sha1(assinatura_chamada.encode('utf-8')).hexdigest()
+            chave = f'memo:{nome}:{resumo}'
+
+            return obter_ou_calcular(chave, lambda: func(*args, **kwargs), timeout, beta, metrica=nome)
+
+        wrapper.sem_cache = func
+        return wrapper
+    return decorator
@@ -0,0 +1,77 @@
+"""
+Utilitários de banco de dados: repetição de operações de escrita quando o
+banco está bloqueado (SQLite "database is locked"), com backoff exponencial,
+e detecção de recursos específicos do backend (caminhos rápidos do PostgreSQL).
+"""
+import functools
+import random
+import time
+
+from django.db import OperationalError, connection, connections
+
+
+# Mensagens de erro de lock/concorrência que justificam nova tentativa
+MENSAGENS_BLOQUEIO = (
+    'database is locked',
+    'database table is locked',
+    'database schema is locked',
+    'could not serialize access',
+    'deadlock detected',
+)
+
+
+def erro_de_bloqueio(erro: Exception) -> bool:
+    """Indica se o erro é um lock/conflito transitório do banco."""
+    mensagem = str(erro).lower()
+    return any(trecho in mensagem for trecho in MENSAGENS_BLOQUEIO)
+
+
+def repetir_em_bloqueio(tentativas: int = 5, espera_inicial: float = 0.05,
+                        fator: float = 2.0, espera_maxima: float = 1.0):
+    """
+    Decorator que repete a função quando o banco está bloqueado.
+
+    A espera cresce exponencialmente (com jitter) entre as tentativas. Só
+    repete quando a função é a dona da transação: dentro de um bloco
+    ``atomic`` externo a transação já está comprometida e o erro é
+    propagado para quem a abriu.
+
+    Args:
+        tentativas: Número máximo de execuções
+        espera_inicial: Espera (segundos) antes da segunda tentativa
+        fator: Multiplicador da espera a cada nova tentativa
+        espera_maxima: Limite da espera entre tentativas
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            espera = espera_inicial
+            for tentativa in range(1, tentativas + 1):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as e:
+                    if (not erro_de_bloqueio(e) or tentativa == tentativas
+                            or connection.in_atomic_block):
+                        raise
+                    time.sleep(min(espera, espera_maxima) * random.uniform(0.5, 1.5))
+                    espera *= fator
+        return wrapper
+    return decorator
+
+
+def banco_postgresql(using: str = 'default') -> bool:
+    """Indica se a conexão ``using`` é PostgreSQL."""
+    return connections[using].vendor == 'postgresql'
+
+
+def suporta_copy(using: str = 'default') -> bool:
+    """
+    Indica se a conexão suporta ``COPY ... FROM STDIN`` via psycopg 3.
+
+    Returns:
+        True apenas para PostgreSQL com driver psycopg 3 (``cursor.copy``)
+    """
+    if not banco_postgresql(using):
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
@@ -128,6 +128,18 @@ def get_user_role_display(user):
         return "Sem Grupo"
 
 
+def get_role_display_from_groups(user, group_names):
+    """Get user role display name from already loaded group names (no queries)"""
+    if user.is_superuser or ADMIN_GROUP in group_names:
+        return "Administrador"
+    elif SARGENTEANTE_GROUP in group_names:
+        return "Sargenteante"
+    elif MILITAR_GROUP in group_names:
+        return "Militar"
+    else:
+        return "Sem Grupo"
+
+
 def assign_user_to_group(user, group_name):
     """Assign user to a specific group"""
     try:
@@ -155,21 +167,21 @@ def get_group_members(group_name):
 
 
 def get_all_groups_with_counts():
-    """Get all groups with user counts"""
+    """Get all groups with user counts (single query)"""
+    from django.db.models import Count
+
+    names = [ADMIN_GROUP, SARGENTEANTE_GROUP, MILITAR_GROUP]
+    groups = {
+        group.name: group
+        for group in Group.objects.filter(name__in=names).annotate(total_users=Count('user'))
+    }
     groups_data = []
-    for group_name in [ADMIN_GROUP, SARGENTEANTE_GROUP, MILITAR_GROUP]:
-        try:
-            group = Group.objects.get(name=group_name)
-            groups_data.append({
-                'name': group_name,
-                'count': group.user_set.count(),
-                'group': group
-            })
-        except Group.DoesNotExist:
-            groups_data.append({
-                'name': group_name,
-                'count': 0,
-                'group': None
-            })
+    for group_name in names:
+        group = groups.get(group_name)
+        groups_data.append({
+            'name': group_name,
+            'count': group.total_users if group else 0,
+            'group': group
+        })
 
     return groups_data
@@ -1,25 +1,25 @@
+import hmac
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
-from django.db.models import Count, Q, IntegerField, Sum, Case, When
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+)
+from django.db import DatabaseError, IntegrityError, connection
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from calendar import month_name
-from datetime import date
+from datetime import MAXYEAR, MINYEAR, date
 # Import dos modelos
 from .models import Militar, Servico, Afastamento
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
 
 # Import dos serviços
 from .services import (
     calcular_efetivo_do_dia,
     calcular_efetivo_por_data,
-    tipos_permitidos_por_graduacao,
-    graduacoes_permitidas_por_tipo,
     filtrar_militares_aptos,
     filtrar_militares_nao_aptos,
     get_opcoes_tipo_por_militar,
@@ -32,16 +32,28 @@ from .services import (
     calcular_estatisticas_servico,
     calcular_contagem_por_tipo,
     gerar_eventos_calendario,
-    get_historico_servicos,
+    paginar_historico_servicos,
     get_estatisticas_historico,
+    listar_subunidades,
+    aplicar_escala_em_lote,
+    buscar_substitutos,
+    substituir_militar_servico,
+    SUBSTITUTOS_PADRAO,
     TIPO_SERVICO_LABELS,
     CARGOS_ESPECIAIS,
-    invalidar_cache_efetivo,
+    gerar_chave_cache_efetivo,
+    serializar_efetivo,
 )
 
 # Import dos formulários
 from .forms import LoginForm, RegistrationForm, MilitarForm, AfastamentoForm
 
+from .metricas import gerar_metricas
+from .perfilamento import ARQUIVOS_PERFIL, caminho_arquivo_perfil, listar_perfis
+from .elegibilidade import BIT_GRADUACAO, mascara_graduacoes, opcoes_tipo
+from .resumo_services import obter_resumo_diario
+from .utils.busca import filtro_busca_nome
+
 # Import dos serviços de PDF (com alias para evitar conflito de nomes)
 from .pdf_services import gerar_aditamento_pdf as gerar_aditamento_pdf_service, gerar_relatorio_mensal_pdf
 
@@ -53,7 +65,8 @@ from .utils.permissoes import (
     pode_gerenciar_afastamentos,
     pode_visualizar_efetivo,
     pode_gerenciar_usuarios,
-    assign_default_group
+    assign_default_group,
+    is_admin,
 )
 
 # Import dos serializers
@@ -122,6 +135,35 @@ def home(request):
         'project_name': 'EsCaLar'
     })
 
+def health(request):
+    """Verificação de saúde para balanceador/orquestrador (sem autenticação)."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        banco = 'ok'
+    except DatabaseError:
+        banco = 'erro'
+    ok = banco == 'ok'
+    return JsonResponse({'status': 'ok' if ok else 'erro', 'banco': banco}, status=200 if ok else 503)
+
+
+def metricas(request):
+    """
+    Métricas no formato de texto do Prometheus (agregadas entre os workers).
+
+    Sem sessão: exige ``Authorization: Bearer <METRICAS_TOKEN>`` quando o
+    token está configurado; senão, aceita apenas ``METRICAS_IPS_PERMITIDOS``.
+    """
+    if settings.METRICAS_TOKEN:
+        # Comparação em tempo constante (não revela o prefixo correto do token)
+        enviado = request.headers.get('Authorization', '').encode()
+        if not hmac.compare_digest(enviado, f'Bearer {settings.METRICAS_TOKEN}'.encode()):
+            return HttpResponseForbidden("Token de métricas inválido.")
+    elif request.META.get('REMOTE_ADDR') not in settings.METRICAS_IPS_PERMITIDOS:
+        return HttpResponseForbidden("Métricas disponíveis apenas para os IPs permitidos.")
+    conteudo, content_type = gerar_metricas()
+    return HttpResponse(conteudo, content_type=content_type)
+
 def logout_view(request):
     logout(request)
     messages.info(request, 'Você foi desconectado.')
@@ -150,16 +192,13 @@ def dashboard(request):
     if not request.user.is_authenticated:
         return render(request, 'core/erro_nao_logado.html', status=401)
     hoje = date.today()
-    total_militares = Militar.objects.count()
-    total_afastamentos_hoje = Afastamento.objects.filter(
-        data_inicio__lte=hoje,
-        data_fim__gte=hoje
-    ).count()
-    total_servicos_hoje = Servico.objects.filter(data=hoje).count()
+    # Contadores mantidos pelas gravações: uma linha em vez de três COUNT
+    resumo = obter_resumo_diario(hoje)
     context = {
-        'total_militares': total_militares,
-        'total_afastamentos_hoje': total_afastamentos_hoje,
-        'total_servicos_hoje': total_servicos_hoje,
+        'total_militares': resumo.total_militares,
+        'total_afastamentos_hoje': resumo.afastados,
+        'total_servicos_hoje': resumo.escalados,
+        'resumo': resumo,
         'hoje': hoje,
     }
     return render(request, 'core/dashboard.html', context)
@@ -184,64 +223,23 @@ def registrar_servico(request):
     # Usa o Efetivo do Dia (regra centralizada)
     efetivo = calcular_efetivo_por_data(data_selecionada)
 
-    # Apenas militares APTOS
-    militares_aptos = []
-    for e in efetivo:
-        if e['apto']:
-            if q and q.lower() not in e['militar'].nome.lower():
-                continue
-            if graduacao and e['militar'].graduacao != graduacao:
-                continue
-            grad = e['militar'].graduacao
-            label_map = dict(Servico.TIPOS_SERVICO)
-            allowed_codes = tipos_permitidos_por_graduacao(grad)
-            e['opcoes_tipo'] = [(code, label_map[code]) for code in allowed_codes]
-            militares_aptos.append(e)
-    militares_nao_aptos = [
-        e for e in efetivo
-        if not e['apto']
-        and (not q or q.lower() in e['militar'].nome.lower())
-        and (not graduacao or e['militar'].graduacao == graduacao)
-    ]
+    # Apenas militares APTOS (busca pelo nome já normalizado do efetivo em cache)
+    militares_aptos = filtrar_militares_aptos(efetivo, q, graduacao)
+    militares_nao_aptos = filtrar_militares_nao_aptos(efetivo, q, graduacao)
 
     if request.method == 'POST':
-        selecionados = request.POST.getlist('militares')
-
-        for item in militares_aptos:
-            militar = item['militar']
-
-            if str(militar.id) in selecionados:
-
-                #Regra 1: não duplicar serviço no mesmo dia
-                if Servico.objects.filter(militar=militar, data=data_selecionada).exists():
-                    continue
-
-                # Regra 2: garantir que é apto
-                if not item['apto']:
-                    continue
-
-                # Registrar serviço
-                tipo = request.POST.get(f'tipo_{militar.id}', 'GUARDA')
-                grad = militar.graduacao
-                allowed = tipos_permitidos_por_graduacao(grad)
-                if tipo not in allowed:
-                    continue
-                #Regra 3: cargos especiais são únicos por dia
-                especiais = {'OFICIAL_DIA', 'ADJUNTO', 'COMANDANTE_GUARDA', 'CABO_GUARDA', 'CABO_DIA'}
-                if tipo in especiais and Servico.objects.filter(data=data_selecionada, tipo=tipo).exists():
-                    messages.warning(request, f'Cargo {tipo.replace("_", " ").title()} já atribuído para {data_selecionada.strftime("%d/%m/%Y")}.')
-                    continue
-                Servico.objects.create(
-                    militar=militar,
-                    data=data_selecionada,
-                    tipo=tipo,
-                    registrado_por=request.user
-                )
-
-        # Invalida o cache do efetivo para que os militares registrados apareçam em "Não Aptos"
-        invalidar_cache_efetivo(data_selecionada)
-
-        messages.success(request, 'Serviço registrado com sucesso')
+        selecionados = set(request.POST.getlist('militares'))
+        escolhidos = [item['militar'] for item in militares_aptos if str(item['militar'].id) in selecionados]
+        tipos = {militar.id: request.POST.get(f'tipo_{militar.id}', 'GUARDA') for militar in escolhidos}
+
+        # Validação em memória + gravação em lote (consultas constantes);
+        # os caches do efetivo são invalidados pelo serviço
+        resultado = registrar_servicos(escolhidos, tipos, data_selecionada, request.user)
+        for erro in resultado['erros']:
+            messages.warning(request, erro)
+
+        if resultado['registrados']:
+            messages.success(request, 'Serviço registrado com sucesso')
         return redirect(f"{reverse('registrar_servico')}?data={data_selecionada.isoformat()}")
 
     especiais = {'OFICIAL_DIA', 'ADJUNTO', 'COMANDANTE_GUARDA', 'CABO_GUARDA', 'CABO_DIA'}
@@ -292,102 +290,81 @@ def editar_servico(request):
     if data_selecionada < date.today():
         messages.warning(request, 'Edição permitida somente para hoje e próximos dias.')
         return redirect(f"{reverse('editar_servicos')}?data={date.today().isoformat()}")
-    efetivo = calcular_efetivo_por_data(data_selecionada)
-    militares_aptos = [e for e in efetivo if e['apto']]
-    opcoes_tipo_por_militar = {}
+    # Pré-carga única: militares ativos (ordenados por nome) e serviços do dia
+    militares_ativos = list(Militar.objects.filter(ativo=True).order_by('nome'))
     label_map = dict(Servico.TIPOS_SERVICO)
-    for m in Militar.objects.filter(ativo=True):
-        allowed_codes = tipos_permitidos_por_graduacao(m.graduacao)
-        opcoes_tipo_por_militar[m.id] = [(code, label_map[code]) for code in allowed_codes]
-    servicos = Servico.objects.filter(data=data_selecionada).select_related('militar')
-    especiais = {'OFICIAL_DIA', 'ADJUNTO', 'COMANDANTE_GUARDA', 'CABO_GUARDA', 'CABO_DIA'}
-    tipos_ocupados = set(Servico.objects.filter(data=data_selecionada, tipo__in=especiais).values_list('tipo', flat=True))
+    opcoes_tipo_por_militar = {m.id: opcoes_tipo(m.graduacao) for m in militares_ativos}
+    servicos = list(Servico.objects.filter(data=data_selecionada).select_related('militar'))
+    tipos_ocupados = {s.tipo for s in servicos if s.tipo in CARGOS_ESPECIAIS}
     if request.method == 'POST':
-        apt_map = {e['militar'].id: e for e in militares_aptos}
-        alterados = 0
-        removidos = 0
+        atualizar = []
+        excluir = []
         for s in servicos:
             if request.POST.get(f'delete_{s.id}') == 'on':
-                s.delete()
-                removidos += 1
+                excluir.append(s.id)
                 continue
-            novo_militar_id = request.POST.get(f'militar_{s.id}', str(s.militar.id))
             novo_tipo = request.POST.get(f'tipo_{s.id}', s.tipo)
             try:
-                novo_militar_id_int = int(novo_militar_id)
+                novo_militar_id = int(request.POST.get(f'militar_{s.id}', s.militar_id))
             except ValueError:
-                novo_militar_id_int = s.militar.id
-            novo_militar = get_object_or_404(Militar, id=novo_militar_id_int)
-            allowed_codes = tipos_permitidos_por_graduacao(novo_militar.graduacao)
-            if novo_tipo not in allowed_codes:
-                messages.warning(request, 'Tipo de serviço não permitido para a graduação selecionada.')
-                continue
-            if novo_tipo in especiais and Servico.objects.filter(data=data_selecionada, tipo=novo_tipo).exclude(id=s.id).exists():
-                messages.warning(request, 'Tipo já atribuído para a data selecionada.')
-                continue
-            if Servico.objects.filter(militar=novo_militar, data=data_selecionada).exclude(id=s.id).exists():
-                messages.warning(request, 'Militar já possui serviço na data.')
-                continue
-            s.militar = novo_militar
-            s.tipo = novo_tipo
-            s.registrado_por = request.user
-            s.save()
-            alterados += 1
-        if alterados and not removidos:
-            messages.success(request, 'Serviços atualizados.')
+                novo_militar_id = s.militar_id
+            if (novo_militar_id, novo_tipo) != (s.militar_id, s.tipo):
+                atualizar.append({'id': s.id, 'militar': novo_militar_id, 'tipo': novo_tipo})
+        criar = []
         add_militar_id = request.POST.get('add_militar')
         add_tipo = request.POST.get('add_tipo')
         if add_militar_id and add_tipo:
             try:
-                add_militar_int = int(add_militar_id)
-                add_militar = get_object_or_404(Militar, id=add_militar_int)
-                allowed_codes = tipos_permitidos_por_graduacao(add_militar.graduacao)
-                if add_tipo in allowed_codes:
-                    if not Servico.objects.filter(militar=add_militar, data=data_selecionada).exists():
-                        if not (add_tipo in especiais and Servico.objects.filter(data=data_selecionada, tipo=add_tipo).exists()):
-                            Servico.objects.create(
-                                militar=add_militar,
-                                data=data_selecionada,
-                                tipo=add_tipo,
-                                registrado_por=request.user
-                            )
-                            alterados += 1
-                            messages.success(request, 'Serviço adicionado.')
-                else:
-                    messages.warning(request, 'Tipo de serviço não permitido para a graduação selecionada.')
+                criar.append({'militar': int(add_militar_id), 'tipo': add_tipo})
             except ValueError:
                 pass
-        if alterados or removidos:
-            # Invalida o cache do efetivo para que as alterações apareçam corretamente
-            invalidar_cache_efetivo(data_selecionada)
-            messages.success(request, 'Alterações aplicadas.')
+
+        if atualizar or excluir or criar:
+            # Validação sobre o estado final do dia + gravação atômica em lote
+            # (tudo ou nada: trocas entre serviços só são válidas em conjunto);
+            # os caches do efetivo são invalidados pelo serviço
+            resultado = aplicar_escala_em_lote(
+                data_selecionada, criar=criar, atualizar=atualizar, excluir=excluir,
+                registrado_por=request.user
+            )
+            if resultado['erros']:
+                messages.error(
+                    request,
+                    'Nenhuma alteração foi gravada: corrija os itens abaixo e envie novamente.'
+                )
+                nomes = {s.id: s.militar.nome for s in servicos}
+                for erro in resultado['erros']:
+                    if 'id' in erro:
+                        messages.warning(request, f"{nomes.get(erro['id'], 'Serviço')}: {erro['erro']}")
+                    elif 'indice' in erro:
+                        messages.warning(request, f"Novo serviço: {erro['erro']}")
+                    else:
+                        messages.warning(request, erro['erro'])
+            else:
+                total = len(resultado['criados']) + len(resultado['atualizados']) + len(resultado['excluidos'])
+                messages.success(request, f'Alterações aplicadas ({total} serviço(s)).')
         return redirect(f"{reverse('editar_servico')}?data={data_selecionada.isoformat()}")
     # Prepara as escolhas de militares filtradas por tipo de serviço
     # Para cada serviço, mostra apenas militares que podem realizar aquele tipo de serviço
     militares_choices_por_servico = {}
     for s in servicos:
-        tipo_servico = s.tipo
-        graduacoes_permitidas = graduacoes_permitidas_por_tipo(tipo_servico)
-        # Obtém militares que têm a graduação permitida para este tipo de serviço
-        militares_filtrados = Militar.objects.filter(
-            ativo=True, 
-            graduacao__in=graduacoes_permitidas
-        ).order_by('nome')
-        militares_choices_por_servico[s.id] = militares_filtrados
-    
-    usados_ids = list(Servico.objects.filter(data=data_selecionada).values_list('militar_id', flat=True))
-    militares_choices_add = Militar.objects.filter(ativo=True).exclude(id__in=usados_ids).order_by('nome')
-    tipo_label_map = dict(Servico.TIPOS_SERVICO)
+        mascara = mascara_graduacoes(s.tipo)
+        militares_choices_por_servico[s.id] = [
+            m for m in militares_ativos if BIT_GRADUACAO.get(m.graduacao, 0) & mascara
+        ]
+
+    usados_ids = {s.militar_id for s in servicos}
+    militares_choices_add = [m for m in militares_ativos if m.id not in usados_ids]
     tipos_lista = Servico.TIPOS_SERVICO
-    servicos_info = [{'obj': s, 'opcoes': opcoes_tipo_por_militar.get(s.militar.id, [])} for s in servicos]
+    servicos_info = [{'obj': s, 'opcoes': opcoes_tipo_por_militar.get(s.militar_id, [])} for s in servicos]
     return render(request, 'core/editar_servico.html', {
         'data_selecionada': data_selecionada,
         'servicos_info': servicos_info,
-        'militares_choices': Militar.objects.filter(ativo=True).order_by('nome'),
+        'militares_choices': militares_ativos,
         'militares_choices_por_servico': militares_choices_por_servico,
         'militares_choices_add': militares_choices_add,
         'opcoes_tipo_por_militar': opcoes_tipo_por_militar,
-        'tipo_label_map': tipo_label_map,
+        'tipo_label_map': label_map,
         'tipos_lista': tipos_lista,
         'tipos_ocupados': tipos_ocupados,
     })
@@ -438,6 +415,8 @@ def historico_militar(request, militar_id):
         mes_sel = int(mes_str) if mes_str else hoje.month
         if not (1 <= mes_sel <= 12):
             mes_sel = hoje.month
+        if not (MINYEAR <= ano_sel <= MAXYEAR):
+            raise ValueError(ano_sel)
     except ValueError:
         ano_sel = hoje.year
         mes_sel = hoje.month
@@ -449,24 +428,33 @@ def historico_militar(request, militar_id):
     ]
     mes_nome = meses_pt[mes_sel]
 
-    servicos = Servico.objects.filter(
-        militar=militar
-    ).order_by('-data')
-
-    total_servicos = servicos.count()
-    ultimo_servico = servicos.first()
+    # Listagem paginada por cursor; filtrada pelo mês/ano quando informados
+    filtrar = bool(ano_str or mes_str)
+    pagina = paginar_historico_servicos(
+        militar,
+        ano=ano_sel if filtrar else None,
+        mes=mes_sel if filtrar else None,
+        cursor=request.GET.get('cursor'),
+    )
+    estatisticas = get_estatisticas_historico(militar, ano_sel, mes_sel)
 
-    total_mes = servicos.filter(
-        data__month=mes_sel,
-        data__year=ano_sel
-    ).count()
+    parametros = request.GET.copy()
+    parametros.pop('cursor', None)
+    primeira_url = f'?{parametros.urlencode()}' if 'cursor' in request.GET else None
+    proxima_url = None
+    if pagina['proximo_cursor']:
+        parametros['cursor'] = pagina['proximo_cursor']
+        proxima_url = f'?{parametros.urlencode()}'
 
     context = {
         'militar': militar,
-        'servicos': servicos,
-        'total_servicos': total_servicos,
-        'ultimo_servico': ultimo_servico,
-        'total_mes': total_mes,
+        'servicos': pagina['servicos'],
+        'filtrado': filtrar,
+        'primeira_url': primeira_url,
+        'proxima_url': proxima_url,
+        'total_servicos': estatisticas['total_servicos'],
+        'ultimo_servico': estatisticas['ultimo_servico'],
+        'total_mes': estatisticas['total_mes'],
         'ano': ano_sel,
         'mes': mes_sel,
         'mes_nome': mes_nome,
@@ -488,55 +476,7 @@ def relatorio_mensal_militar_pdf(request, militar_id, ano, mes):
         data__month=mes
     ).order_by('data')
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = (
-        f'inline; filename="relatorio_{militar.nome}_{mes}_{ano}.pdf"'
-    )
-
-    pdf = canvas.Canvas(response, pagesize=A4)
-    largura, altura = A4
-
-    y = altura - 50
-
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(50, y, "RELATÓRIO MENSAL DE SERVIÇOS")
-    y -= 30
-
-    pdf.setFont("Helvetica", 11)
-    pdf.drawString(50, y, f"Militar: {militar.nome}")
-    y -= 20
-    pdf.drawString(50, y, f"Mês/Ano: {month_name[mes].upper()} / {ano}")
-    y -= 20
-    pdf.drawString(50, y, f"Total de serviços: {servicos.count()}")
-    y -= 30
-
-    pdf.setFont("Helvetica-Bold", 11)
-    pdf.drawString(50, y, "DATA DO SERVIÇO")
-    y -= 15
-    pdf.line(50, y, 300, y)
-    y -= 15
-
-    pdf.setFont("Helvetica", 11)
-
-    if servicos.exists():
-        for servico in servicos:
-            pdf.drawString(50, y, servico.data.strftime('%d/%m/%Y'))
-            y -= 18
-
-            if y < 50:
-                pdf.showPage()
-                y = altura - 50
-                pdf.setFont("Helvetica", 11)
-    else:
-        pdf.drawString(50, y, "Nenhum serviço registrado no período.")
-
-    pdf.setFont("Helvetica-Oblique", 9)
-    pdf.drawString(50, 30, "Documento gerado pelo Sistema de Sargenteação")
-
-    pdf.showPage()
-    pdf.save()
-
-    return response
+    return gerar_relatorio_mensal_pdf(militar, servicos, mes, ano)
 
 @login_required
 def estatisticas_servico(request):
@@ -559,63 +499,17 @@ def estatisticas_servico(request):
     except ValueError:
         fim = hoje
 
-    servicos_qs = Servico.objects.filter(data__gte=inicio, data__lte=fim).select_related('militar')
+    stats = calcular_estatisticas_servico(inicio, fim, q, graduacao, subunidade)
+    subunidades = listar_subunidades()
+
+    servicos_qs = Servico.objects.filter(data__gte=inicio, data__lte=fim)
     if q:
-        servicos_qs = servicos_qs.filter(militar__nome__icontains=q)
+        servicos_qs = servicos_qs.filter(filtro_busca_nome(q, 'militar__nome_busca'))
     if graduacao:
         servicos_qs = servicos_qs.filter(militar__graduacao=graduacao)
     if subunidade:
         servicos_qs = servicos_qs.filter(militar__subunidade=subunidade)
-
-    stats_qs = servicos_qs.values('militar_id').annotate(
-        total=Count('id'),
-        guarda=Sum(Case(When(tipo='GUARDA', then=1), default=0, output_field=IntegerField())),
-        plantao=Sum(Case(When(tipo='PLANTAO', then=1), default=0, output_field=IntegerField())),
-        permanencia=Sum(Case(When(tipo='PERMANENCIA', then=1), default=0, output_field=IntegerField())),
-        comandante_guarda=Sum(Case(When(tipo='COMANDANTE_GUARDA', then=1), default=0, output_field=IntegerField())),
-        cabo_guarda=Sum(Case(When(tipo='CABO_GUARDA', then=1), default=0, output_field=IntegerField())),
-        cabo_dia=Sum(Case(When(tipo='CABO_DIA', then=1), default=0, output_field=IntegerField())),
-        adjunto=Sum(Case(When(tipo='ADJUNTO', then=1), default=0, output_field=IntegerField())),
-        oficial_dia=Sum(Case(When(tipo='OFICIAL_DIA', then=1), default=0, output_field=IntegerField())),
-    )
-
-    militar_ids = [row['militar_id'] for row in stats_qs]
-    militares_map = {m.id: m for m in Militar.objects.filter(id__in=militar_ids)}
-
-    stats = []
-    for row in stats_qs:
-        m = militares_map.get(row['militar_id'])
-        if not m:
-            continue
-        stats.append({
-            'militar': m,
-            'graduacao': m.get_graduacao_display(),
-            'subunidade': m.subunidade,
-            'total': row['total'],
-            'guarda': row['guarda'],
-            'plantao': row['plantao'],
-            'permanencia': row['permanencia'],
-            'comandante_guarda': row['comandante_guarda'],
-            'cabo_guarda': row['cabo_guarda'],
-            'cabo_dia': row['cabo_dia'],
-            'adjunto': row['adjunto'],
-            'oficial_dia': row['oficial_dia'],
-        })
-
-    stats = sorted(stats, key=lambda x: x['total'], reverse=True)
-
-    subunidades = Militar.objects.values_list('subunidade', flat=True).distinct().order_by('subunidade')
-
-    tipos_order = [
-        'GUARDA', 'PLANTAO', 'PERMANENCIA',
-        'COMANDANTE_GUARDA', 'CABO_GUARDA', 'CABO_DIA',
-        'ADJUNTO', 'OFICIAL_DIA'
-    ]
-    tipo_label_map = dict(Servico.TIPOS_SERVICO)
-    tipo_agg = servicos_qs.values('tipo').annotate(count=Count('id'))
-    tipo_count_map = {row['tipo']: row['count'] for row in tipo_agg}
-    tipo_labels = [tipo_label_map[t] for t in tipos_order]
-    tipo_values = [tipo_count_map.get(t, 0) for t in tipos_order]
+    contagem_tipos = calcular_contagem_por_tipo(servicos_qs)
 
     return render(request, 'core/estatisticas_servico.html', {
         'stats': stats,
@@ -626,8 +520,8 @@ def estatisticas_servico(request):
         'subunidade': subunidade,
         'graduacoes': Militar.GRADUACOES_CHOICES,
         'subunidades': subunidades,
-        'tipo_labels': tipo_labels,
-        'tipo_values': tipo_values,
+        'tipo_labels': contagem_tipos['labels'],
+        'tipo_values': contagem_tipos['values'],
     })
 @login_required
 def api_efetivo(request):
@@ -637,7 +531,7 @@ def api_efetivo(request):
     graduacao = request.GET.get('graduacao', '').strip()
     militares = Militar.objects.all().order_by('nome')
     if q:
-        militares = militares.filter(nome__icontains=q)
+        militares = militares.filter(filtro_busca_nome(q))
     if graduacao:
         militares = militares.filter(graduacao=graduacao)
     graduacoes = Militar.GRADUACOES_CHOICES
@@ -660,8 +554,11 @@ def api_militar_novo(request):
         subunidade = request.POST.get('subunidade', '').strip() or 'Geral'
         ativo = request.POST.get('ativo') == 'on'
         if nome:
-            Militar.objects.create(nome=nome, graduacao=graduacao, subunidade=subunidade, ativo=ativo)
-            messages.success(request, 'Militar criado com sucesso.')
+            try:
+                Militar.objects.create(nome=nome, graduacao=graduacao, subunidade=subunidade, ativo=ativo)
+                messages.success(request, 'Militar criado com sucesso.')
+            except IntegrityError:
+                messages.error(request, 'Já existe um militar com este nome nesta subunidade.')
         else:
             messages.error(request, 'Nome é obrigatório.')
     return redirect('api_efetivo')
@@ -761,7 +658,7 @@ def api_militar_excluir(request, militar_id):
 def calendario_servicos(request):
     if not pode_visualizar_efetivo(request.user):
         return HttpResponseForbidden("Você não tem permissão para visualizar o calendário.")
-    subunidades = Militar.objects.values_list('subunidade', flat=True).distinct().order_by('subunidade')
+    subunidades = listar_subunidades()
     militares = Militar.objects.filter(ativo=True).order_by('nome')
     return render(request, 'core/calendario_servicos.html', {
         'subunidades': subunidades,
@@ -800,52 +697,7 @@ def calendario_events(request):
             # Último fallback: usar range padrão
             start = today - timedelta(days=30)
             end = today + timedelta(days=60)
-    qs_serv = Servico.objects.filter(data__gte=start, data__lte=end).select_related('militar')
-    qs_afast = Afastamento.objects.filter(data_inicio__lte=end, data_fim__gte=start).select_related('militar')
-    if subunidade:
-        qs_serv = qs_serv.filter(militar__subunidade=subunidade)
-        qs_afast = qs_afast.filter(militar__subunidade=subunidade)
-    tipo_colors = {
-        'COMANDANTE_GUARDA': '#795548',
-        'CABO_GUARDA': '#8D6E63',
-        'CABO_DIA': '#9C27B0',
-        'ADJUNTO': '#3F51B5',
-        'OFICIAL_DIA': '#3949AB',
-        'GUARDA': '#009688',
-        'PLANTAO': '#2196F3',
-        'PERMANENCIA': '#607D8B',
-    }
-    events = []
-    for s in qs_serv:
-        graduacao = s.militar.get_graduacao_display()
-        title = f"{graduacao} {s.militar.nome}"
-        events.append({
-            'id': f'srv-{s.id}',
-            'title': title,
-            'start': s.data.isoformat(),
-            'end': (s.data + timedelta(days=1)).isoformat(),
-            'allDay': True,
-            'color': tipo_colors.get(s.tipo, '#1976D2'),
-            'extendedProps': {
-                'tipo': s.tipo,
-                'militarId': s.militar.id,
-            }
-        })
-    for a in qs_afast:
-        graduacao = a.militar.get_graduacao_display()
-        title = f"{graduacao} {a.militar.nome}"
-        events.append({
-            'id': f'af-{a.id}',
-            'title': title,
-            'start': a.data_inicio.isoformat(),
-            'end': (a.data_fim + timedelta(days=1)).isoformat(),
-            'allDay': True,
-            'color': '#E53935',
-            'extendedProps': {
-                'tipo': 'AFASTAMENTO',
-                'militarId': a.militar.id,
-            }
-        })
+    events = gerar_eventos_calendario(start, end, subunidade)
     return JsonResponse(events, safe=False)
 
 
@@ -855,7 +707,7 @@ def admin_user_management(request):
         return HttpResponseForbidden("Você não tem permissão para gerenciar usuários.")
 
     from django.contrib.auth.models import User, Group
-    from .utils.permissoes import get_all_groups_with_counts, get_user_role_display, assign_default_group
+    from .utils.permissoes import get_all_groups_with_counts, get_role_display_from_groups, assign_default_group
     if request.method == 'POST':
         novo_username = request.POST.get('novo_username', '').strip()
         graduacao = request.POST.get('graduacao', 'SD').strip()
@@ -875,16 +727,18 @@ def admin_user_management(request):
             else:
                 messages.info(request, f'Usuário {novo_username} já existe')
 
-    users = User.objects.all().select_related()
+    # Grupos pré-carregados: papel e grupos de cada usuário sem consultas extras
+    users = User.objects.all().prefetch_related('groups')
     groups_data = get_all_groups_with_counts()
 
     # Add role display to each user
     users_with_roles = []
     for user in users:
+        group_names = [group.name for group in user.groups.all()]
         user_dict = {
             'user': user,
-            'role': get_user_role_display(user),
-            'groups': list(user.groups.values_list('name', flat=True))
+            'role': get_role_display_from_groups(user, group_names),
+            'groups': group_names
         }
         users_with_roles.append(user_dict)
 
@@ -895,12 +749,52 @@ def admin_user_management(request):
 
     return render(request, 'core/admin_user_management.html', context)
 
+
+@login_required
+def perfis_lista(request):
+    """Lista (JSON) os perfis de requisição gravados pelo PerfilamentoMiddleware (somente admin)."""
+    if not is_admin(request.user):
+        return HttpResponseForbidden("Você não tem permissão para acessar os perfis.")
+    return JsonResponse({'perfis': listar_perfis()})
+
+
+@login_required
+def perfil_download(request, perfil_id, arquivo):
+    """Baixa um arquivo de perfil: ``folded`` (flamegraph), ``prof`` (pstats) ou ``sql``."""
+    if not is_admin(request.user):
+        return HttpResponseForbidden("Você não tem permissão para acessar os perfis.")
+    caminho = caminho_arquivo_perfil(perfil_id, arquivo)
+    if caminho is None:
+        raise Http404("Perfil não encontrado.")
+    return FileResponse(
+        open(caminho, 'rb'),
+        as_attachment=True,
+        filename=f'{perfil_id}.{caminho.name.rsplit(".", 1)[-1]}',
+        content_type=ARQUIVOS_PERFIL[arquivo][1],
+    )
+
+import asyncio
+import io
+import json
+import time
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import BasePermission, IsAuthenticated
+from .conflitos_services import aplicar_substituicoes, detectar_conflitos, propor_substituicoes, serializar_propostas
+from .importacao_services import importar_militares_csv
+from .eventos import barramento
+from .pagination import MilitarCursorPagination, AfastamentoCursorPagination, ServicoCursorPagination
+from .serializers import ServicoSerializer, EscalaLoteSerializer
+from .utils.api import ProjecaoListMixin, parse_lista, parse_bool, parse_data
 from .serializers import MilitarSerializer, AfastamentoSerializer
 from .utils.permissoes import (
     pode_gerenciar_militares,
     pode_gerenciar_afastamentos,
+    pode_registrar_servico,
     pode_visualizar_efetivo
 )
 
@@ -928,6 +822,13 @@ class CanManageAfastamentos(BasePermission):
         return pode_gerenciar_afastamentos(request.user)
 
 
+class CanRegistrarServico(BasePermission):
+    """Permission to register/edit services (Sargenteante or Admin)"""
+
+    def has_permission(self, request, view):
+        return pode_registrar_servico(request.user)
+
+
 class CanViewEfetivo(BasePermission):
     """Permission to view daily roster (All authenticated users)"""
 
@@ -935,9 +836,36 @@ class CanViewEfetivo(BasePermission):
         return pode_visualizar_efetivo(request.user)
 
 
-class MilitarViewSet(ModelViewSet):
+class MilitarViewSet(ProjecaoListMixin, ModelViewSet):
+    """
+    CRUD de militares.
+
+    Listagem paginada por cursor, com filtros ``subunidade``, ``graduacao``
+    (aceitam lista separada por vírgula), ``ativo`` e ``q`` (busca no nome,
+    sem acentos), e seleção de campos via ``?fields=``.
+    """
     queryset = Militar.objects.all()
     serializer_class = MilitarSerializer
+    pagination_class = MilitarCursorPagination
+    campos_projecao = ('id', 'nome', 'graduacao', 'subunidade', 'ativo')
+
+    def filter_queryset(self, queryset):
+        # Filtros só da listagem: get_object() (retrieve/update/destroy) também
+        # passa por aqui e deve achar o registro pelo ID
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+        subunidades = parse_lista(params.get('subunidade'))
+        graduacoes = parse_lista(params.get('graduacao'))
+        if subunidades:
+            queryset = queryset.filter(subunidade__in=subunidades)
+        if graduacoes:
+            queryset = queryset.filter(graduacao__in=graduacoes)
+        if params.get('ativo'):
+            queryset = queryset.filter(ativo=parse_bool(params['ativo'], 'ativo'))
+        if params.get('q'):
+            queryset = queryset.filter(filtro_busca_nome(params['q']))
+        return queryset
 
     def get_permissions(self):
         """Return appropriate permissions based on action"""
@@ -950,10 +878,67 @@ class MilitarViewSet(ModelViewSet):
 
         return [permission() for permission in permission_classes]
 
+    @action(detail=False, methods=['post'], url_path='importar', parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """Importa/sincroniza militares a partir de um CSV enviado no campo 'arquivo'."""
+        arquivo = request.FILES.get('arquivo')
+        if not arquivo:
+            return Response({'detail': "Envie o CSV no campo 'arquivo'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'on', 'sim')
+        linhas = io.TextIOWrapper(arquivo.file, encoding='utf-8-sig', newline='')
+        try:
+            relatorio = importar_militares_csv(linhas, dry_run=dry_run)
+        except UnicodeDecodeError:
+            # A importação é atômica: nada foi gravado
+            return Response(
+                {'detail': 'O CSV deve estar em UTF-8 (no Excel: "CSV UTF-8").'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(relatorio)
+
+
+class AfastamentoViewSet(ProjecaoListMixin, ModelViewSet):
+    """
+    CRUD de afastamentos.
+
+    Listagem paginada por cursor, com filtros ``militar``, ``tipo``,
+    ``subunidade`` e período (``inicio``/``fim``: afastamentos que se
+    sobrepõem ao intervalo), e seleção de campos via ``?fields=``.
 
-class AfastamentoViewSet(ModelViewSet):
+    Ao incluir ou alterar um afastamento, a resposta traz em ``conflitos``
+    os serviços futuros do militar dentro do período, com o substituto
+    proposto; com ``?resolver=1`` as substituições são gravadas
+    (``substituicoes``).
+    """
     queryset = Afastamento.objects.all().select_related('militar')
     serializer_class = AfastamentoSerializer
+    pagination_class = AfastamentoCursorPagination
+    campos_projecao = ('id', 'militar', 'tipo', 'data_inicio', 'data_fim', 'observacoes', 'criado_em')
+
+    def filter_queryset(self, queryset):
+        # Filtros só da listagem: get_object() (retrieve/update/destroy) também
+        # passa por aqui e deve achar o registro pelo ID
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+        militares = parse_lista(params.get('militar'))
+        tipos = parse_lista(params.get('tipo'))
+        subunidades = parse_lista(params.get('subunidade'))
+        if militares:
+            try:
+                queryset = queryset.filter(militar_id__in=[int(m) for m in militares])
+            except ValueError:
+                raise ValidationError({'militar': 'Informe IDs numéricos.'})
+        if tipos:
+            queryset = queryset.filter(tipo__in=tipos)
+        if subunidades:
+            queryset = queryset.filter(militar__subunidade__in=subunidades)
+        if params.get('inicio'):
+            queryset = queryset.filter(data_fim__gte=parse_data(params['inicio'], 'inicio'))
+        if params.get('fim'):
+            queryset = queryset.filter(data_inicio__lte=parse_data(params['fim'], 'fim'))
+        return queryset
 
     def get_permissions(self):
         """Return appropriate permissions based on action"""
@@ -966,39 +951,319 @@ class AfastamentoViewSet(ModelViewSet):
 
         return [permission() for permission in permission_classes]
 
+    def perform_create(self, serializer):
+        self._afastamento = serializer.save()
+
+    def perform_update(self, serializer):
+        self._afastamento = serializer.save()
+
+    def create(self, request, *args, **kwargs):
+        return self._com_conflitos(super().create(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        return self._com_conflitos(super().update(request, *args, **kwargs))
+
+    def _com_conflitos(self, resposta):
+        """Acrescenta à resposta os serviços futuros em conflito (e os resolve com ``?resolver=1``)."""
+        propostas = propor_substituicoes(detectar_conflitos([self._afastamento.id], inicio=date.today()))
+        resolver = self.request.query_params.get('resolver')
+        if propostas and resolver and parse_bool(resolver, 'resolver'):
+            resposta.data['substituicoes'] = aplicar_substituicoes(propostas, registrado_por=self.request.user)
+        resposta.data['conflitos'] = serializar_propostas(propostas)
+        return resposta
+
+
+class ServicoViewSet(ProjecaoListMixin, ModelViewSet):
+    """
+    CRUD de serviços, com as mesmas regras de ``pode_atribuir_tipo``.
+
+    Listagem paginada por cursor, com filtros ``data``, ``inicio``/``fim``,
+    ``militar``, ``tipo`` e ``subunidade``. A rota ``bulk/`` aplica a escala
+    de um dia inteiro em uma única requisição (POST cria, PATCH atualiza,
+    DELETE exclui), de forma atômica. ``substitutos/`` sugere os melhores
+    substitutos para um tipo e data, e ``{id}/substituir/`` troca o militar
+    de um serviço.
+    """
+    queryset = Servico.objects.all().select_related('militar')
+    serializer_class = ServicoSerializer
+    pagination_class = ServicoCursorPagination
+    campos_projecao = ('id', 'militar', 'data', 'tipo', 'registrado_por', 'data_registro')
+
+    def get_permissions(self):
+        """Return appropriate permissions based on action"""
+        if self.action in ['list', 'retrieve']:
+            # Anyone authenticated can view
+            permission_classes = [IsAuthenticated]
+        elif self.action == 'substitutos':
+            permission_classes = [CanViewEfetivo]
+        else:
+            # Admin or Sargenteante can manage
+            permission_classes = [CanRegistrarServico]
+
+        return [permission() for permission in permission_classes]
+
+    def filter_queryset(self, queryset):
+        # Filtros só da listagem: get_object() (retrieve/update/destroy) também
+        # passa por aqui e deve achar o registro pelo ID
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+        militares = parse_lista(params.get('militar'))
+        tipos = parse_lista(params.get('tipo'))
+        subunidades = parse_lista(params.get('subunidade'))
+        if params.get('data'):
+            queryset = queryset.filter(data=parse_data(params['data'], 'data'))
+        if params.get('inicio'):
+            queryset = queryset.filter(data__gte=parse_data(params['inicio'], 'inicio'))
+        if params.get('fim'):
+            queryset = queryset.filter(data__lte=parse_data(params['fim'], 'fim'))
+        if militares:
+            try:
+                queryset = queryset.filter(militar_id__in=[int(m) for m in militares])
+            except ValueError:
+                raise ValidationError({'militar': 'Informe IDs numéricos.'})
+        if tipos:
+            queryset = queryset.filter(tipo__in=tipos)
+        if subunidades:
+            queryset = queryset.filter(militar__subunidade__in=subunidades)
+        return queryset
+
+    def perform_create(self, serializer):
+        serializer.save(registrado_por=self.request.user)
+
+    def perform_update(self, serializer):
+        serializer.save(registrado_por=self.request.user)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Aplica a escala de um dia em lote.
+
+        - POST:   {"data": "AAAA-MM-DD", "servicos": [{"militar": 1, "tipo": "GUARDA"}, ...]}
+        - PATCH:  {"data": "AAAA-MM-DD", "servicos": [{"id": 10, "militar": 2, "tipo": "PLANTAO"}, ...]}
+        - DELETE: {"data": "AAAA-MM-DD", "ids": [10, 11]}
+        """
+        entrada = EscalaLoteSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        data_escala = entrada.validated_data['data']
+        itens = entrada.validated_data['servicos']
+
+        if request.method == 'POST':
+            if any('militar' not in item for item in itens):
+                raise ValidationError({'servicos': "Cada item deve informar 'militar'."})
+            resultado = aplicar_escala_em_lote(data_escala, criar=itens, registrado_por=request.user)
+        elif request.method == 'PATCH':
+            if any('id' not in item for item in itens):
+                raise ValidationError({'servicos': "Cada item deve informar 'id'."})
+            resultado = aplicar_escala_em_lote(data_escala, atualizar=itens, registrado_por=request.user)
+        else:
+            resultado = aplicar_escala_em_lote(data_escala, excluir=entrada.validated_data['ids'])
+
+        if resultado['erros']:
+            return Response(resultado, status=status.HTTP_400_BAD_REQUEST)
+        if request.method == 'POST':
+            return Response(resultado, status=status.HTTP_201_CREATED)
+        return Response(resultado)
+
+    @action(detail=False, methods=['get'])
+    def substitutos(self, request):
+        """
+        Melhores substitutos para um tipo de serviço em uma data.
+
+        - ``?servico=ID``: usa a data e o tipo do serviço (e ignora o militar dele)
+        - ou ``?data=AAAA-MM-DD&tipo=CODIGO``
+        - ``?k=`` (padrão 5) e ``?subunidade=``
+        """
+        params = request.query_params
+        excluir = []
+        if params.get('servico'):
+            try:
+                servico_id = int(params['servico'])
+            except ValueError:
+                raise ValidationError({'servico': 'Informe o ID numérico do serviço.'})
+            servico = get_object_or_404(Servico, pk=servico_id)
+            data_servico, tipo, excluir = servico.data, servico.tipo, [servico.militar_id]
+        else:
+            if not params.get('data') or not params.get('tipo'):
+                raise ValidationError({'servico': "Informe 'servico' ou 'data' e 'tipo'."})
+            data_servico, tipo = parse_data(params['data'], 'data'), params['tipo']
+            if tipo not in TIPO_SERVICO_LABELS:
+                raise ValidationError({'tipo': f'Tipo de serviço inválido: "{tipo}".'})
+        try:
+            k = int(params.get('k', SUBSTITUTOS_PADRAO))
+        except ValueError:
+            raise ValidationError({'k': 'Informe a quantidade de substitutos.'})
+
+        substitutos = buscar_substitutos(
+            data_servico, tipo, k=min(max(k, 1), 50),
+            subunidade=params.get('subunidade', '').strip(), excluir=excluir,
+        )
+        return Response({
+            'data': data_servico,
+            'tipo': tipo,
+            'substitutos': [
+                {
+                    'id': s['militar'].id,
+                    'nome': s['militar'].nome,
+                    'graduacao': s['militar'].graduacao,
+                    'subunidade': s['militar'].subunidade,
+                    'dias_folga': s['dias_folga'],
+                    'servicos_mes': s['servicos_mes'],
+                    'status': s['status'],
+                }
+                for s in substitutos
+            ],
+        })
+
+    @action(detail=True, methods=['post'])
+    def substituir(self, request, pk=None):
+        """
+        Troca o militar do serviço: {"militar": id}, ou sem corpo para usar o
+        primeiro substituto sugerido. Atômico: com erro, nada é gravado.
+        """
+        servico = self.get_object()
+        militar_id = request.data.get('militar')
+        if militar_id is not None:
+            try:
+                militar_id = int(militar_id)
+            except (TypeError, ValueError):
+                raise ValidationError({'militar': 'Informe o ID numérico do militar.'})
+
+        resultado = substituir_militar_servico(servico, militar_id, registrado_por=request.user)
+        if resultado['erros']:
+            return Response(resultado, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultado)
+
+
+# Tempo máximo de espera do long-poll do efetivo (segundos)
+EFETIVO_LONG_POLL_MAX = 30
+EFETIVO_LONG_POLL_INTERVALO = 1
 
-from datetime import date
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.response import Response
-from core.models import Militar, Afastamento
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def efetivo_do_dia(request):
-    hoje = date.today()
+def _efetivo_do_dia(request):
+    """Efetivo em JSON sem espera: ``304`` quando o ETag do cliente é o atual."""
+    if not pode_visualizar_efetivo(request.user):
+        return Response(status=status.HTTP_403_FORBIDDEN)
+
+    data_ref = parse_data(request.query_params['data'], 'data') if request.query_params.get('data') else date.today()
+    subunidade = request.query_params.get('subunidade', '').strip()
+    try:
+        int(request.query_params.get('aguardar', 0))
+    except ValueError:
+        raise ValidationError({'aguardar': 'Informe o tempo de espera em segundos.'})
+
+    etag = f'"{gerar_chave_cache_efetivo(data_ref)}"'
+    if etag == request.headers.get('If-None-Match'):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    efetivo = serializar_efetivo(calcular_efetivo_por_data(data_ref), subunidade)
+    dados = {
+        'data': data_ref,
+        'versao': etag.strip('"'),
+        'total': len(efetivo),
+        'aptos': sum(1 for e in efetivo if e['apto']),
+        'efetivo': efetivo,
+    }
+    return Response(dados, headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
 
-    afastados_ids = Afastamento.objects.filter(
-        data_inicio__lte=hoje,
-        data_fim__gte=hoje
-    ).values_list('militar_id', flat=True)
 
-    militares_disponiveis = Militar.objects.filter(
-        ativo=True
-    ).exclude( 
-    )
+async def efetivo_do_dia(request):
+    """
+    Efetivo de uma data em JSON (?data=AAAA-MM-DD, padrão hoje; ?subunidade=).
+
+    A resposta traz um ETag derivado da chave de cache versionada do efetivo:
+    enviando ``If-None-Match`` com o ETag atual a resposta é ``304``. Com
+    ``?aguardar=N`` (long-poll, até 30s) a requisição fica aberta até o
+    efetivo mudar ou o tempo acabar (``304``). A espera é assíncrona (não
+    ocupa uma thread do worker) e a versão vem do cache compartilhado
+    entre os workers.
+    """
+    resposta = await sync_to_async(_efetivo_do_dia)(request)
+    if resposta.status_code != status.HTTP_304_NOT_MODIFIED:
+        return resposta
+
+    # ⏳ Long-poll: autenticação e parâmetros já validados pela resposta 304
+    aguardar = min(int(request.GET.get('aguardar', 0)), EFETIVO_LONG_POLL_MAX)
+    data_ref = parse_data(request.GET['data'], 'data') if request.GET.get('data') else date.today()
+    etag = resposta['ETag']
+    limite = time.monotonic() + max(aguardar, 0)
+    while time.monotonic() < limite:
+        await asyncio.sleep(EFETIVO_LONG_POLL_INTERVALO)
+        if f'"{await sync_to_async(gerar_chave_cache_efetivo)(data_ref)}"' != etag:
+            return await sync_to_async(_efetivo_do_dia)(request)
+    return resposta
 
-    data = {
-        "data": hoje,
-        "efetivo": [
-            {
-                "id": m.id,
-                "nome": m.nome,
-                "graduacao": m.graduacao,
-                "subunidade": m.subunidade
-            }
-            for m in militares_disponiveis
-        ]
-    }
 
-    return Response(data)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def resumo_diario(request):
+    """
+    Contadores do dashboard de uma data em JSON (?data=AAAA-MM-DD, padrão hoje).
+
+    Lê a linha de ``ResumoDiario`` mantida pelas gravações (ver
+    ``core.resumo_services``).
+    """
+    data_ref = parse_data(request.query_params['data'], 'data') if request.query_params.get('data') else date.today()
+    resumo = obter_resumo_diario(data_ref)
+    return Response({
+        'data': resumo.data,
+        'total_militares': resumo.total_militares,
+        'afastados': resumo.afastados,
+        'escalados': resumo.escalados,
+        'escalados_por_tipo': resumo.escalados_por_tipo,
+        'escalados_por_subunidade': resumo.escalados_por_subunidade,
+        'atualizado_em': resumo.atualizado_em,
+    })
+
+
+# Intervalo de heartbeat do stream SSE (segundos)
+SSE_HEARTBEAT = 15
+
+
+async def stream_eventos_escala(request):
+    """
+    Stream SSE com as alterações de serviços e afastamentos (requer ASGI).
+
+    Filtros opcionais: ``?data=AAAA-MM-DD`` (aceita lista separada por
+    vírgula; um serviço também afeta o efetivo do dia seguinte) e
+    ``?subunidade=``. Cada evento traz ``modelo`` (servico/afastamento),
+    ``acao`` (criado/atualizado/excluido) e os dados necessários para o
+    cliente atualizar a tela de forma incremental. Se o cliente ficar para
+    trás e eventos forem descartados, é enviado o evento ``recarregar``.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Autenticação necessária.'}, status=401)
+    if not pode_visualizar_efetivo(user):
+        return HttpResponseForbidden("Você não tem permissão para ver efetivo.")
+
+    from datetime import datetime
+    try:
+        datas = {datetime.strptime(d, '%Y-%m-%d').date() for d in parse_lista(request.GET.get('data'))}
+    except ValueError:
+        return JsonResponse({'data': 'Data inválida. Use AAAA-MM-DD.'}, status=400)
+    subunidade = request.GET.get('subunidade', '').strip()
+
+    async def gerar():
+        assinatura = barramento.assinar(datas, subunidade)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    evento = await asyncio.wait_for(assinatura.fila.get(), SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                if assinatura.perdeu_eventos:
+                    assinatura.perdeu_eventos = False
+                    yield 'event: recarregar\ndata: {}\n\n'
+                yield f"id: {evento['seq']}\nevent: {evento['modelo']}\ndata: {json.dumps(evento)}\n\n"
+        finally:
+            barramento.cancelar(assinatura)
+
+    response = StreamingHttpResponse(gerar(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,92 @@
+"""
+Configuração do Gunicorn para produção.
+
+Uso (a partir da pasta com o manage.py):
+
+    gunicorn -c gunicorn.conf.py sargenteacao.asgi:application
+
+Por padrão usa workers Uvicorn (ASGI), necessários para o stream SSE de
+eventos. Todos os parâmetros podem ser ajustados por variáveis de ambiente.
+"""
+import multiprocessing
+import os
+
+
+def _env_int(nome, padrao):
+    try:
+        return int(os.environ.get(nome, padrao))
+    except ValueError:
+        return padrao
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Um processo por núcleo (x2 + 1) para aproveitar todos os cores do container
+workers = _env_int('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+
+# ETags e long-poll do efetivo comparam versões guardadas no cache: com o
+# cache em memória (locmem, um por processo) cada worker veria versões
+# diferentes. Com mais de um worker, exige um cache compartilhado.
+if workers > 1 and os.environ.get('CACHE_BACKEND', 'locmem').strip().lower() == 'locmem':
+    raise RuntimeError(
+        f'{workers} workers com CACHE_BACKEND=locmem: defina CACHE_BACKEND=file ou redis '
+        '(ou WEB_CONCURRENCY=1).'
+    )
+
+# O stream SSE de eventos (/api/eventos/stream/) só recebe as gravações de
+# outros workers pelo pub/sub do Redis (EVENTOS_REDIS_URL ou CACHE_BACKEND=redis).
+_EVENTOS_ENTRE_WORKERS = bool(
+    os.environ.get('EVENTOS_REDIS_URL') or os.environ.get('CACHE_BACKEND', '').strip().lower() == 'redis'
+)
+
+# ASGI (uvicorn) por padrão; use 'gthread' com sargenteacao.wsgi:application
+# para servir via WSGI com threads por worker.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+# Threads por worker (apenas para worker_class='gthread')
+threads = _env_int('GUNICORN_THREADS', 4)
+
+# Conexões keep-alive atrás de proxy reverso
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Requisições lentas (PDF) não devem derrubar o worker; streams SSE
+# enviam heartbeat, então o worker não fica "mudo" além do timeout.
+timeout = _env_int('GUNICORN_TIMEOUT', 60)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+# Recicla workers periodicamente para conter crescimento de memória
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+
+# Carrega o app antes do fork: inicialização única e memória compartilhada
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+
+# Métricas do Prometheus com vários workers: cada processo grava em
+# PROMETHEUS_MULTIPROC_DIR e /metrics agrega todos. O diretório é limpo na
+# subida do master e os arquivos de workers encerrados são marcados como mortos.
+def on_starting(server):
+    diretorio = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if diretorio:
+        import shutil
+        shutil.rmtree(diretorio, ignore_errors=True)
+        os.makedirs(diretorio, exist_ok=True)
+
+
+def when_ready(server):
+    if workers > 1 and not _EVENTOS_ENTRE_WORKERS:
+        server.log.warning(
+            '%s workers sem Redis para eventos: o stream /api/eventos/stream/ só recebe as '
+            'gravações do próprio worker. Defina EVENTOS_REDIS_URL (ou CACHE_BACKEND=redis) '
+            'ou WEB_CONCURRENCY=1.', workers
+        )
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -10,8 +10,25 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+
+def env_bool(nome, padrao=False):
+    """Lê uma variável de ambiente booleana (1/true/yes/on)."""
+    valor = os.environ.get(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ('1', 'true', 'yes', 'on', 'sim')
+
+
+def env_list(nome, padrao):
+    """Lê uma lista separada por vírgulas ou espaços de uma variável de ambiente."""
+    valor = os.environ.get(nome)
+    if not valor:
+        return padrao
+    return [item for item in valor.replace(',', ' ').split() if item]
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -20,12 +37,15 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-o0#faxv(f^cg$1ap@er62rj*ybg#5rvxt&flnd25ijcr=0@*p!'
+SECRET_KEY = os.environ.get(
+    'SECRET_KEY',
+    'django-insecure-o0#faxv(f^cg$1ap@er62rj*ybg#5rvxt&flnd25ijcr=0@*p!'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_bool('DEBUG', True)
 
-ALLOWED_HOSTS = ['*']
+ALLOWED_HOSTS = env_list('ALLOWED_HOSTS', ['*'])
 
 
 # Application definition
@@ -66,13 +86,21 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    # Primeiro da cadeia: mede a requisição inteira (latência, consultas SQL)
+    'core.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Arquivos estáticos comprimidos e com hash servidos pelo próprio app (produção)
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Lock do banco após as novas tentativas: 503 + Retry-After em vez de 500
+    'core.middleware.BancoBloqueadoMiddleware',
+    # Perfilamento sob demanda (?_perfil= / X-Perfilar), só com PERFILAMENTO_HABILITADO
+    'core.middleware.PerfilamentoMiddleware',
 ]
 
 ROOT_URLCONF = 'sargenteacao.urls'
@@ -98,12 +126,107 @@ WSGI_APPLICATION = 'sargenteacao.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Backend selecionado por DATABASE_ENGINE: "sqlite" (padrão) ou "postgresql".
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'sqlite').strip().lower()
+
+if DATABASE_ENGINE in ('postgres', 'postgresql'):
+    # PostgreSQL (produção). Requer psycopg 3 (psycopg[binary,pool]).
+    # - DATABASE_POOL=1: pool de conexões do psycopg (Django >= 5.1); nesse
+    #   modo as conexões persistentes (CONN_MAX_AGE) ficam desligadas, pois
+    #   o próprio pool reaproveita as conexões
+    # - CONN_MAX_AGE: conexões persistentes por worker quando sem pool
+    # - CONN_HEALTH_CHECKS: valida a conexão reaproveitada antes do uso
+    DATABASE_POOL = env_bool('DATABASE_POOL', False)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DATABASE_NAME', 'sargenteacao'),
+            'USER': os.environ.get('DATABASE_USER', 'sargenteacao'),
+            'PASSWORD': os.environ.get('DATABASE_PASSWORD', ''),
+            'HOST': os.environ.get('DATABASE_HOST', 'localhost'),
+            'PORT': os.environ.get('DATABASE_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DATABASE_POOL else int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': env_bool('DATABASE_CONN_HEALTH_CHECKS', True),
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DATABASE_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+    if DATABASE_POOL:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),
+        }
+else:
+    # Perfil SQLite para edição concorrente em um único nó:
+    # - WAL: leitores não bloqueiam escritores (e vice-versa)
+    # - synchronous=NORMAL: seguro com WAL e bem mais rápido que FULL
+    # - cache_size/mmap_size: páginas quentes em memória
+    # - timeout (busy timeout): espera o lock em vez de falhar com "database is locked"
+    # - transaction_mode=IMMEDIATE: transações de escrita pegam o lock no BEGIN,
+    #   evitando deadlocks de upgrade de lock (leitura -> escrita)
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': SQLITE_BUSY_TIMEOUT,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB};'
+                    f'PRAGMA mmap_size={SQLITE_MMAP_SIZE};'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+        }
+    }
+
+
+# Cache
+# CACHE_BACKEND seleciona o backend do cache (efetivo e demais cálculos):
+# - "locmem" (padrão): memória do processo; cada worker tem o seu
+# - "file": diretório em disco compartilhado pelos workers do mesmo host
+# - "redis": compartilhado entre hosts (CACHE_URL; requer o pacote redis)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem').strip().lower()
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_URL', 'redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': 'sargenteacao',
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000))},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sargenteacao',
+        }
     }
-}
+
+# Eventos da escala (stream SSE): com vários workers, os eventos passam pelo
+# pub/sub do Redis para chegar aos assinantes de todos os processos. Padrão:
+# o Redis do cache (CACHE_BACKEND=redis); vazio = só no próprio processo.
+EVENTOS_REDIS_URL = os.environ.get(
+    'EVENTOS_REDIS_URL',
+    CACHES['default']['LOCATION'] if CACHE_BACKEND == 'redis' else '',
+)
 
 
 # Password validation
@@ -141,6 +264,21 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Em produção (DEBUG=False) os estáticos são coletados com nomes com hash e
+# versões comprimidas (gzip/brotli), servidos com cache longo pelo WhiteNoise.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -157,4 +295,51 @@ CSRF_COOKIE_AGE = 60 * 60 * 24 * 7  # 7 dias
 CSRF_COOKIE_NAME = 'csrftoken'
 
 # Trusted origins for CSRF (adicione seu domínio em produção)
-CSRF_TRUSTED_ORIGINS = ['http://localhost:8000', 'http://127.0.0.1:8000']
+CSRF_TRUSTED_ORIGINS = env_list('CSRF_TRUSTED_ORIGINS', ['http://localhost:8000', 'http://127.0.0.1:8000'])
+
+
+# Regras de elegibilidade graduação x tipo de serviço (ver core/elegibilidade.py).
+# None usa a tabela padrão; para outra tabela, defina aqui um dict
+# {tipo: [graduações]} ou aponte ELEGIBILIDADE_SERVICO_ARQUIVO para um JSON
+# no mesmo formato. A tabela é validada e compilada na inicialização.
+ELEGIBILIDADE_SERVICO = None
+ELEGIBILIDADE_SERVICO_ARQUIVO = os.environ.get('ELEGIBILIDADE_SERVICO_ARQUIVO', '')
+
+# Regras de descanso e carga de serviço do efetivo (ver core/regras_efetivo.py).
+# None usa as regras padrão (afastamento, serviço ontem, já escalado); para
+# outra configuração, liste caminhos de classes ou pares [caminho, {parâmetros}],
+# por exemplo:
+#   REGRAS_EFETIVO = [
+#       'core.regras_efetivo.RegraAfastamento',
+#       'core.regras_efetivo.RegraServicoOntem',
+#       'core.regras_efetivo.RegraJaEscalado',
+#       ['core.regras_efetivo.RegraDescansoAposTipo', {'tipo': 'GUARDA', 'horas': 48}],
+#       ['core.regras_efetivo.RegraMaximoServicosMes', {'maximo': 8}],
+#       'core.regras_efetivo.RegraCargoEspecialFinsDeSemana',
+#   ]
+# ou aponte REGRAS_EFETIVO_ARQUIVO para um JSON no mesmo formato.
+REGRAS_EFETIVO = None
+REGRAS_EFETIVO_ARQUIVO = os.environ.get('REGRAS_EFETIVO_ARQUIVO', '')
+# Escalas preta (dias úteis) e vermelha (fins de semana e feriados) separadas:
+# a folga usada na ordenação do efetivo conta só os serviços da escala da data
+# (ver core/calendario.py; feriados são cadastrados no admin)
+ESCALA_PRETA_VERMELHA = env_bool('ESCALA_PRETA_VERMELHA', False)
+# Dias de folga até os quais o status é BAIXA e NORMAL (acima: ALTA)
+EFETIVO_LIMIARES_FOLGA = (1, 4)
+
+
+# Perfilamento sob demanda de uma requisição (somente administradores): com
+# PERFILAMENTO_HABILITADO, ?_perfil=1 (amostragem, formato "folded" para
+# flamegraph) ou ?_perfil=cprofile grava o perfil e o SQL da requisição em
+# PERFILAMENTO_DIR. Desabilitado, o middleware nem é instalado.
+PERFILAMENTO_HABILITADO = env_bool('PERFILAMENTO_HABILITADO', False)
+PERFILAMENTO_DIR = Path(os.environ.get('PERFILAMENTO_DIR', BASE_DIR / '.perfis'))
+PERFILAMENTO_INTERVALO_MS = float(os.environ.get('PERFILAMENTO_INTERVALO_MS', 2))
+PERFILAMENTO_MAX_PERFIS = int(os.environ.get('PERFILAMENTO_MAX_PERFIS', 50))
+
+
+# Métricas do Prometheus em /metrics. Com METRICAS_TOKEN o scraper envia
+# "Authorization: Bearer <token>"; sem token, só os IPs listados acessam.
+# Com vários workers (gunicorn), defina PROMETHEUS_MULTIPROC_DIR (ver gunicorn.conf.py).
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+METRICAS_IPS_PERMITIDOS = env_list('METRICAS_IPS_PERMITIDOS', ['127.0.0.1', '::1'])
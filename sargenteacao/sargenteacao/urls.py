@@ -11,6 +11,8 @@ from core import views as core_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # 📈 Prometheus
+    path('metrics', core_views.metricas, name='metricas'),
      # 🔑 JWT
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),